@@ -0,0 +1,89 @@
+"""
+Many games at once against the local mock server, every agent streaming its responses compared to the BatchClient
+collecting the requests of all games into batches completed by the LocalBatchBackend. Reports the games per second,
+the requests per turn that reached the server and the tokens per turn generated after the last segment an agent acted
+on, before an interrupt cut the stream off. In batch mode an interrupted request is dropped before its batch is written
+(or its response discarded when it had already been sent), and `--skip-chatter` doesn't request chatter at all. The
+local backend has the same per-request cost as streaming, a provider's batch API is where the savings are.
+
+Run from the repo root:
+    python -m benchmarks.batch_benchmark --games 20 --players 4 --batch-interval 0.2 --skip-chatter
+"""
+import argparse
+import asyncio
+import time
+
+from src.game_state import GameState
+from src.llm_batch import BatchClient, LocalBatchBackend
+from src.llm_client import LLMClient
+from src.mock_server import LatencyModel, MockServer, PromptResponder
+from src.observers import NullObserver
+
+
+async def play(game: GameState, timeout: float) -> bool:
+    try:
+        await asyncio.wait_for(game.run(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def run(num_games: int, num_players: int, latency: LatencyModel, timeout: float, seed: int,
+              batch_options: dict = None) -> dict:
+    responder = PromptResponder(seed, challenge_probability=0.2)
+    async with MockServer(responder, latency, seed=seed) as server:
+        client = LLMClient(base_url=server.base_url, api_key="batch-test",
+                           max_connections_per_host=num_games * num_players)
+        if batch_options is not None:
+            client = BatchClient(client, LocalBatchBackend(client, concurrency=num_games * num_players),
+                                 **batch_options)
+        async with client:
+            games = [GameState(num_players, llm_client=client, observer=NullObserver(), seed=seed + index)
+                     for index in range(num_games)]
+            start = time.perf_counter()
+            finished = await asyncio.gather(*[play(game, timeout) for game in games])
+            elapsed = time.perf_counter() - start
+
+        return {
+            "finished": sum(finished),
+            "seconds": elapsed,
+            "turns": sum(game.current_turn for game in games),
+            "requests": server.stats.requests,
+            "wasted_tokens": sum(game.telemetry.summary()["tokens"]["wasted"] for game in games),
+            "batch": client.stats() if batch_options is not None else None,
+        }
+
+
+async def main(num_games: int, num_players: int, latency: LatencyModel, timeout: float, seed: int,
+               batch_size: int, batch_interval: float, skip_chatter: bool):
+    print(f"{'client':<10} {'finished':>8} {'games/s':>8} {'turns':>6} {'requests/turn':>14} "
+          f"{'wasted tokens/turn':>19}")
+    batch_options = {"batch_size": batch_size, "flush_interval": batch_interval, "skip_chatter": skip_chatter}
+    for name, options in (("streaming", None), ("batch", batch_options)):
+        result = await run(num_games, num_players, latency, timeout, seed, options)
+        turns = max(result["turns"], 1)
+        print(f"{name:<10} {result['finished']:>8} {result['finished'] / result['seconds']:>8.2f} {result['turns']:>6} "
+              f"{result['requests'] / turns:>14.2f} {result['wasted_tokens'] / turns:>19.2f}")
+        if result["batch"]:
+            stats = result["batch"]
+            print(f"{'':<10} {stats['batches']} batches of {stats['mean_batch_size']:.1f} requests, "
+                  f"{stats['mean_batch_seconds']:.2f} s each, {stats['dropped']} dropped before sending, "
+                  f"{stats['discarded']} responses discarded, {stats['skipped']} chatter skipped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a game after this many seconds")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--batch-interval", type=float, default=0.2)
+    parser.add_argument("--skip-chatter", action="store_true")
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.ttft, 0.0, args.tokens_per_second)
+    asyncio.run(main(args.games, args.players, latency, args.timeout, args.seed, args.batch_size,
+                     args.batch_interval, args.skip_chatter))
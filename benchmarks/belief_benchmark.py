@@ -0,0 +1,97 @@
+"""
+Cost of keeping card beliefs up to date with the BeliefTracker, against working them out again from the whole event
+history whenever a player needs them (what the prompt log left the model to do).
+
+The events are a seeded mix of claims, won and lost challenges, exchanges and hand changes for a 6 player game.
+
+Run from the repo root:
+    python -m benchmarks.belief_benchmark --events 1000 --queries 10000
+"""
+import argparse
+import random
+import time
+
+from src.beliefs import BeliefTracker
+from src.datatypes import Card
+from src.helper import name_list
+from src.memory import PublicEvent
+
+NUM_PLAYERS = 6
+
+
+def events(count: int, names, seed: int):
+    rng = random.Random(seed)
+    cards = list(Card)
+    for _ in range(count):
+        player, card, roll = rng.choice(names), rng.choice(cards), rng.random()
+        if roll < 0.7:
+            yield "claim", PublicEvent("claim", player, card)
+        elif roll < 0.85:
+            yield "challenge", PublicEvent("challenge", player, card, rng.choice(names), rng.random() < 0.5)
+        elif roll < 0.95:
+            yield "hand", (player, rng.sample(cards, 2))
+        else:
+            yield "exchange", player
+
+
+def apply(tracker: BeliefTracker, kind: str, event):
+    if kind == "hand":
+        tracker.set_hand(*event)
+    elif kind == "exchange":
+        tracker.exchanged(event)
+    else:
+        tracker.observe(event)
+
+
+def new_tracker(names, rng: random.Random) -> BeliefTracker:
+    deck = [card for card in Card for _ in range(3)]
+    rng.shuffle(deck)
+    return BeliefTracker(names, [[deck.pop(), deck.pop()] for _ in names])
+
+
+def main(num_events: int, num_queries: int):
+    names = name_list[:NUM_PLAYERS]
+    history = list(events(num_events, names, seed=0))
+
+    tracker = new_tracker(names, random.Random(0))
+    start = time.perf_counter()
+    for kind, event in history:
+        apply(tracker, kind, event)
+    update = (time.perf_counter() - start) / num_events
+
+    rng = random.Random(1)
+    queries = [(rng.choice(names), rng.choice(names), rng.choice(list(Card))) for _ in range(num_queries)]
+    start = time.perf_counter()
+    for observer, target, card in queries:
+        tracker.view(observer).chance(target, card)
+    query = (time.perf_counter() - start) / num_queries
+
+    start = time.perf_counter()
+    for observer, _, _ in queries[:num_queries // 10]:
+        tracker.summary(observer)
+    summary = (time.perf_counter() - start) / (num_queries // 10)
+
+    # The same answer without the incremental state: replay the whole history for every query
+    replays = max(num_queries // 1000, 1)
+    start = time.perf_counter()
+    for observer, target, card in queries[:replays]:
+        replayed = new_tracker(names, random.Random(0))
+        for kind, event in history:
+            apply(replayed, kind, event)
+        replayed.view(observer).chance(target, card)
+    replay = (time.perf_counter() - start) / replays
+
+    print(f"{num_events} events, {NUM_PLAYERS} players")
+    print(f"update per event         {update * 1e6:>10.2f} us")
+    print(f"chance query             {query * 1e6:>10.2f} us")
+    print(f"prompt summary           {summary * 1e6:>10.2f} us")
+    print(f"replay history per query {replay * 1e6:>10.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=10000)
+    args = parser.parse_args()
+
+    main(args.events, args.queries)
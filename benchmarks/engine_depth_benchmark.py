@@ -0,0 +1,60 @@
+"""
+Stack depth, live tasks and memory while the engine handles actions over long games. With the engine loop every
+action is handled at the same depth, however many turns the game has been running.
+
+Run from the repo root:
+    python -m benchmarks.engine_depth_benchmark --games 3 --players 6
+"""
+import argparse
+import asyncio
+import inspect
+import tracemalloc
+from typing import List
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.datatypes import ActionMessage
+from src.game_state import GameState
+from src.observers import GameObserver
+
+
+class DepthProbe(GameObserver):
+    """Samples the call stack depth, the number of tasks and traced memory at every action"""
+
+    def __init__(self):
+        self.samples: List[tuple] = []  # (turn, depth, tasks, bytes)
+        self.game = None
+
+    def on_action(self, message: ActionMessage):
+        self.samples.append((self.game.current_turn, len(inspect.stack(0)), len(asyncio.all_tasks()),
+                             tracemalloc.get_traced_memory()[0]))
+
+
+async def main(num_players: int, num_games: int, timeout: float):
+    tracemalloc.start()
+    print(f"{'game':>4} {'turns':>6} {'actions':>8} {'depth first/max/last':>21} {'tasks max':>10} "
+          f"{'memory first/last':>18}")
+    for seed in range(num_games):
+        probe = DepthProbe()
+        game = GameState(num_players, llm_client=ScriptedClient(seed, challenge_probability=0.1), observer=probe,
+                         seed=seed)
+        probe.game = game
+        try:
+            await asyncio.wait_for(game.run(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        depths = [sample[1] for sample in probe.samples]
+        print(f"{seed:>4} {game.current_turn:>6} {len(probe.samples):>8} "
+              f"{depths[0]:>7}/{max(depths):>4}/{depths[-1]:<7} {max(sample[2] for sample in probe.samples):>10} "
+              f"{probe.samples[0][3] / 1024:>8.0f}/{probe.samples[-1][3] / 1024:<6.0f}KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a game after this many seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.players, args.games, args.timeout))
@@ -0,0 +1,85 @@
+"""
+How long interrupting an agent's generation takes, and how soon the server sees the request aborted, comparing
+Agent.interrupt against the previous close-sleep-cancel sequence. Streams come from the local mock server, with a delay
+between chunks so they are still running when interrupted.
+
+Run from the repo root:
+    python -m benchmarks.interrupt_benchmark --interrupts 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from src.agent import Agent
+from src.llm_client import LLMClient
+from src.mock_server import LatencyModel, MockServer
+from src.observers import NullObserver
+from src.telemetry import GameTelemetry
+
+# A long thought, so the stream is always interrupted before it produces anything the agent acts on
+RESPONSE = "THOUGHT:" + " hmm" * 200
+
+
+async def legacy_interrupt(agent: Agent):
+    """Agent.interrupt before event-driven cancellation"""
+    if agent.current_stream:
+        try:
+            await agent.current_stream.aclose()
+        except Exception:
+            pass
+        await asyncio.sleep(1)
+        agent.current_stream = None
+
+    if agent.stream_task:
+        agent.stream_task.cancel()
+        try:
+            await agent.stream_task
+        except asyncio.CancelledError:
+            pass
+        agent.stream_task = None
+        agent.current_stream = None
+
+
+async def measure(name: str, interrupt, client: LLMClient, server: MockServer, num_interrupts: int,
+                  chunk_delay: float):
+    game_state = SimpleNamespace(observer=NullObserver(), players=[], is_over=False, telemetry=GameTelemetry())
+    agent = Agent(name="Alice", game_state=game_state, coins=2)
+    interrupt_ms = []
+    abort_ms = []
+
+    for _ in range(num_interrupts):
+        server.aborted_at.clear()
+        agent.current_stream = client.stream("x" * 4000)
+        agent.stream_task = asyncio.create_task(agent.process_stream(agent.current_stream, []))
+        await asyncio.sleep(chunk_delay * 3)  # let it get going
+
+        start = time.perf_counter()
+        await interrupt(agent)
+        interrupt_ms.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.sleep(chunk_delay * 2)  # time for the server to notice
+        if server.aborted_at:
+            abort_ms.append((server.aborted_at[0] - start) * 1000)
+
+    aborted = f"{statistics.mean(abort_ms):8.2f} ms" if abort_ms else "     n/a"
+    print(f"{name:<18} interrupt mean={statistics.mean(interrupt_ms):8.2f} ms  max={max(interrupt_ms):8.2f} ms  "
+          f"server saw abort after {aborted} ({len(abort_ms)}/{num_interrupts})")
+
+
+async def main(num_interrupts: int, chunk_delay: float):
+    async with MockServer([RESPONSE], LatencyModel(tokens_per_second=1 / chunk_delay)) as server:
+        async with LLMClient(base_url=server.base_url, api_key="benchmark") as client:
+            await measure("close-sleep-cancel", legacy_interrupt, client, server, num_interrupts, chunk_delay)
+            await measure("Agent.interrupt", lambda agent: agent.interrupt(), client, server, num_interrupts,
+                          chunk_delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interrupts", type=int, default=10)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.interrupts, args.chunk_delay))
@@ -0,0 +1,66 @@
+"""
+Cost per decision and win rate of the ISMCTSPolicy against HeuristicPolicy opponents on FastState, for different
+iteration counts and time budgets. The ISMCTS player takes every seat in turn.
+
+Run from the repo root:
+    python -m benchmarks.ismcts_benchmark --games 40 --players 2 --iterations 50 200 --time-budgets 0.05
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Optional
+
+from src.fast_state import FastState
+from src.ismcts import ISMCTSPolicy
+from src.policies import HeuristicPolicy, play_fast_game
+
+
+class TimedISMCTS(ISMCTSPolicy):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.decision_seconds = []
+
+    def decide(self, observation):
+        start = time.perf_counter()
+        message = super().decide(observation)
+        self.decision_seconds.append(time.perf_counter() - start)
+        return message
+
+
+def run(num_players: int, num_games: int, iterations: int, time_budget: Optional[float]) -> str:
+    rng = random.Random(0)
+    wins = reused = 0
+    decisions = []
+    for game in range(num_games):
+        seat = game % num_players
+        policies = [HeuristicPolicy(None) for _ in range(num_players)]
+        policies[seat] = searcher = TimedISMCTS(None, iterations=iterations, time_budget=time_budget, seed=game)
+        state = play_fast_game(FastState.new_game(num_players, rng), policies, rng)
+        wins += state.winner == seat
+        reused += searcher.trees_reused
+        decisions.extend(searcher.decision_seconds)
+
+    decisions_ms = [seconds * 1000 for seconds in decisions]
+    budget = f"{time_budget * 1000:.0f} ms" if time_budget is not None else f"{iterations} iterations"
+    return (f"{budget:>15} {statistics.mean(decisions_ms):>9.1f} {statistics.quantiles(decisions_ms, n=20)[-1]:>9.1f} "
+            f"{max(decisions_ms):>9.1f} {wins / num_games:>9.2f} {1 / num_players:>6.2f} {reused:>7}")
+
+
+def main(num_players: int, num_games: int, iteration_counts, time_budgets):
+    print(f"{'budget':>15} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9} {'win rate':>9} {'fair':>6} {'reused':>7}")
+    for iterations in iteration_counts:
+        print(run(num_players, num_games, iterations, None))
+    for time_budget in time_budgets:
+        print(run(num_players, num_games, 0, time_budget))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--iterations", type=int, nargs="*", default=[50, 200])
+    parser.add_argument("--time-budgets", type=float, nargs="*", default=[0.05], help="Seconds per decision")
+    args = parser.parse_args()
+
+    main(args.players, args.games, args.iterations, args.time_budgets)
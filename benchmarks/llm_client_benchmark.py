@@ -0,0 +1,88 @@
+"""
+Compares the old per-call ClientSession against the pooled LLMClient using the local mock server.
+
+Run from the repo root:
+    python -m benchmarks.llm_client_benchmark --requests 200 --concurrency 6
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import aiohttp
+
+from src.llm_client import LLMClient
+from src.mock_server import LatencyModel, MockServer
+
+RESPONSE = "THOUGHT: I should take income\nACTION: INCOME\nEND"
+
+
+async def per_call_session_stream(base_url: str, system_message: str):
+    """The previous implementation: a fresh ClientSession (and connection) for every stream"""
+    data = {
+        'model': 'gpt-4o-mini',
+        'messages': [{'role': 'system', 'content': system_message}],
+        'temperature': 0.3,
+        'stream': True,
+    }
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/chat/completions", json=data) as response:
+            async for line in response.content:
+                chunk = line.decode('utf-8')[5:].strip()
+                try:
+                    if chunk:
+                        yield json.loads(chunk)['choices'][0]['delta']['content']
+                except (json.JSONDecodeError, KeyError, IndexError):
+                    pass
+
+
+async def consume(stream_factory, num_requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfts = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            async for _ in stream_factory():
+                if first is None:
+                    first = time.perf_counter() - start
+            ttfts.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(num_requests)])
+    return time.perf_counter() - start, ttfts
+
+
+def report(name: str, elapsed: float, ttfts, connections: int):
+    ttfts_ms = sorted(t * 1000 for t in ttfts)
+    p95 = ttfts_ms[int(len(ttfts_ms) * 0.95) - 1]
+    print(f"{name:<20} total={elapsed:7.3f}s  connections={connections:<5} "
+          f"ttft_mean={statistics.mean(ttfts_ms):6.2f}ms  ttft_p95={p95:6.2f}ms")
+
+
+async def main(num_requests: int, concurrency: int, chunk_delay: float):
+    latency = LatencyModel(tokens_per_second=1 / chunk_delay if chunk_delay else None)
+    prompt = "x" * 4000  # roughly the size of an agent prompt
+
+    async with MockServer([RESPONSE], latency) as server:
+        elapsed, ttfts = await consume(lambda: per_call_session_stream(server.base_url, prompt), num_requests,
+                                       concurrency)
+        report("per-call session", elapsed, ttfts, server.stats.connections)
+
+    async with MockServer([RESPONSE], latency) as server:
+        async with LLMClient(base_url=server.base_url, api_key="benchmark",
+                             max_connections_per_host=concurrency) as client:
+            elapsed, ttfts = await consume(lambda: client.stream(prompt), num_requests, concurrency)
+        report("pooled LLMClient", elapsed, ttfts, server.stats.connections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.chunk_delay))
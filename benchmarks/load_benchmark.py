@@ -0,0 +1,68 @@
+"""
+Load test of full LLM games against the local mock server: many games at once on one event loop, every agent streaming
+from the server over HTTP through one shared LLMClient, with the server's latency, error and rate-limit model. The
+server and the games are seeded, so a run is reproducible up to the scheduling of concurrent streams.
+
+Run from the repo root:
+    python -m benchmarks.load_benchmark --games 8 --players 6 --ttft 0.2 --tokens-per-second 50 --rate-limit-rate 0.02
+"""
+import argparse
+import asyncio
+import time
+
+from src.game_state import GameState
+from src.llm_client import LLMClient
+from src.mock_server import LatencyModel, MockServer, PromptResponder
+from src.observers import NullObserver
+
+
+async def play(game: GameState, timeout: float) -> bool:
+    try:
+        await asyncio.wait_for(game.run(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def main(num_games: int, num_players: int, latency: LatencyModel, timeout: float, seed: int):
+    responder = PromptResponder(seed, challenge_probability=0.2)
+    async with MockServer(responder, latency, seed=seed) as server:
+        async with LLMClient(base_url=server.base_url, api_key="load-test",
+                             max_connections_per_host=num_games * num_players) as client:
+            games = [GameState(num_players, llm_client=client, observer=NullObserver(), seed=seed + index)
+                     for index in range(num_games)]
+            start = time.perf_counter()
+            finished = await asyncio.gather(*[play(game, timeout) for game in games])
+            elapsed = time.perf_counter() - start
+
+        stats = server.stats
+        turns = sum(game.current_turn for game in games)
+        llm_calls = [game.llm_calls for game in games]
+        print(f"{num_games} games x {num_players} players = {num_games * num_players} agents, "
+              f"{sum(finished)} finished in {elapsed:.1f} s ({turns / elapsed:.1f} turns/s)")
+        print(f"server   requests={stats.requests} completed={stats.completed} aborted={stats.aborted} "
+              f"errors={stats.errors} rate_limited={stats.rate_limited} peak_streams={stats.peak_streams} "
+              f"connections={stats.connections}")
+        print(f"client   retries={client.retries} started={sum(calls.started for calls in llm_calls)} "
+              f"cancelled={sum(calls.cancelled for calls in llm_calls)} "
+              f"failed={sum(calls.failed for calls in llm_calls)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a game after this many seconds")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--ttft-jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02)
+    parser.add_argument("--max-concurrent-streams", type=int, default=None)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.ttft, args.ttft_jitter, args.tokens_per_second, args.error_rate, args.rate_limit_rate,
+                           args.max_concurrent_streams, args.retry_after)
+    asyncio.run(main(args.games, args.players, latency, args.timeout, args.seed))
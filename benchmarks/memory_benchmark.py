@@ -0,0 +1,88 @@
+"""
+Memory held per agent and history carried in the prompt as a game gets longer, comparing the unbounded log (of
+which prompts only used the last 20 entries) against AgentMemory's ring buffer and running summary.
+
+The entries are a seeded mix of speeches, thoughts, claims, challenges and lost cards like the engine publishes.
+
+Run from the repo root:
+    python -m benchmarks.memory_benchmark --entries 1000 10000 100000
+"""
+import argparse
+import asyncio
+import random
+import tracemalloc
+from typing import List
+
+from src.datatypes import Card
+from src.helper import name_list
+from src.memory import LOG_WINDOW, AgentMemory, PublicEvent
+
+
+def entries(count: int, num_players: int, seed: int):
+    rng = random.Random(seed)
+    names = name_list[:num_players]
+    cards = list(Card)
+    lost = {name: 0 for name in names}
+    for i in range(count):
+        player = rng.choice(names)
+        roll = rng.random()
+        if roll >= 0.95 and lost[player] == 2:
+            roll = rng.random() * 0.95  # a player only has two cards to lose
+        if roll < 0.4:
+            yield f"{player}: message number {i} about who has the Duke", PublicEvent("speech", player)
+        elif roll < 0.6:
+            yield f"THOUGHT: I think {player} is bluffing about message {i}", None
+        elif roll < 0.85:
+            card = rng.choice(cards)
+            yield f"GAME: {player} performed an action, claiming {card.name}.", PublicEvent("claim", player, card)
+        elif roll < 0.95:
+            card, challenger, won = rng.choice(cards), rng.choice(names), rng.random() < 0.5
+            yield (f"GAME: {challenger} challenged {player}'s claim to {card.name} and {'won' if won else 'lost'}.",
+                   PublicEvent("challenge", player, card, challenger, won))
+        else:
+            card = rng.choice(cards)
+            lost[player] += 1
+            yield f"GAME: {player} lost their {card.name}.", PublicEvent("reveal", player, card)
+
+
+def measure_list(count: int, num_players: int) -> tuple:
+    tracemalloc.start()
+    log: List[str] = []
+    for text, _ in entries(count, num_players, seed=0):
+        log.append(text)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    history = "\n".join(log[-LOG_WINDOW:])
+    return retained, len(history.encode("utf-8")), LOG_WINDOW
+
+
+async def measure_memory(count: int, num_players: int) -> tuple:
+    tracemalloc.start()
+    memory = AgentMemory()
+    for i, (text, event) in enumerate(entries(count, num_players, seed=0)):
+        memory.append(text, event)
+        if i % 10 == 0:
+            await asyncio.sleep(0)  # let the scheduled folds run, as they would between messages in a game
+    memory.fold()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    history = memory.summary() + "\n" + "\n".join(memory.entries())
+    return retained, len(history.encode("utf-8")), memory.folded + len(memory.recent)
+
+
+async def main(counts: List[int], num_players: int):
+    print(f"{'entries':>8} {'':<14} {'retained':>10} {'prompt history':>15} {'entries covered':>16}")
+    for count in counts:
+        for name, result in (("unbounded log", measure_list(count, num_players)),
+                             ("AgentMemory", await measure_memory(count, num_players))):
+            retained, history_bytes, covered = result
+            print(f"{count:>8} {name:<14} {retained / 1024:>8.0f}KB {history_bytes:>13}B {covered:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--players", type=int, default=6)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.entries, args.players))
@@ -0,0 +1,93 @@
+"""
+Cost of move generation per decision for the simulators: the legal actions from the rules table, the same list built
+with the if/elif helpers the engine used before, complete FastState moves (with targets and cards) and
+BatchSimulator's legal action mask per game.
+
+The states are every decision point of seeded random FastState games.
+
+Run from the repo root:
+    python -m benchmarks.movegen_benchmark --games 200 --players 4
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.batch_sim import BatchSimulator
+from src.datatypes import (
+    Action,
+    get_base_actions,
+    get_challenge_actions,
+    get_counter_actions,
+)
+from src.fast_state import FastState
+from src.rules import (
+    PHASE_ACTION,
+    PHASE_COUNTER,
+    PHASE_DISCARD,
+    PHASE_EXCHANGE,
+    legal_actions,
+)
+
+
+def list_actions(phase: int, coins: int):
+    """The legal actions rebuilt from the action lists on every call"""
+    if phase == PHASE_ACTION:
+        if coins >= 10:
+            return [Action.COUP]
+        return [action for action in get_base_actions()
+                if not (action == Action.ASSASSINATE and coins < 3) and not (action == Action.COUP and coins < 7)]
+    if phase == PHASE_COUNTER:
+        return get_counter_actions()
+    if phase == PHASE_DISCARD:
+        return [Action.DISCARD]
+    if phase == PHASE_EXCHANGE:
+        return [Action.DISCARD_TWO]
+    return get_challenge_actions()
+
+
+def decision_points(num_players: int, num_games: int):
+    rng = random.Random(0)
+    points = []
+    for _ in range(num_games):
+        state = FastState.new_game(num_players, rng)
+        while not state.is_terminal:
+            points.append(state)
+            state = state.apply(rng.choice(state.legal_moves()), rng)
+    return points
+
+
+def per_call(function, arguments) -> float:
+    start = time.perf_counter()
+    for argument in arguments:
+        function(*argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def main(num_players: int, num_games: int, num_batch_games: int):
+    states = decision_points(num_players, num_games)
+    phases = [(state.phase, state.coins[state.acting_players()[0]]) for state in states]
+    print(f"{len(states)} decisions from {num_games} random games with {num_players} players")
+    print(f"rules table legal_actions    {per_call(legal_actions, phases) * 1e6:>8.3f} us")
+    print(f"helper lists                 {per_call(list_actions, phases) * 1e6:>8.3f} us")
+    print(f"FastState.legal_moves        {per_call(FastState.legal_moves, [(s,) for s in states]) * 1e6:>8.3f} us")
+
+    sim = BatchSimulator(num_batch_games, num_players, seed=0)
+    games = np.arange(num_batch_games)
+    repeats = 100
+    start = time.perf_counter()
+    for i in range(repeats):
+        sim.legal_action_mask(games, i % num_players)
+    batch = (time.perf_counter() - start) / (repeats * num_batch_games)
+    print(f"BatchSimulator mask per game {batch * 1e6:>8.3f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--batch-games", type=int, default=10000)
+    args = parser.parse_args()
+
+    main(args.players, args.games, args.batch_games)
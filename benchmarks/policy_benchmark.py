@@ -0,0 +1,74 @@
+"""
+Decision cost of the HeuristicPolicy and how many games per second it plays, on FastState with play_fast_game and
+through the full GameState engine (agents, inboxes and the engine loop) with policy="heuristic".
+
+Run from the repo root:
+    python -m benchmarks.policy_benchmark --games 500 --players 2 4 6
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from src.fast_state import FastState
+from src.game_state import POLICY_HEURISTIC, GameState
+from src.observers import NullObserver
+from src.policies import (
+    BASE_ACTIONS,
+    CHALLENGE_ACTIONS,
+    HeuristicPolicy,
+    observe_fast_state,
+    play_fast_game,
+)
+
+
+def decision_cost(num_players: int, num_decisions: int) -> float:
+    rng = random.Random(0)
+    state = FastState.new_game(num_players, rng)
+    policy = HeuristicPolicy(None)
+    observations = [observe_fast_state(state, 0, BASE_ACTIONS), observe_fast_state(state, 1, CHALLENGE_ACTIONS)]
+
+    start = time.perf_counter()
+    for i in range(num_decisions):
+        policy.decide(observations[i % 2])
+    return (time.perf_counter() - start) / num_decisions
+
+
+def fast_games(num_players: int, num_games: int) -> tuple:
+    rng = random.Random(0)
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(num_games):
+        policies = [HeuristicPolicy(None) for _ in range(num_players)]
+        turns += play_fast_game(FastState.new_game(num_players, rng), policies, rng).turn
+    return num_games / (time.perf_counter() - start), turns / num_games
+
+
+async def engine_games(num_players: int, num_games: int) -> tuple:
+    turns = 0
+    start = time.perf_counter()
+    for seed in range(num_games):
+        game = GameState(num_players, observer=NullObserver(), seed=seed, policy=POLICY_HEURISTIC)
+        await game.run()
+        turns += game.current_turn
+    return num_games / (time.perf_counter() - start), turns / num_games
+
+
+def main(num_games: int, player_counts, num_decisions: int):
+    print(f"decide: {decision_cost(4, num_decisions) * 1e6:.2f} us per decision")
+    print(f"{'players':>7} {'FastState games/s':>18} {'turns':>6} {'GameState games/s':>18} {'turns':>6}")
+    for num_players in player_counts:
+        fast_rate, fast_turns = fast_games(num_players, num_games)
+        engine_rate, engine_turns = asyncio.run(engine_games(num_players, max(num_games // 10, 1)))
+        print(f"{num_players:>7} {fast_rate:>18.0f} {fast_turns:>6.1f} {engine_rate:>18.0f} {engine_turns:>6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=500, help="FastState games per player count, a tenth of that "
+                                                               "through the engine")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--decisions", type=int, default=100000)
+    args = parser.parse_args()
+
+    main(args.games, args.players, args.decisions)
@@ -0,0 +1,99 @@
+"""
+How long it takes to poll every other player for a reaction to an action (challenge, counter or pass) or a challenge of
+a counter, compared to the latency of a single generation. With per-agent inboxes the players answer concurrently, so
+a poll of five players should take about one generation, not five.
+
+Run from the repo root:
+    python -m benchmarks.poll_benchmark --games 3 --players 6
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List, Set, Tuple
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.datatypes import Action, ActionMessage
+from src.game_state import GameState
+from src.observers import GameObserver
+
+
+class TimedClient(ScriptedClient):
+    """Records how long every answer to a task took to stream, up to the end of its ACTION line"""
+
+    def __init__(self, seed: int, chunk_delay: float, challenge_probability: float):
+        super().__init__(seed, chunk_delay=chunk_delay, challenge_probability=challenge_probability)
+        self.latencies: List[float] = []
+
+    async def stream(self, system_message: str, **request_options):
+        start = time.perf_counter()
+        answering = False
+        async for chunk in super().stream(system_message, **request_options):
+            answering = answering or chunk.startswith("ACTION:")
+            if answering and chunk.endswith("\n"):
+                self.latencies.append(time.perf_counter() - start)
+            yield chunk
+
+
+class PollTimer(GameObserver):
+    """Times polls from the moment the task goes out to several players until the last of them declined"""
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self._polls: Dict[Action, Tuple[float, Set[str]]] = {}
+
+    def on_task_sent(self, players: List, content: str):
+        if "challenge the counter" in content:
+            decline = Action.NO_CHALLENGE
+        elif content.endswith("Otherwise PASS."):
+            decline = Action.PASS
+        else:
+            return
+        # The target of an action gets its own reaction task, sent together with everyone else's
+        start, waiting = self._polls.get(decline, (time.perf_counter(), set()))
+        self._polls[decline] = (start, waiting | {player.name for player in players})
+
+    def on_action(self, message: ActionMessage):
+        if message.action in (Action.CHALLENGE, Action.COUNTER):
+            self._polls = {}  # ends the polls early, those aren't timed
+        elif message.action in self._polls:
+            start, waiting = self._polls[message.action]
+            waiting.discard(message.sender)
+            if not waiting:
+                self.durations.append(time.perf_counter() - start)
+                del self._polls[message.action]
+
+
+async def main(num_players: int, num_games: int, chunk_delay: float, challenge_probability: float, timeout: float):
+    polls = []
+    latencies = []
+    for seed in range(num_games):
+        client = TimedClient(seed, chunk_delay, challenge_probability)
+        timer = PollTimer()
+        game = GameState(num_players, llm_client=client, observer=timer, seed=seed)
+        try:
+            await asyncio.wait_for(game.run(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        polls.extend(timer.durations)
+        latencies.extend(client.latencies)
+
+    generation = statistics.median(latencies)
+    poll = statistics.median(polls)
+    print(f"{num_players} players, {len(polls)} polls answered by all {num_players - 1} other players")
+    print(f"median generation {generation * 1000:7.1f} ms")
+    print(f"median poll       {poll * 1000:7.1f} ms  ({poll / generation:.2f} generations)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed words")
+    parser.add_argument("--challenge-probability", type=float, default=0.05,
+                        help="How often a polled player challenges or counters instead of declining")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a game after this many seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.players, args.games, args.chunk_delay, args.challenge_probability, args.timeout))
@@ -0,0 +1,136 @@
+"""
+Prompt construction cost per message and bytes sent per game, comparing the PromptBuilder against rebuilding the
+whole f-string on every message as Agent.receive_message used to.
+
+Run from the repo root:
+    python -m benchmarks.prompt_benchmark --messages 2000 --players 6
+"""
+import argparse
+import random
+import time
+
+from src.agent import Agent
+from src.datatypes import Card, TaskMessage, get_base_actions, get_challenge_actions
+from src.game_state import GameState
+from src.helper import name_list, personality_list
+from src.observers import NullObserver
+from src.prompt_builder import (
+    CHATTER_INSTRUCTIONS,
+    TASK_INSTRUCTIONS,
+    PromptBuilder,
+    game_explanation,
+    map_action_to_output_format,
+)
+
+
+def rebuild_prompt(agent: Agent) -> str:
+    """Everything rebuilt from scratch on every call, with the log in the middle of the static instructions"""
+    log_str = "\n".join(agent.memory.entries())
+    player_info_str = "\n".join([f"{player.name} has {player.coins} coins with {len(player.cards)} cards."
+                                 for player in agent.game_state.players])
+    if agent.tasks:
+        tasks_str = ""
+        for task in agent.tasks:
+            tasks_str += task.content + " You must NOW output one of the following actions. ACTION: " + ", ".join(
+                map(map_action_to_output_format, task.expected_actions)) + "\n"
+        return f"""Your name is {agent.name}. You are a strategic player in the game of Coup.
+{game_explanation()}
+
+Your personality is:
+{agent.personality}
+
+Here is the log of conversations, thoughts and game events:
+{log_str}
+
+{TASK_INSTRUCTIONS}
+
+The following players are in the game:
+{player_info_str}
+
+Here are your cards:
+{', '.join([str(card) for card in agent.cards])}
+
+Here are your tasks:
+{tasks_str}
+
+It is currently turn {agent.game_state.current_turn}.
+
+Start your output:"""
+
+    return f"""Your name is {agent.name}. You are a strategic player in the game of Coup.
+{game_explanation()}
+
+Your personality is:
+{agent.personality}
+
+Here is the log of conversations, your thoughts and game events:
+{log_str}
+
+{CHATTER_INSTRUCTIONS}
+
+The following players are in the game:
+{player_info_str}
+
+It is currently turn {agent.game_state.current_turn}.
+
+Start your output:"""
+
+
+def make_game(num_players: int) -> GameState:
+    game = GameState(num_players, observer=NullObserver(), seed=0)
+    for i in range(num_players):
+        game.players.append(Agent(name=name_list[i], personality=personality_list[i], game_state=game, coins=2,
+                                  cards=[Card.DUKE, Card.CAPTAIN]))
+    return game
+
+
+def simulate(game: GameState, num_messages: int, build) -> float:
+    """Broadcast `num_messages` speeches (with a task every few) and build every agent's prompt for each one"""
+    rng = random.Random(0)
+    elapsed = 0.0
+    for i in range(num_messages):
+        speaker = game.players[i % len(game.players)]
+        if i % 5 == 0:
+            task = TaskMessage(content=f"Player {speaker.name} it is your turn. Choose an action to perform.",
+                               expected_actions=get_base_actions())
+            speaker.tasks = [task]
+        elif i % 5 == 2:
+            speaker.tasks = [TaskMessage(content="Would you like to challenge?",
+                                         expected_actions=get_challenge_actions())]
+        elif i % 5 == 4:
+            speaker.tasks = []
+            speaker.coins += rng.randint(0, 2)
+            game.current_turn += 1
+
+        for player in game.players:
+            player.memory.append(f"{speaker.name}: message number {i} about who has the Duke")
+            start = time.perf_counter()
+            build(player)
+            elapsed += time.perf_counter() - start
+
+    return elapsed
+
+
+def main(num_messages: int, num_players: int):
+    game = make_game(num_players)
+    sizes = []
+    elapsed = simulate(game, num_messages, lambda player: sizes.append(len(rebuild_prompt(player).encode("utf-8"))))
+    calls = num_messages * num_players
+    print(f"{'rebuild every call':<20} {elapsed / calls * 1e6:7.2f} us/prompt  {sum(sizes) / 1024:9.0f} KB sent")
+
+    game = make_game(num_players)
+    builders = {player.name: PromptBuilder(player.name, player.personality) for player in game.players}
+    elapsed = simulate(game, num_messages, lambda player: builders[player.name].build(player))
+    total = sum(builder.bytes_built for builder in builders.values())
+    static = sum(builder.static_bytes_built for builder in builders.values())
+    print(f"{'PromptBuilder':<20} {elapsed / calls * 1e6:7.2f} us/prompt  {total / 1024:9.0f} KB sent, "
+          f"{static / total:.0%} in the cacheable static prefix")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=6)
+    args = parser.parse_args()
+
+    main(args.messages, args.players)
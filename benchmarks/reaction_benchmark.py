@@ -0,0 +1,95 @@
+"""
+How many poll tasks the engine sends for each action that can be challenged or countered, and what that costs in LLM
+streams and wall-clock time per turn. Heuristic games count the polls without any LLM, scripted games stream every
+answer from the ScriptedClient with a delay per chunk, so each extra poll costs a generation like it would with a model.
+
+Run from the repo root:
+    python -m benchmarks.reaction_benchmark --games 5 --players 4 --chunk-delay 0.005
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.datatypes import ActionMessage
+from src.game_state import POLICY_HEURISTIC, GameState
+from src.observers import NullObserver
+from src.rules import (
+    PHASE_ACTION,
+    PHASE_DISCARD,
+    PHASE_EXCHANGE,
+    can_be_challenged,
+    can_be_countered,
+    is_base,
+    task_phase,
+)
+
+
+class PollCounter(NullObserver):
+    """Counts the contested actions a game handles and the poll tasks sent to players"""
+
+    def __init__(self, game: GameState):
+        self.contested = 0
+        self.polls = 0
+        send_task_message = game.send_task_message
+
+        async def counting_send(players, content, expected_actions=None):
+            if task_phase(expected_actions) not in (PHASE_ACTION, PHASE_DISCARD, PHASE_EXCHANGE):
+                self.polls += len(players) if isinstance(players, list) else 1
+            await send_task_message(players, content, expected_actions)
+
+        game.send_task_message = counting_send
+
+    def on_action(self, message: ActionMessage):
+        if is_base(message.action) and (can_be_challenged(message.action) or can_be_countered(message.action)):
+            self.contested += 1
+
+
+async def play(num_players: int, num_games: int, timeout: float, client=None) -> dict:
+    totals = {"games": 0, "turns": 0, "contested": 0, "polls": 0, "streams": 0, "seconds": 0.0}
+    for seed in range(num_games):
+        options = {"policy": POLICY_HEURISTIC} if client is None else \
+            {"llm_client": client(seed), "coalesce_window": 0.05}
+        game = GameState(num_players, seed=seed, **options)
+        counter = PollCounter(game)
+        game.observer = counter
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(game.run(), timeout)
+        except asyncio.TimeoutError:
+            continue
+        totals["games"] += 1
+        totals["seconds"] += time.perf_counter() - start
+        totals["turns"] += game.current_turn
+        totals["contested"] += counter.contested
+        totals["polls"] += counter.polls
+        totals["streams"] += game.llm_calls.started
+    return totals
+
+
+def report(name: str, totals: dict):
+    contested = max(totals["contested"], 1)
+    turns = max(totals["turns"], 1)
+    print(f"{name:<10} {totals['games']:>5} {totals['turns'] / max(totals['games'], 1):>6.1f} "
+          f"{totals['polls'] / contested:>18.2f} {totals['streams'] / turns:>13.1f} "
+          f"{totals['seconds'] / turns * 1000:>10.1f}")
+
+
+async def main(num_players: int, num_games: int, chunk_delay: float, timeout: float):
+    print(f"{'policy':<10} {'games':>5} {'turns':>6} {'polls per contested':>18} {'streams/turn':>13} "
+          f"{'ms/turn':>10}")
+    report("heuristic", await play(num_players, num_games * 10, timeout))
+    report("scripted", await play(num_players, num_games, timeout,
+                                  lambda seed: ScriptedClient(seed, chunk_delay, challenge_probability=0.2)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a game after this many seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.players, args.games, args.chunk_delay, args.timeout))
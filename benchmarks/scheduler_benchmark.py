@@ -0,0 +1,91 @@
+"""
+Turn latency of many concurrent games against a rate-limited provider, with every agent streaming straight from the
+LLMClient compared to streaming through the RequestScheduler. The mock server rejects requests over its request rate
+and over its concurrent stream limit with a 429, which the client retries after the Retry-After delay and a game fails
+when the retries run out. The scheduler is given the same concurrent stream limit and 95% of the request rate, since
+requests can reach the server closer together than they were granted, so requests wait on the client instead and the
+ones answering a task go out first.
+
+Run from the repo root:
+    python -m benchmarks.scheduler_benchmark --games 6 --players 4 --requests-per-minute 600 --max-concurrent-streams 8
+"""
+import argparse
+import asyncio
+import time
+
+from src.game_state import GameState
+from src.llm_client import LLMClient
+from src.llm_scheduler import RequestScheduler
+from src.mock_server import LatencyModel, MockServer, PromptResponder
+from src.observers import NullObserver
+from src.telemetry import distribution
+
+RATE_HEADROOM = 0.95
+
+
+async def play(game: GameState, timeout: float) -> str:
+    try:
+        await asyncio.wait_for(game.run(), timeout)
+        return "finished"
+    except asyncio.TimeoutError:
+        return "timeout"
+    except Exception:
+        return "failed"
+
+
+async def run(num_games: int, num_players: int, latency: LatencyModel, timeout: float, seed: int,
+              scheduled: bool) -> dict:
+    responder = PromptResponder(seed, challenge_probability=0.2)
+    async with MockServer(responder, latency, seed=seed) as server:
+        client = LLMClient(base_url=server.base_url, api_key="load-test",
+                           max_connections_per_host=num_games * num_players)
+        if scheduled:
+            requests_per_minute = latency.requests_per_minute * RATE_HEADROOM if latency.requests_per_minute else None
+            client = RequestScheduler(client, requests_per_minute, max_concurrent=latency.max_concurrent_streams)
+        async with client:
+            games = [GameState(num_players, llm_client=client, observer=NullObserver(), seed=seed + index)
+                     for index in range(num_games)]
+            start = time.perf_counter()
+            outcomes = await asyncio.gather(*[play(game, timeout) for game in games])
+            elapsed = time.perf_counter() - start
+
+        turn_seconds = [seconds for game in games for seconds in game.telemetry.turn_seconds.values()]
+        return {
+            "finished": outcomes.count("finished"),
+            "failed": outcomes.count("failed") + outcomes.count("timeout"),
+            "seconds": elapsed,
+            "turns": sum(game.current_turn for game in games),
+            "turn_seconds": distribution(turn_seconds),
+            "rate_limited": server.stats.rate_limited,
+            "requests": server.stats.requests,
+            "throttled": client.throttled if scheduled else 0,
+        }
+
+
+async def main(num_games: int, num_players: int, latency: LatencyModel, timeout: float, seed: int):
+    print(f"{'client':<10} {'finished':>8} {'failed':>6} {'turns':>6} {'turns/s':>8} {'p50 turn s':>10} "
+          f"{'p95 turn s':>10} {'requests':>8} {'429s':>6} {'throttled':>9}")
+    for name, scheduled in (("direct", False), ("scheduled", True)):
+        result = await run(num_games, num_players, latency, timeout, seed, scheduled)
+        turns = result["turn_seconds"]
+        print(f"{name:<10} {result['finished']:>8} {result['failed']:>6} {result['turns']:>6} "
+              f"{result['turns'] / result['seconds']:>8.2f} {turns['p50']:>10.2f} {turns['p95']:>10.2f} "
+              f"{result['requests']:>8} {result['rate_limited']:>6} {result['throttled']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=6)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a game after this many seconds")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--requests-per-minute", type=float, default=600.0)
+    parser.add_argument("--max-concurrent-streams", type=int, default=8)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.ttft, 0.0, args.tokens_per_second, 0.0, 0.0, args.max_concurrent_streams,
+                           args.retry_after, args.requests_per_minute)
+    asyncio.run(main(args.games, args.players, latency, args.timeout, args.seed))
@@ -0,0 +1,30 @@
+"""
+An LLM client stand-in for benchmarks that plays the game without a network.
+
+It reads the prompt the same way a model would, with the mock server's PromptResponder: when the prompt lists tasks it
+answers one of them with a random valid action, otherwise it chats with some probability, in JSON when the stream is
+asked for a response format. Chunks are streamed with a
+fixed delay so concurrent streams overlap and get interrupted like real ones.
+"""
+import asyncio
+
+from src.llm_client import chunks
+from src.mock_server import PromptResponder
+
+
+class ScriptedClient:
+    model = "scripted"
+    temperature = 0.0
+
+    def __init__(self, seed: int = 0, chunk_delay: float = 0.002, speech_probability: float = 0.3,
+                 challenge_probability: float = 0.5, mistake_probability: float = 0.0):
+        self.responder = PromptResponder(seed, speech_probability, challenge_probability, mistake_probability)
+        self.chunk_delay = chunk_delay
+
+    async def stream(self, system_message: str, **request_options):
+        for chunk in chunks(self.responder(system_message, request_options.get("response_format"))):
+            await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+    async def close(self):
+        pass
@@ -0,0 +1,135 @@
+"""
+Checks the StreamParser against random chunk boundaries and times it against the old buffer-and-replace loop of
+Agent.process_stream on long outputs.
+
+The fuzz check generates random outputs, splits them at random points (including inside markers) and asserts that the
+parsed segments are the same as the ones the output was generated from.
+
+Run from the repo root:
+    python -m benchmarks.stream_parser_benchmark --fuzz 2000 --lengths 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from src.stream_parser import SEGMENT_KINDS, Segment, StreamParser
+
+WORDS = ["Susan", "has", "the", "Duke", "I", "think", "we", "should", "challenge", "her", "coins", "STEAL", "SPEECH",
+         "a", "bluff", "ACT", "THOUGHT", "END.", "ENDING", "S", ":", "Captain", "ION"]
+
+
+def random_output(rng: random.Random, num_segments: int):
+    """Text in the agents' output format and the segments it should parse into"""
+    lines = []
+    segments = []
+    for _ in range(num_segments):
+        kind = rng.choice(SEGMENT_KINDS)
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        lines.append(f"{kind}: {content}")
+
+        if kind != "ACTION" and rng.random() < 0.2:
+            continuation = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+            lines.append(continuation)
+            content += "\n" + continuation
+        segments.append(Segment(kind, content))
+
+    if rng.random() < 0.5:
+        lines.append("END")
+        lines.append("SPEECH: this comes after END and is ignored")
+
+    return "\n".join(lines), segments
+
+
+def split_randomly(rng: random.Random, text: str) -> List[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, len(text) // 2))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def parse_chunks(chunks: List[str]) -> List[Segment]:
+    parser = StreamParser()
+    segments = []
+    for chunk in chunks:
+        segments.extend(parser.feed(chunk))
+    segments.extend(parser.close())
+    return segments
+
+
+def legacy_parse_chunks(chunks: List[str]) -> List[Segment]:
+    """The loop Agent.process_stream used before the StreamParser"""
+    action = ""
+    buffer = ""
+    segments = []
+    for chunk in chunks:
+        buffer += chunk
+        ended = False
+        next_action = ""
+
+        if "SPEECH:" in buffer:
+            buffer = buffer.replace("SPEECH:", "")
+            next_action = "SPEECH"
+            ended = True
+        elif "THOUGHT:" in buffer:
+            buffer = buffer.replace("THOUGHT:", "")
+            next_action = "THOUGHT"
+            ended = True
+        elif "ACTION:" in buffer:
+            buffer = buffer.replace("ACTION:", "")
+            next_action = "ACTION"
+            ended = True
+
+        if ended:
+            buffer = buffer.replace("END", "").strip()
+            if action and buffer:
+                segments.append(Segment(action, buffer))
+                buffer = ""
+            action = next_action
+
+    if action and buffer:
+        segments.append(Segment(action, buffer.replace("END", "").strip()))
+    return segments
+
+
+def fuzz(iterations: int, seed: int):
+    rng = random.Random(seed)
+    legacy_mismatches = 0
+    for iteration in range(iterations):
+        text, expected = random_output(rng, rng.randint(1, 8))
+        chunks = split_randomly(rng, text)
+        segments = parse_chunks(chunks)
+        assert segments == expected, f"iteration {iteration}: {chunks!r} parsed to {segments!r}, expected {expected!r}"
+        assert parse_chunks([text]) == expected
+        legacy_mismatches += legacy_parse_chunks(chunks) != expected
+    print(f"fuzz: {iterations} random outputs parsed correctly for every chunking "
+          f"(the legacy loop disagreed on {legacy_mismatches})")
+
+
+def benchmark(length: int, seed: int):
+    rng = random.Random(seed)
+    short = ""
+    while len(short) < length:
+        short += random_output(rng, 20)[0].replace("END", "") + "\n"
+    # A single long thought, where the old loop rescans its whole buffer on every chunk
+    long = "THOUGHT: " + " ".join(rng.choice(WORDS[:12]) for _ in range(length // 5)) + "\nACTION: INCOME\n"
+
+    for shape, text in [("short segments", short), ("one long segment", long)]:
+        # About 4 characters per token
+        chunks = [text[start:start + 4] for start in range(0, len(text), 4)]
+        for name, parse in [("legacy", legacy_parse_chunks), ("StreamParser", parse_chunks)]:
+            start = time.perf_counter()
+            segments = parse(chunks)
+            elapsed = time.perf_counter() - start
+            print(f"{len(text):>8} chars {shape:<17} {name:<13} {elapsed * 1000:9.2f} ms  "
+                  f"{len(text) / elapsed / 1e6:7.2f} M chars/s  {len(segments)} segments")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random outputs to check")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fuzz(args.fuzz, args.seed)
+    for length in args.lengths:
+        benchmark(length, args.seed)
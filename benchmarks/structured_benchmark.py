@@ -0,0 +1,80 @@
+"""
+Invalid-action retries in the text format compared to the structured output mode. The ScriptedClient writes a near miss
+of its action (the wrong case, a trailing period, a card as printed in the prompt or no target) with
+`--mistake-probability`. In the text format each one is sent back to the agent and costs another generation. With a
+strict response format the model can't produce them at all, and with a format that only asks for JSON (`loose`) they
+are repaired locally when unambiguous.
+
+Run from the repo root:
+    python -m benchmarks.structured_benchmark --games 5 --players 4 --mistake-probability 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.game_state import GameState
+from src.observers import NullObserver
+from src.structured_output import ACTION_MODE_STRUCTURED, ACTION_MODE_TEXT
+
+
+class LooseClient(ScriptedClient):
+    """A provider that returns JSON but doesn't enforce the schema"""
+
+    async def stream(self, system_message: str, response_format=None, **request_options):
+        if response_format is not None:
+            response_format = {**response_format, "json_schema": {**response_format["json_schema"], "strict": False}}
+        async for chunk in super().stream(system_message, response_format=response_format, **request_options):
+            yield chunk
+
+
+async def play(num_players: int, num_games: int, client_class, action_mode: str, chunk_delay: float,
+               mistake_probability: float, timeout: float) -> dict:
+    totals = {"games": 0, "turns": 0, "streams": 0, "invalid": 0, "repaired": 0, "seconds": 0.0}
+    for seed in range(num_games):
+        client = client_class(seed, chunk_delay, challenge_probability=0.2, mistake_probability=mistake_probability)
+        game = GameState(num_players, llm_client=client, observer=NullObserver(), seed=seed, coalesce_window=0.05,
+                         action_mode=action_mode)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(game.run(), timeout)
+        except asyncio.TimeoutError:
+            continue
+        totals["games"] += 1
+        totals["seconds"] += time.perf_counter() - start
+        totals["turns"] += game.current_turn
+        totals["streams"] += game.llm_calls.started
+        totals["invalid"] += sum(game.telemetry.invalid_actions.values())
+        totals["repaired"] += sum(game.telemetry.repaired_actions.values())
+    return totals
+
+
+def report(name: str, totals: dict):
+    games = max(totals["games"], 1)
+    turns = max(totals["turns"], 1)
+    print(f"{name:<12} {totals['games']:>5} {totals['turns'] / games:>6.1f} {totals['invalid'] / games:>13.2f} "
+          f"{totals['repaired'] / games:>14.2f} {totals['streams'] / turns:>13.2f} "
+          f"{totals['seconds'] / turns * 1000:>10.1f}")
+
+
+async def main(num_players: int, num_games: int, chunk_delay: float, mistake_probability: float, timeout: float):
+    print(f"{'mode':<12} {'games':>5} {'turns':>6} {'retries/game':>13} {'repaired/game':>14} {'streams/turn':>13} "
+          f"{'ms/turn':>10}")
+    for name, client_class, action_mode in (("text", ScriptedClient, ACTION_MODE_TEXT),
+                                            ("loose", LooseClient, ACTION_MODE_STRUCTURED),
+                                            ("strict", ScriptedClient, ACTION_MODE_STRUCTURED)):
+        report(name, await play(num_players, num_games, client_class, action_mode, chunk_delay, mistake_probability,
+                                timeout))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    parser.add_argument("--mistake-probability", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a game after this many seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.players, args.games, args.chunk_delay, args.mistake_probability, args.timeout))
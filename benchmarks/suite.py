@@ -0,0 +1,275 @@
+"""
+Regression suite for the hot paths of a game: parsing an agent's stream with Agent.process_stream, recording a message
+with receive_message and building the prompt for it, one engine step of GameState.handle_message, swap_card on the
+deck, rendering the end of turn table from generate_player_summary_table and full LLM games per second against the
+ScriptedClient (no network, no delays).
+
+Every case runs `--repeats` times and the best run is kept, which is less noisy than the median on a busy machine.
+A fixed pure Python workload is timed alongside and the baseline is scaled by how much slower or faster it runs now
+than when the baseline was saved. `--save` stores the results as the baseline and `--compare` (the default) prints
+each result next to the baseline and exits with status 1 when one is worse by more than `--threshold`. The scaling
+only evens out load on the same machine, save a new baseline before comparing on another one.
+
+Run from the repo root:
+    python -m benchmarks.suite --save
+    python -m benchmarks.suite --compare --threshold 0.2
+    python -m benchmarks.suite --cases stream_parse table_render
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from rich.console import Console
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.agent import Agent
+from src.beliefs import BeliefTracker
+from src.datatypes import SpeechMessage, TaskMessage, get_base_actions
+from src.game_state import POLICY_HEURISTIC, GameState
+from src.helper import name_list, personality_list
+from src.observers import NullObserver, generate_player_summary_table
+from src.policies import Policy
+from src.prompt_builder import PromptBuilder
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+NUM_PLAYERS = 6
+
+
+class Case(NamedTuple):
+    unit: str
+    higher_is_better: bool
+    run: Callable[[], float]
+
+
+def make_game(num_players: int = NUM_PLAYERS) -> GameState:
+    """A dealt game that isn't running, with agents whose policies do nothing"""
+    game = GameState(num_players, observer=NullObserver(), seed=0)
+    game.rng.shuffle(game.deck)
+    for i in range(num_players):
+        player = Agent(name=name_list[i], personality=personality_list[i], game_state=game, coins=2,
+                       cards=[game.deck.pop(), game.deck.pop()])
+        player.policy = Policy(player)
+        game.players.append(player)
+    game.beliefs = BeliefTracker([player.name for player in game.players], [player.cards for player in game.players])
+    return game
+
+
+async def chunked(text: str, size: int = 4):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def stream_parse(num_streams: int = 10) -> float:
+    """Characters per second through process_stream, about 4 characters per chunk"""
+    segments = []
+    for i in range(300):
+        segments.append(f"THOUGHT: {name_list[i % NUM_PLAYERS]} claimed the Duke twice, I think they are bluffing.")
+        segments.append(f"SPEECH: Nobody here has a Captain, message number {i}.")
+    text = "\n".join(segments) + "\nACTION: INCOME\nEND"
+
+    async def run() -> float:
+        agent = make_game().players[0]
+        start = time.perf_counter()
+        for _ in range(num_streams):
+            await agent.process_stream(chunked(text), ["INCOME"])
+        return time.perf_counter() - start
+
+    return num_streams * len(text) / asyncio.run(run()) / 1e6
+
+
+def receive_prompt(num_messages: int = 500) -> float:
+    """Microseconds to record a speech in every agent's memory and build each of their prompts"""
+    game = make_game()
+    builders = {player.name: PromptBuilder(player.name, player.personality) for player in game.players}
+    game.players[0].tasks = [TaskMessage(content="It is your turn. Choose an action to perform.",
+                                         expected_actions=get_base_actions())]
+
+    async def run() -> float:
+        start = time.perf_counter()
+        for i in range(num_messages):
+            message = SpeechMessage(content=f"message number {i} about who has the Duke",
+                                    sender=game.players[i % NUM_PLAYERS].name)
+            for player in game.players:
+                await player.receive_message(message)
+                builders[player.name].build(player)
+        return time.perf_counter() - start
+
+    return asyncio.run(run()) / (num_messages * NUM_PLAYERS) * 1e6
+
+
+def engine_step(num_games: int = 20) -> float:
+    """Microseconds per message handled by the engine, in heuristic games"""
+    async def run() -> float:
+        handled, seconds = 0, 0.0
+        for seed in range(num_games):
+            game = GameState(NUM_PLAYERS, observer=NullObserver(), seed=seed, policy=POLICY_HEURISTIC)
+            await game.run()
+            handled += game.messages_handled
+            seconds += game.engine_seconds
+        return seconds / handled
+
+    return asyncio.run(run()) * 1e6
+
+
+def swap_card(num_swaps: int = 20000) -> float:
+    """Microseconds per swap_card, which also updates the card beliefs"""
+    game = make_game()
+    start = time.perf_counter()
+    for i in range(num_swaps):
+        player = game.players[i % NUM_PLAYERS]
+        game.swap_card(player, player.cards[0])
+    return (time.perf_counter() - start) / num_swaps * 1e6
+
+
+def table_render(num_tables: int = 200) -> float:
+    """Microseconds to build and render the end of turn table"""
+    game = make_game()
+    game.players[-1].is_active = False
+    console = Console(file=io.StringIO(), width=120, color_system="truecolor")
+    start = time.perf_counter()
+    for i in range(num_tables):
+        console.print(generate_player_summary_table(game.players, i % NUM_PLAYERS), justify="center")
+    return (time.perf_counter() - start) / num_tables * 1e6
+
+
+def scripted_games(num_games: int = 10, timeout: float = 60.0) -> float:
+    """Full LLM games per second, the model replaced by the ScriptedClient without chunk delays"""
+    async def run() -> float:
+        finished = 0
+        start = time.perf_counter()
+        for seed in range(num_games):
+            client = ScriptedClient(seed, chunk_delay=0.0, challenge_probability=0.2)
+            game = GameState(NUM_PLAYERS, llm_client=client, observer=NullObserver(), seed=seed, coalesce_window=0.0)
+            try:
+                await asyncio.wait_for(game.run(), timeout)
+                finished += 1
+            except asyncio.TimeoutError:
+                pass
+        return finished / (time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+CASES: Dict[str, Case] = {
+    "stream_parse": Case("M chars/s", True, stream_parse),
+    "receive_prompt": Case("us/message", False, receive_prompt),
+    "engine_step": Case("us/message", False, engine_step),
+    "swap_card": Case("us/swap", False, swap_card),
+    "table_render": Case("us/table", False, table_render),
+    "scripted_games": Case("games/s", True, scripted_games),
+}
+
+
+def calibration(num_items: int = 20000) -> float:
+    """Microseconds for a fixed pure Python workload, how fast the machine is running right now"""
+    start = time.perf_counter()
+    counts: Dict[int, int] = {}
+    for i in range(num_items):
+        counts[i * 7919 % 1009] = counts.get(i * 7919 % 1009, 0) + 1
+    sorted(str(i) for i in range(num_items))
+    return (time.perf_counter() - start) * 1e6
+
+
+def run_cases(names: List[str], repeats: int) -> Tuple[Dict[str, dict], float]:
+    """
+    The best result of every case and of the calibration. The repeats take turns, so a slow spell of the machine hits
+    one repeat of every case instead of every repeat of one case.
+    """
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    calibrations = []
+    for _ in range(repeats):
+        calibrations.append(calibration())
+        for name in names:
+            samples[name].append(CASES[name].run())
+
+    results = {}
+    for name in names:
+        case = CASES[name]
+        results[name] = {"value": max(samples[name]) if case.higher_is_better else min(samples[name]),
+                         "unit": case.unit}
+        print(f"{name:<15} {results[name]['value']:>12.3f} {case.unit}", file=sys.stderr)
+    return results, min(calibrations)
+
+
+def regression(name: str, value: float, baseline: float, speed: float = 1.0) -> float:
+    """
+    How much worse `value` is than the baseline, as a fraction (negative when it is better). `speed` is how much
+    slower the machine runs than when the baseline was saved, the baseline is scaled by it.
+    """
+    if CASES[name].higher_is_better:
+        return baseline / speed / value - 1 if value else float("inf")
+    return value / (baseline * speed) - 1 if baseline else 0.0
+
+
+def compare(results: Dict[str, dict], calibrated: float, baseline: dict, threshold: float) -> List[str]:
+    """Prints the comparison report and returns the cases that regressed"""
+    speed = calibrated / baseline["calibration"] if baseline.get("calibration") else 1.0
+    print(f"baseline saved {baseline['saved']} with Python {baseline['python']} on {baseline['machine']}, "
+          f"the machine runs {speed:.2f}x as slow now and the baseline is scaled by it")
+    print(f"{'case':<15} {'baseline':>12} {'current':>12} {'unit':<11} {'worse by':>9}")
+    regressed = []
+    for name, result in results.items():
+        saved = baseline["results"].get(name)
+        if saved is None:
+            print(f"{name:<15} {'-':>12} {result['value']:>12.3f} {result['unit']:<11} {'new':>9}")
+            continue
+        worse = regression(name, result["value"], saved["value"], speed)
+        status = ""
+        if worse > threshold:
+            status = "  REGRESSION"
+            regressed.append(name)
+        elif worse < -threshold:
+            status = "  faster"
+        print(f"{name:<15} {saved['value']:>12.3f} {result['value']:>12.3f} {result['unit']:<11} "
+              f"{worse:>+9.0%}{status}")
+    return regressed
+
+
+def main(names: List[str], repeats: int, save: bool, threshold: float, path: str) -> int:
+    results, calibrated = run_cases(names, repeats)
+
+    if save:
+        baseline = {"saved": time.strftime("%Y-%m-%d"), "python": platform.python_version(),
+                    "machine": platform.machine(), "repeats": repeats, "calibration": calibrated, "results": results}
+        if os.path.exists(path):
+            with open(path) as f:
+                # Keep the cases that weren't run this time
+                baseline["results"] = {**json.load(f)["results"], **results}
+        with open(path, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"saved baseline to {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"no baseline at {path}, run with --save first")
+        return 0
+    with open(path) as f:
+        baseline = json.load(f)
+    regressed = compare(results, calibrated, baseline, threshold)
+    if regressed:
+        print(f"{len(regressed)} regressed by more than {threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=str, nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeats", type=int, default=5)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    mode.add_argument("--compare", action="store_true", help="Compare against the baseline (the default)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Fraction by which a case may be worse than its baseline before it counts as a regression")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    sys.exit(main(args.cases, args.repeats, args.save, args.threshold, args.baseline))
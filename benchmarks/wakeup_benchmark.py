@@ -0,0 +1,62 @@
+"""
+LLM streams started, cancelled and completed per game for different coalescing windows, with the chatty
+ScriptedClient so that speeches arrive in bursts.
+
+A window of 0 responds to every message as soon as the agent's scheduler gets to run, which is closest to the old
+interrupt-and-restart-per-message behaviour.
+
+Run from the repo root:
+    python -m benchmarks.wakeup_benchmark --games 5 --windows 0 0.05 0.25
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.game_state import GameState
+from src.observers import NullObserver
+from src.scheduler import LLMCallStats
+
+
+async def play(num_players: int, seed: int, window: float, timeout: float) -> GameState:
+    game = GameState(num_players, llm_client=ScriptedClient(seed), observer=NullObserver(), seed=seed,
+                     coalesce_window=window)
+    try:
+        await asyncio.wait_for(game.run(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return game
+
+
+async def main(num_players: int, num_games: int, windows, timeout: float):
+    print(f"{'window':>8} {'started':>9} {'cancelled':>10} {'completed':>10} {'turns':>7} {'won':>5} {'s/game':>8} "
+          f"{'interrupt ms/turn':>18}")
+    for window in windows:
+        total = LLMCallStats()
+        turns = won = 0
+        start = time.perf_counter()
+        for seed in range(num_games):
+            game = await play(num_players, seed, window, timeout)
+            total.started += game.llm_calls.started
+            total.cancelled += game.llm_calls.cancelled
+            total.completed += game.llm_calls.completed
+            total.interrupt_seconds += game.llm_calls.interrupt_seconds
+            turns += game.current_turn
+            won += game.winner is not None
+        elapsed = time.perf_counter() - start
+
+        print(f"{window:>8.2f} {total.started / num_games:>9.1f} {total.cancelled / num_games:>10.1f} "
+              f"{total.completed / num_games:>10.1f} {turns / num_games:>7.1f} {won:>5} {elapsed / num_games:>8.2f} "
+              f"{total.interrupt_seconds * 1000 / max(turns, 1):>18.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 0.05, 0.25])
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a game after this many seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.players, args.games, args.windows, args.timeout))
@@ -1,29 +1,299 @@
+import argparse
 import asyncio
+import json
+import random
 import sys
+from typing import List, Optional
 
-from src.game_state import GameState
+from src.game_state import POLICIES, POLICY_LLM, GameState
+from src.llm_batch import BATCH_BACKENDS, BatchClient, LocalBatchBackend
+from src.llm_cache import PACING_MODES, PACING_ZERO, CachedClient
+from src.llm_client import OPENAI_BASE_URL
+from src.llm_factory import create_llm_client
+from src.llm_scheduler import RequestScheduler
+from src.observers import ConsoleObserver, GameObserver, NullObserver, ObserverGroup
 from src.print_utils import print_prompt, print_text
+from src.recording import ActionRecorder, GameRecording, RecordingClient, ReplayClient
+from src.structured_output import ACTION_MODE_TEXT, ACTION_MODES
+from src.telemetry import write_prometheus
+from src.tournament import ROTATION_MODES, run_tournament, schedule_games
 
 
-async def main():
-    while True:
-        num_players = print_prompt("Enter the number of players (2-6)")
-        if num_players.isdigit() and 2 <= int(num_players) <= 6:
-            break
-        print_prompt("Invalid input. Please enter a number between 2 and 6.")
+def add_llm_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-cache", type=str, default=None,
+                        help="Cache LLM responses in this SQLite file and replay identical prompts from it")
+    parser.add_argument("--llm-cache-pacing", choices=PACING_MODES, default=PACING_ZERO,
+                        help="Replay cached streams instantly or with their recorded timing")
+    parser.add_argument("--llm-cache-max-mb", type=int, default=256,
+                        help="Evict least recently used responses above this size")
+    parser.add_argument("--base-url", type=str, default=None,
+                        help=f"OpenAI-compatible endpoint, e.g. a local src.mock_server. Defaults to $OPENAI_BASE_URL "
+                             f"or {OPENAI_BASE_URL}")
+    parser.add_argument("--requests-per-minute", type=float, default=None,
+                        help="Hold LLM requests back on the client to stay under the provider's request rate limit")
+    parser.add_argument("--tokens-per-minute", type=float, default=None,
+                        help="Hold LLM requests back on the client to stay under the provider's token rate limit")
+    parser.add_argument("--max-concurrent-requests", type=int, default=None,
+                        help="Most LLM streams open at once, the ones answering a task are let through first")
+    parser.add_argument("--batch", choices=BATCH_BACKENDS, default=None,
+                        help="Collect the LLM requests of all running games into batch files completed offline by this "
+                             "backend instead of streaming them, for throughput over latency. Headless games are then "
+                             "all played at once")
+    parser.add_argument("--batch-size", type=int, default=256, help="Most requests in one batch")
+    parser.add_argument("--batch-interval", type=float, default=5.0,
+                        help="Seconds a batch waits for more requests before it is sent")
+    parser.add_argument("--batch-dir", type=str, default=None,
+                        help="Keep the batch request and output files here (a temporary directory by default)")
+    parser.add_argument("--batch-skip-chatter", action="store_true",
+                        help="Don't request chatter of agents without a task in batch mode")
 
-    game = GameState(int(num_players))
-    await game.setup_game()
 
+def add_game_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--coalesce-window", type=float, default=0.25,
+                        help="Seconds agents wait for more messages before responding to chatter")
+    parser.add_argument("--policy", choices=POLICIES, nargs="+", default=[POLICY_LLM],
+                        help="How agents decide: stream from the LLM, rule-based heuristics or tree search without any "
+                             "LLM calls. Give one per seat to mix them")
+    parser.add_argument("--action-mode", choices=ACTION_MODES, default=ACTION_MODE_TEXT,
+                        help="LLM agents answer in SPEECH/THOUGHT/ACTION lines or with JSON constrained by a schema of "
+                             "their legal actions, repaired locally instead of retried when it is a near miss")
+
+
+def add_common_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--players", type=int, choices=range(2, 7), metavar="{2-6}",
+                        help="Number of players (asked interactively if omitted, 4 in headless games and tournaments)")
+    parser.add_argument("--games", type=int, default=None,
+                        help="Number of games to play, headless or in a tournament (1 and 100 by default)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the first game, incremented per game")
+    parser.add_argument("--output", type=str, default=None, help="Write one JSON result per game to this file")
+    parser.add_argument("--metrics", type=str, default=None,
+                        help="Write the games' timings and token counts to this file in the Prometheus text format")
+    add_game_arguments(parser)
+    add_llm_arguments(parser)
+
+
+def game_options(args) -> dict:
+    return {"coalesce_window": args.coalesce_window, "action_mode": args.action_mode,
+            "policy": args.policy[0] if len(args.policy) == 1 else args.policy}
+
+
+def llm_options(args) -> dict:
+    options = {
+        "cache_path": args.llm_cache,
+        "cache_pacing": args.llm_cache_pacing,
+        "cache_max_bytes": args.llm_cache_max_mb * 1024 * 1024,
+    }
+    if args.base_url:
+        options["base_url"] = args.base_url
+    for limit in ("requests_per_minute", "tokens_per_minute", "max_concurrent_requests"):
+        if getattr(args, limit):
+            options[limit] = getattr(args, limit)
+    if args.batch:
+        options.update(batch_backend=args.batch, batch_size=args.batch_size, batch_interval=args.batch_interval,
+                       batch_dir=args.batch_dir, batch_skip_chatter=args.batch_skip_chatter)
+    return options
+
+
+def report_llm_client(llm_client):
+    if isinstance(llm_client, CachedClient):
+        stats = llm_client.cache.stats()
+        print_text(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), "
+                   f"{stats['evictions']} evictions, {stats['bytes'] / 1024:.0f} KB", style="bold", stderr=True)
+        llm_client = llm_client.client
+    if isinstance(llm_client, BatchClient):
+        stats = llm_client.stats()
+        print_text(f"LLM batches: {stats['requests']} requests in {stats['batches']} batches "
+                   f"({stats['mean_batch_size']:.1f} per batch, {stats['mean_batch_seconds']:.1f} s each), "
+                   f"{stats['dropped']} dropped before sending, {stats['discarded']} discarded, "
+                   f"{stats['skipped']} chatter skipped, {stats['failed']} failed"
+                   f"{'' if llm_client.temporary else ', files in ' + llm_client.directory}", style="bold", stderr=True)
+        llm_client = llm_client.backend.client if isinstance(llm_client.backend, LocalBatchBackend) else None
+    if isinstance(llm_client, RequestScheduler):
+        stats = llm_client.stats()
+        waits = ", ".join(f"{name} {values['granted']} (p95 wait {values['wait_seconds']['p95']:.2f} s, "
+                          f"peak queue {values['peak_queued']})" for name, values in stats["classes"].items())
+        print_text(f"LLM scheduler: {waits}, {stats['throttled']} throttled, "
+                   f"mean queue depth {stats['mean_queue_depth']:.1f}", style="bold", stderr=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="The Resistance: Coup played by LLM agents")
+    parser.add_argument("--headless", action="store_true", help="Run without any console rendering")
+    parser.add_argument("--record", type=str, default=None, help="Record the game's LLM streams and actions to a file")
+    parser.add_argument("--replay", type=str, default=None, help="Replay a recorded game without calling the LLM")
+    add_common_arguments(parser)
+
+    # The common options may also follow the subcommand. Without defaults there, the ones given before it are kept
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_arguments(common)
+    for action in common._actions:
+        action.default = argparse.SUPPRESS
+
+    subparsers = parser.add_subparsers(dest="command")
+    tournament = subparsers.add_parser("tournament", parents=[common],
+                                       help="Play many headless games on a process pool")
+    tournament.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    tournament.add_argument("--games-per-loop", type=int, default=8,
+                            help="Games played concurrently on each worker's event loop")
+    tournament.add_argument("--rotation", choices=ROTATION_MODES, default="rotate",
+                            help="How personalities are assigned to seats")
+    tournament.add_argument("--timeout", type=float, default=None, help="Give up on a game after this many seconds")
+
+    return parser.parse_args()
+
+
+def write_metrics(path: Optional[str], results: List[dict]):
+    """The telemetry of every finished game in the Prometheus text format, labelled with the game and its seed"""
+    if not path:
+        return
+    games = []
+    for result in results:
+        if "telemetry" in result:
+            labels = {"game": result.get("game", result.get("game_id"))}
+            if result["seed"] is not None:
+                labels["seed"] = result["seed"]
+            games.append((labels, result["telemetry"]))
+    write_prometheus(path, games)
+
+
+async def run_headless(num_players: int, num_games: int, seed, output_path, metrics_path, options: dict,
+                       game_kwargs: dict):
+    output = open(output_path, "w") if output_path else sys.stdout
+    results = []
+
+    async def play(llm_client, game_index: int):
+        game_seed = seed + game_index if seed is not None else None
+        game = GameState(num_players, llm_client=llm_client, observer=NullObserver(), seed=game_seed, **game_kwargs)
+        await game.run()
+
+        result = {"game": game_index, **game.result()}
+        results.append(result)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
 
-if __name__ == "__main__":
     try:
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print_text("GAME OVER", rainbow=True)
-        sys.exit(130)
+        async with create_llm_client(**options) as llm_client:
+            if options.get("batch_backend"):
+                # A batch only fills up with the requests of many games waiting on it, so they are played at once
+                await asyncio.gather(*[play(llm_client, game_index) for game_index in range(num_games)])
+            else:
+                for game_index in range(num_games):
+                    await play(llm_client, game_index)
+
+            report_llm_client(llm_client)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        write_metrics(metrics_path, results)
 
 
+def run_tournament_command(args):
+    num_games = args.games if args.games is not None else 100
+    specs = schedule_games(num_games, args.players or 4, rotation=args.rotation, seed=args.seed)
+    output = open(args.output, "w") if args.output else None
+    results = []
 
+    def write_result(result):
+        results.append(result)
+        if output:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
 
+    try:
+        result = run_tournament(specs, workers=args.workers, games_per_loop=args.games_per_loop,
+                                llm_options=llm_options(args), game_options=game_options(args),
+                                timeout=args.timeout,
+                                on_result=write_result)
+    finally:
+        if output:
+            output.close()
+        write_metrics(args.metrics, results)
+
+    print_text(f"Played {result.games_played} games ({result.games_unfinished} unfinished, "
+               f"{result.games_failed} failed)", style="bold")
+    for personality, stats in sorted(result.personalities.items(), key=lambda item: -item[1].win_rate):
+        print_text(f"{stats.win_rate:6.1%} ({stats.wins}/{stats.games})  {personality.split(':')[0]}")
+    print_text(f"Wins per seat: {result.seat_wins}")
+
+
+async def record_game(num_players: int, seed, path: str, observer: GameObserver, options: dict, game_kwargs: dict):
+    # A recording is only replayable with a known seed
+    seed = seed if seed is not None else random.randrange(2 ** 32)
+    recording = GameRecording(seed=seed, num_players=num_players)
+
+    async with create_llm_client(**options) as llm_client:
+        game = GameState(num_players,
+                         llm_client=RecordingClient(llm_client, recording),
+                         observer=ObserverGroup([observer, ActionRecorder(recording)]),
+                         seed=seed,
+                         **game_kwargs)
+        await game.run()
+        report_llm_client(llm_client)
+
+    recording.save(path)
+    print_text(f"Recorded {len(recording.actions)} actions and {len(recording.events)} stream events to {path}")
+
+
+async def replay_game(path: str, observer: GameObserver, game_kwargs: dict):
+    recording = GameRecording.load(path)
+    replayed = GameRecording(seed=recording.seed, num_players=recording.num_players)
+
+    game = GameState(recording.num_players,
+                     llm_client=ReplayClient(recording),
+                     observer=ObserverGroup([observer, ActionRecorder(replayed)]),
+                     seed=recording.seed,
+                     **game_kwargs)
+    await game.run()
+
+    if replayed.actions == recording.actions:
+        print_text(f"Replay matches the recording ({len(replayed.actions)} actions)", style="bold green")
+    else:
+        print_text(f"Replay diverged from the recording: {len(replayed.actions)} actions replayed, "
+                   f"{len(recording.actions)} recorded", style="bold red")
+
+
+async def main(args):
+    if args.replay:
+        await replay_game(args.replay, NullObserver() if args.headless else ConsoleObserver(), game_options(args))
+        return
+
+    if args.headless and not args.record:
+        num_games = args.games if args.games is not None else 1
+        await run_headless(args.players or 4, num_games, args.seed, args.output, args.metrics, llm_options(args),
+                           game_options(args))
+        return
+
+    num_players = args.players
+    if args.headless:
+        num_players = num_players or 4
+    while num_players is None:
+        response = print_prompt("Enter the number of players (2-6)")
+        if response.isdigit() and 2 <= int(response) <= 6:
+            num_players = int(response)
+        else:
+            print_prompt("Invalid input. Please enter a number between 2 and 6.")
+
+    if args.record:
+        observer = NullObserver() if args.headless else ConsoleObserver()
+        await record_game(num_players, args.seed, args.record, observer, llm_options(args), game_options(args))
+        return
+
+    async with create_llm_client(**llm_options(args)) as llm_client:
+        game = GameState(num_players, llm_client=llm_client, seed=args.seed, **game_options(args))
+        await game.run()
+        report_llm_client(llm_client)
+    write_metrics(args.metrics, [{"game": 0, **game.result()}])
+
+
+if __name__ == "__main__":
+    try:
+        if sys.platform == "win32":
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        args = parse_args()
+        if args.command == "tournament":
+            run_tournament_command(args)
+        else:
+            asyncio.run(main(args))
+    except KeyboardInterrupt:
+        print_text("GAME OVER", rainbow=True)
+        sys.exit(130)
@@ -0,0 +1,364 @@
+"""
+Vectorized Coup simulator that advances many independent games in lockstep.
+
+Every call to `BatchSimulator.step()` plays one full turn (action, challenge, counter, challenge of the counter,
+discards and exchange) in every unfinished game using NumPy arrays, following the same resolution order as
+`GameState.handle_action`. Decisions come from scripted `BatchPolicy` objects, one per seat, which are asked once per
+seat for all games at a time.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src import rules
+from src.datatypes import Card
+from src.rules import MANDATORY_COUP_COINS
+
+BASE_ACTIONS = rules.actions(rules.BASE)
+INCOME, FOREIGN_AID, COUP, TAX, ASSASSINATE, EXCHANGE, STEAL = range(len(BASE_ACTIONS))
+
+NUM_CARD_TYPES = len(Card)
+CARDS_PER_TYPE = 3
+STARTING_TREASURY = 50
+NO_CARD = -1
+NO_PLAYER = -1
+
+
+def _card_index(card: Optional[Card]) -> int:
+    return card.value - 1 if card else NO_CARD
+
+
+# Card claimed to perform / counter each base action, indexed by action code
+ACTION_CLAIM = np.array([_card_index(rules.CLAIMS.get(a)) for a in BASE_ACTIONS], dtype=np.int8)
+COUNTER_CLAIM = np.array([_card_index(rules.COUNTER_CLAIMS.get(a)) for a in BASE_ACTIONS], dtype=np.int8)
+TARGETED = np.array([rules.requires_target(a) for a in BASE_ACTIONS])
+ACTION_COST = np.array([rules.COSTS.get(a, 0) for a in BASE_ACTIONS], dtype=np.int16)
+# Which base actions are legal with 0 to MANDATORY_COUP_COINS coins, more coins use the last row
+LEGAL_BY_COINS = np.array([[rules.is_legal(a, rules.PHASE_ACTION, coins) for a in BASE_ACTIONS]
+                           for coins in range(MANDATORY_COUP_COINS + 1)])
+
+
+class BatchPolicy:
+    """
+    Scripted decisions for one seat across many games. `games` is always an index array into the simulator and the
+    return values are aligned with it. The default implementation plays uniformly at random.
+    """
+
+    def __init__(self, challenge_rate: float = 0.1, counter_rate: float = 0.2):
+        self.challenge_rate = challenge_rate
+        self.counter_rate = counter_rate
+
+    def choose_action(self, sim: "BatchSimulator", games: np.ndarray, player: int) -> Tuple[np.ndarray, np.ndarray]:
+        legal = sim.legal_action_mask(games, player)
+        scores = np.where(legal, sim.rng.random(legal.shape), -1.0)
+        actions = scores.argmax(axis=1)
+        targets = sim.random_target(games, player, require_coins=actions == STEAL)
+        return actions, targets
+
+    def wants_challenge(self, sim: "BatchSimulator", games: np.ndarray, player: int, claimant: np.ndarray,
+                        card: np.ndarray) -> np.ndarray:
+        return sim.rng.random(len(games)) < self.challenge_rate
+
+    def wants_counter(self, sim: "BatchSimulator", games: np.ndarray, player: int, actor: np.ndarray,
+                      action: np.ndarray) -> np.ndarray:
+        return sim.rng.random(len(games)) < self.counter_rate
+
+    def choose_discard(self, sim: "BatchSimulator", games: np.ndarray, player: int) -> np.ndarray:
+        """Slot (0 or 1) of the card to lose, must be a slot that still holds a card"""
+        hands = sim.hands[games, player]
+        first = sim.rng.random(len(games)) < 0.5
+        slot = np.where(first, 0, 1)
+        return np.where(hands[np.arange(len(games)), slot] >= 0, slot, 1 - slot)
+
+    def exchange_scores(self, sim: "BatchSimulator", games: np.ndarray, player: int,
+                        candidates: np.ndarray) -> np.ndarray:
+        """Score the candidate cards of an exchange, the highest scored cards are kept"""
+        return sim.rng.random(candidates.shape)
+
+
+class RandomPolicy(BatchPolicy):
+    pass
+
+
+class HonestPolicy(BatchPolicy):
+    """Never bluffs or challenges, only counters with the right card and coups as soon as it can"""
+
+    def choose_action(self, sim, games, player):
+        hands = sim.hands[games, player]
+        coins = sim.coins[games, player]
+        has = (hands[:, :, None] == np.arange(NUM_CARD_TYPES)).any(axis=1)
+        steal_target = sim.random_target(games, player, require_coins=np.ones(len(games), dtype=bool))
+
+        actions = np.full(len(games), FOREIGN_AID)
+        actions = np.where(has[:, ACTION_CLAIM[EXCHANGE]], EXCHANGE, actions)
+        actions = np.where(has[:, ACTION_CLAIM[STEAL]] & (steal_target >= 0), STEAL, actions)
+        actions = np.where(has[:, ACTION_CLAIM[TAX]], TAX, actions)
+        actions = np.where(has[:, ACTION_CLAIM[ASSASSINATE]] & (coins >= ACTION_COST[ASSASSINATE]), ASSASSINATE,
+                           actions)
+        actions = np.where(coins >= ACTION_COST[COUP], COUP, actions)
+
+        targets = np.where(actions == STEAL, steal_target,
+                           sim.random_target(games, player, require_coins=np.zeros(len(games), dtype=bool)))
+        return actions, targets
+
+    def wants_challenge(self, sim, games, player, claimant, card):
+        return np.zeros(len(games), dtype=bool)
+
+    def wants_counter(self, sim, games, player, actor, action):
+        return (sim.hands[games, player] == COUNTER_CLAIM[action][:, None]).any(axis=1)
+
+
+class BatchSimulator:
+    def __init__(self, num_games: int, num_players: int, policies: Sequence[BatchPolicy] = None,
+                 seed: Optional[int] = None):
+        self.num_games = num_games
+        self.num_players = num_players
+        self.policies: List[BatchPolicy] = list(policies) if policies else [RandomPolicy()] * num_players
+        if len(self.policies) != num_players:
+            raise ValueError(f"Expected {num_players} policies, got {len(self.policies)}")
+
+        self.rng = np.random.default_rng(seed)
+
+        # Deal two cards per player from a shuffled deck per game
+        deck = np.repeat(np.arange(NUM_CARD_TYPES, dtype=np.int8), CARDS_PER_TYPE)
+        shuffled = self.rng.permuted(np.tile(deck, (num_games, 1)), axis=1)
+        dealt = num_players * 2
+
+        self.hands = shuffled[:, :dealt].reshape(num_games, num_players, 2).copy()  # card index, NO_CARD once lost
+        self.deck = (shuffled[:, dealt:, None] == np.arange(NUM_CARD_TYPES)).sum(axis=1).astype(np.int8)
+        self.coins = np.full((num_games, num_players), 1 if num_players == 2 else 2, dtype=np.int16)
+        self.treasury = np.full(num_games, STARTING_TREASURY - num_players * 2, dtype=np.int16)
+
+        self.turn = np.zeros(num_games, dtype=np.int32)
+        self.turn_player = np.zeros(num_games, dtype=np.int8)
+        self.winner = np.full(num_games, NO_PLAYER, dtype=np.int8)
+
+    # Queries used by policies
+
+    def active_mask(self, games: np.ndarray) -> np.ndarray:
+        return (self.hands[games] >= 0).any(axis=2)
+
+    def legal_action_mask(self, games: np.ndarray, player: int) -> np.ndarray:
+        coins = self.coins[games, player]
+        legal = LEGAL_BY_COINS[np.minimum(coins, MANDATORY_COUP_COINS)]
+        legal[:, STEAL] &= self.random_target(games, player, require_coins=np.ones(len(games), dtype=bool)) >= 0
+        return legal
+
+    def random_target(self, games: np.ndarray, player: int, require_coins: np.ndarray) -> np.ndarray:
+        """A random active opponent per game (with coins where require_coins), NO_PLAYER if there is none"""
+        valid = self.active_mask(games)
+        valid[:, player] = False
+        valid &= ~require_coins[:, None] | (self.coins[games] > 0)
+        scores = np.where(valid, self.rng.random(valid.shape), -1.0)
+        return np.where(valid.any(axis=1), scores.argmax(axis=1), NO_PLAYER)
+
+    # Simulation
+
+    def run(self, max_turns: int = 500) -> np.ndarray:
+        while (self.winner < 0).any() and self.turn.max() < max_turns:
+            self.step()
+        return self.winner
+
+    def win_counts(self) -> np.ndarray:
+        return np.bincount(self.winner[self.winner >= 0], minlength=self.num_players)
+
+    def step(self) -> int:
+        """Play one turn in every unfinished game, returns the number of games that were advanced"""
+        games = np.flatnonzero(self.winner < 0)
+        num = len(games)
+        if not num:
+            return 0
+
+        rows = np.arange(num)
+        actor = self.turn_player[games].astype(np.intp)
+        action, target = self._choose_actions(games, actor)
+
+        countered = np.zeros(num, dtype=bool)
+        settled = np.zeros(num, dtype=bool)  # a caught bluff skips the counter round
+        out = np.zeros((num, self.num_players), dtype=bool)  # lost their last card to a challenge of the action
+        losses = []
+
+        # Challenge on the claimed action
+        claim = ACTION_CLAIM[action]
+        eligible = self.active_mask(games) & (np.arange(self.num_players) != actor[:, None]) & (claim >= 0)[:, None]
+        action_challenger = self._first_willing(games, eligible, actor,
+                                                lambda policy, idx, p: policy.wants_challenge(
+                                                    self, games[idx], p, actor[idx], claim[idx]))
+        challenged = action_challenger >= 0
+        if challenged.any():
+            has_card = (self.hands[games, actor] == claim[:, None]).any(axis=1)
+
+            # A failed challenge still lets the others counter once the challenger has discarded, as in GameState
+            lost = challenged & has_card
+            self._swap_card(games[lost], actor[lost], claim[lost])
+            losses.append((lost, action_challenger))
+            last_card = (self.hands[games, np.maximum(action_challenger, 0)] >= 0).sum(axis=1) == 1
+            out[rows[lost & last_card], action_challenger[lost & last_card]] = True
+
+            caught = challenged & ~has_card
+            countered |= caught
+            losses.append((caught, actor))
+            settled |= caught
+
+        # Counter round, the challenger of the action already reacted and can't counter as well
+        counter_claim = COUNTER_CLAIM[action]
+        eligible = self.active_mask(games) & (np.arange(self.num_players) != actor[:, None])
+        eligible &= np.arange(self.num_players) != action_challenger[:, None]
+        eligible &= ((counter_claim >= 0) & ~settled)[:, None]
+        only_target = TARGETED[action]
+        eligible &= ~only_target[:, None] | (np.arange(self.num_players) == target[:, None])
+        counterer = self._first_willing(games, eligible, actor,
+                                        lambda policy, idx, p: policy.wants_counter(self, games[idx], p, actor[idx],
+                                                                                    action[idx]))
+        blocked = counterer >= 0
+        if blocked.any():
+            countered |= blocked
+            safe_counterer = np.where(blocked, counterer, 0)
+
+            # Challenge on the counter
+            eligible = self.active_mask(games) & ~out & (np.arange(self.num_players) != safe_counterer[:, None])
+            eligible &= blocked[:, None]
+            challenger = self._first_willing(games, eligible, safe_counterer,
+                                             lambda policy, idx, p: policy.wants_challenge(
+                                                 self, games[idx], p, safe_counterer[idx], counter_claim[idx]))
+            challenged = challenger >= 0
+            has_card = (self.hands[games, safe_counterer] == counter_claim[:, None]).any(axis=1)
+
+            lost = challenged & has_card
+            self._swap_card(games[lost], safe_counterer[lost], counter_claim[lost])
+            losses.append((lost, challenger))
+
+            caught = challenged & ~has_card
+            countered &= ~caught
+            losses.append((caught, safe_counterer))
+
+        self._do_actions(games, rows, actor, action, target, countered, losses)
+
+        for mask, players in losses:
+            if mask.any():
+                self._lose_influence(games[mask], players[mask].astype(np.intp))
+
+        self._end_turn(games, actor)
+        return num
+
+    def _choose_actions(self, games: np.ndarray, actor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        action = np.empty(len(games), dtype=np.intp)
+        target = np.empty(len(games), dtype=np.intp)
+        for p in range(self.num_players):
+            idx = np.flatnonzero(actor == p)
+            if len(idx):
+                action[idx], target[idx] = self.policies[p].choose_action(self, games[idx], p)
+
+        # Illegal choices fall back to INCOME, like an agent being told to pick another action
+        coins = self.coins[games, actor]
+        target_active = (self.hands[games, np.maximum(target, 0)] >= 0).any(axis=1)
+        bad_target = (target < 0) | (target >= self.num_players) | (target == actor) | ~target_active
+        illegal = TARGETED[action] & bad_target
+        illegal |= coins < ACTION_COST[action]
+        illegal |= (action == STEAL) & ~illegal & (self.coins[games, np.maximum(target, 0)] == 0)
+
+        action = np.where(illegal, INCOME, action)
+        target = np.where(TARGETED[action], target, NO_PLAYER)
+        return action, target
+
+    def _first_willing(self, games: np.ndarray, eligible: np.ndarray, start: np.ndarray, ask) -> np.ndarray:
+        """Ask every eligible seat, the first willing one in seat order after `start` wins. NO_PLAYER if none"""
+        willing = np.zeros_like(eligible)
+        for p in range(self.num_players):
+            idx = np.flatnonzero(eligible[:, p])
+            if len(idx):
+                willing[idx, p] = ask(self.policies[p], idx, p)
+
+        offsets = (start[:, None] + np.arange(1, self.num_players + 1)) % self.num_players
+        ordered = np.take_along_axis(willing, offsets, axis=1)
+        first = ordered.argmax(axis=1)
+        return np.where(ordered.any(axis=1), offsets[np.arange(len(games)), first], NO_PLAYER)
+
+    def _do_actions(self, games, rows, actor, action, target, countered, losses):
+        safe_target = np.maximum(target, 0)
+
+        gain = np.zeros(len(games), dtype=np.int16)
+        gain[action == INCOME] = 1
+        gain[(action == FOREIGN_AID) & ~countered] = 2
+        gain[(action == TAX) & ~countered] = 3
+        gain = np.minimum(gain, self.treasury[games])
+        self.treasury[games] -= gain
+        self.coins[games, actor] += gain
+
+        # ASSASSINATE pays even when countered, as in GameState.do_action
+        cost = ACTION_COST[action]
+        self.treasury[games] += cost
+        self.coins[games, actor] -= cost
+
+        steal = (action == STEAL) & ~countered
+        stolen = np.where(steal, np.minimum(2, self.coins[games, safe_target]), 0).astype(np.int16)
+        self.coins[games, safe_target] -= stolen
+        self.coins[games, actor] += stolen
+
+        hit = ((action == ASSASSINATE) & ~countered) | (action == COUP)
+        losses.append((hit, safe_target))
+
+        exchange = (action == EXCHANGE) & ~countered
+        if exchange.any():
+            self._exchange(games[exchange], actor[exchange])
+
+    def _draw_cards(self, games: np.ndarray) -> np.ndarray:
+        deck = self.deck[games]
+        pick = (self.rng.random(len(games)) * deck.sum(axis=1)).astype(np.int16)
+        cards = (deck.cumsum(axis=1) <= pick[:, None]).sum(axis=1)
+        self.deck[games, cards] -= 1
+        return cards.astype(np.int8)
+
+    def _swap_card(self, games: np.ndarray, players: np.ndarray, cards: np.ndarray):
+        """Same as GameState.swap_card: the revealed card goes back to the deck and a new one is drawn"""
+        if not len(games):
+            return
+        slot = (self.hands[games, players] == cards[:, None]).argmax(axis=1)
+        self.deck[games, cards] += 1
+        self.hands[games, players, slot] = self._draw_cards(games)
+
+    def _exchange(self, games: np.ndarray, players: np.ndarray):
+        hand = self.hands[games, players]
+        live = (hand >= 0).sum(axis=1)
+        candidates = np.concatenate([hand, self._draw_cards(games)[:, None], self._draw_cards(games)[:, None]], axis=1)
+
+        scores = np.empty(candidates.shape)
+        for p in range(self.num_players):
+            idx = np.flatnonzero(players == p)
+            if len(idx):
+                scores[idx] = self.policies[p].exchange_scores(self, games[idx], p, candidates[idx])
+        scores = np.where(candidates >= 0, scores, -np.inf)
+        ordered = np.take_along_axis(candidates, np.argsort(-scores, axis=1), axis=1)
+
+        self.hands[games, players, 0] = ordered[:, 0]
+        self.hands[games, players, 1] = np.where(live == 2, ordered[:, 1], NO_CARD)
+        for column in range(1, candidates.shape[1]):
+            returned = (column >= live) & (ordered[:, column] >= 0)
+            self.deck[games[returned], ordered[returned, column]] += 1
+
+    def _lose_influence(self, games: np.ndarray, players: np.ndarray):
+        alive = (self.hands[games, players] >= 0).any(axis=1)
+        games, players = games[alive], players[alive]
+
+        slot = np.empty(len(games), dtype=np.intp)
+        for p in range(self.num_players):
+            idx = np.flatnonzero(players == p)
+            if len(idx):
+                slot[idx] = self.policies[p].choose_discard(self, games[idx], p)
+
+        # discards go back to the deck, as in GameState.handle_action
+        cards = self.hands[games, players, slot]
+        self.deck[games, cards] += 1
+        self.hands[games, players, slot] = NO_CARD
+
+    def _end_turn(self, games: np.ndarray, actor: np.ndarray):
+        active = self.active_mask(games)
+        finished = active.sum(axis=1) == 1
+        self.winner[games[finished]] = active[finished].argmax(axis=1)
+
+        ongoing = ~finished
+        games, actor, active = games[ongoing], actor[ongoing], active[ongoing]
+        offsets = (actor[:, None] + np.arange(1, self.num_players + 1)) % self.num_players
+        following = np.take_along_axis(active, offsets, axis=1).argmax(axis=1)
+        self.turn_player[games] = offsets[np.arange(len(games)), following]
+        self.turn[games] += 1
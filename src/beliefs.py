@@ -0,0 +1,163 @@
+"""
+What every player can infer about the hidden cards of every other player.
+
+The tracker keeps a probability matrix `beliefs[observer, target, card]`: the chance that any one hidden card of
+`target` is `card`, as seen by `observer`. It is the product of two parts, normalized over the card types:
+  - the public evidence against each target, the same for every observer: claims make the claimed card more likely,
+    losing a challenge rules it out, and swapping or exchanging cards mixes part of the hand back towards a fresh draw;
+  - what each observer can't see, the 3 copies of every card minus the ones in their own hand.
+Each event only touches the rows it changes, with one numpy operation over all observers (or all targets), so
+updates are cheap and queries are a lookup. Discarded cards go back to the deck in this game, so revealing a card
+changes the target's influence but not the evidence.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from src.datatypes import Card
+from src.fast_state import CARDS, CARDS_PER_TYPE, NUM_CARD_TYPES, card_index
+from src.memory import PublicEvent
+
+
+def _normalize(weights: np.ndarray) -> np.ndarray:
+    total = weights.sum(axis=-1, keepdims=True)
+    return np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
+
+
+def _counts(cards: Iterable[Card]) -> np.ndarray:
+    counts = np.zeros(NUM_CARD_TYPES)
+    for card in cards:
+        counts[card_index(card)] += 1
+    return counts
+
+
+class BeliefView:
+    """The beliefs of one observer, handed to policies"""
+    __slots__ = ("tracker", "observer")
+
+    def __init__(self, tracker: "BeliefTracker", observer: int):
+        self.tracker = tracker
+        self.observer = observer
+
+    def chance(self, name: str, card: Card) -> float:
+        return self.tracker.chance(self.observer, self.tracker.index[name], card)
+
+    def probabilities(self, name: str) -> np.ndarray:
+        return self.tracker.beliefs[self.observer, self.tracker.index[name]]
+
+
+class BeliefTracker:
+    """
+    `claim_weight` is how much more likely a claimed card becomes, a lost challenge rules the card out completely.
+    """
+
+    def __init__(self, names: Sequence[str], hands: Sequence[Iterable[Card]], claim_weight: float = 3.0):
+        self.names = list(names)
+        self.index: Dict[str, int] = {name: seat for seat, name in enumerate(self.names)}
+        self.claim_weight = claim_weight
+
+        num_players = len(self.names)
+        self.hands = np.array([_counts(hand) for hand in hands]).reshape(num_players, NUM_CARD_TYPES)
+        self.influence = self.hands.sum(axis=1)
+        self.unseen = CARDS_PER_TYPE - self.hands  # [observer, card], copies the observer can't see
+        self.evidence = np.ones((num_players, NUM_CARD_TYPES))  # [target, card]
+        self.beliefs = np.empty((num_players, num_players, NUM_CARD_TYPES))
+
+        self._views: Dict[str, BeliefView] = {}
+        # Bumped on every change, used as a cache key by the prompt builder
+        self.version = 0
+        for observer in range(num_players):
+            self._update_observer(observer)
+
+    # Events
+
+    def observe(self, event: PublicEvent):
+        if event.kind == "claim":
+            self.claimed(event.player, event.card)
+        elif event.kind == "challenge":
+            if event.won:
+                self.caught(event.player, event.card)
+            else:
+                self.proved(event.player, event.card)
+
+    def claimed(self, name: str, card: Card):
+        target = self.index[name]
+        evidence = self.evidence[target]
+        evidence[card_index(card)] *= self.claim_weight
+        evidence /= evidence.max()  # only the ratios matter, this keeps repeated claims from overflowing
+        self._update_target(target)
+
+    def caught(self, name: str, card: Card):
+        """They were challenged and didn't have the card"""
+        target = self.index[name]
+        self.evidence[target, card_index(card)] = 0.0
+        self._update_target(target)
+
+    def proved(self, name: str, card: Card):
+        """They showed the card and swapped it for one from the deck, the engine sets their own hand with set_hand"""
+        target = self.index[name]
+        self._refresh(target, 1.0 / max(self.influence[target], 1))
+
+    def exchanged(self, name: str):
+        """They drew two cards and put two back"""
+        target = self.index[name]
+        self._refresh(target, 2.0 / (self.influence[target] + 2))
+
+    def set_hand(self, name: str, cards: Sequence[Card]):
+        """The player's own hand changed: a swap, a discard or an exchange"""
+        seat = self.index[name]
+        self.hands[seat] = _counts(cards)
+        self.influence[seat] = len(cards)
+        self.unseen[seat] = CARDS_PER_TYPE - self.hands[seat]
+        self._update_observer(seat)
+
+    # Queries
+
+    def chance(self, observer: int, target: int, card: Card) -> float:
+        """Chance that `target` holds at least one `card`, as seen by `observer`"""
+        influence = self.influence[target]
+        if not influence:
+            return 0.0
+        return 1.0 - (1.0 - float(self.beliefs[observer, target, card_index(card)])) ** influence
+
+    def view(self, name: str) -> BeliefView:
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = BeliefView(self, self.index[name])
+        return view
+
+    def summary(self, name: str, top: int = 3) -> str:
+        """The most likely cards of every opponent still in the game, one line each"""
+        observer = self.index[name]
+        influence = self.influence[:, None]
+        chances = np.where(influence > 0, 1.0 - (1.0 - self.beliefs[observer]) ** influence, 0.0)
+        lines: List[str] = []
+        for target, row in enumerate(chances):
+            if target == observer or not self.influence[target]:
+                continue
+            cards = sorted(range(NUM_CARD_TYPES), key=lambda card: -row[card])[:top]
+            likely = ", ".join(f"{CARDS[card].name} {row[card]:.0%}" for card in cards)
+            lines.append(f"{self.names[target]} ({int(self.influence[target])} cards): {likely}")
+        return "\n".join(lines)
+
+    # Updates
+
+    def _refresh(self, target: int, fresh: float):
+        """A `fresh` share of the target's hand was redrawn, so that much of the evidence is forgotten"""
+        evidence = self.evidence[target]
+        self.evidence[target] = (1.0 - fresh) * evidence / max(evidence.mean(), 1e-9) + fresh
+        self._update_target(target)
+
+    def _update_target(self, target: int):
+        """The evidence against `target` changed, for every observer at once"""
+        self.beliefs[:, target] = _normalize(self.evidence[target] * self.unseen)
+        self._own(target)
+
+    def _update_observer(self, observer: int):
+        """What `observer` can see changed, for every target at once"""
+        self.beliefs[observer] = _normalize(self.evidence * self.unseen[observer])
+        self._own(observer)
+
+    def _own(self, seat: int):
+        self.beliefs[seat, seat] = _normalize(self.hands[seat])
+        self.version += 1
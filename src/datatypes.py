@@ -32,6 +32,14 @@ def get_counter_actions():
     ]
 
 
+def get_reaction_actions():
+    return [
+        Action.CHALLENGE,
+        Action.COUNTER,
+        Action.PASS,
+    ]
+
+
 def get_discard_actions():
     return [
         Action.DISCARD,
@@ -53,6 +61,7 @@ class Action(Enum):
     NO_COUNTER = auto()
     DISCARD = auto()  # Removes 1 card
     DISCARD_TWO = auto()  # Removes 2 cards
+    PASS = auto()  # Neither challenge nor counter
 
 
 def get_all_actions() -> List[str]:
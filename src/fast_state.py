@@ -0,0 +1,397 @@
+"""
+Compact game state for fast rollouts.
+
+`FastState` mirrors the rules of `GameState.do_action`/`handle_action` without any agents, messages or pydantic
+models: hands and the deck are card counts indexed by `card_index`, everything is stored in tuples of small ints and
+`apply(move)` returns a new state. Unchanged tuples are shared between states, so copying and stepping is cheap.
+Claims, costs and legal actions are looked up in `src.rules`, which also defines the phases.
+"""
+import random
+from typing import List, NamedTuple, Tuple
+
+from src.datatypes import Action, Card
+from src.rules import (
+    BIT,
+    CHALLENGEABLE,
+    CLAIMS,
+    COSTS,
+    COUNTER_CLAIMS,
+    COUNTERABLE,
+    PHASE_ACTION,
+    PHASE_CHALLENGE_ACTION,
+    PHASE_CHALLENGE_COUNTER,
+    PHASE_COUNTER,
+    PHASE_DISCARD,
+    PHASE_EXCHANGE,
+    PHASE_OVER,
+    TARGETED,
+    legal_actions,
+)
+
+CARDS: Tuple[Card, ...] = tuple(Card)
+NUM_CARD_TYPES = len(CARDS)
+CARDS_PER_TYPE = 3
+STARTING_TREASURY = 50
+
+NO_PLAYER = -1
+NO_CARD = -1
+
+
+def card_index(card: Card) -> int:
+    return card.value - 1
+
+
+# card index required to perform / to counter an action
+_ACTION_CARD = {action: card_index(card) for action, card in CLAIMS.items()}
+_COUNTER_CARD = {action: card_index(card) for action, card in COUNTER_CLAIMS.items()}
+
+
+class Move(NamedTuple):
+    action: Action
+    player: int = NO_PLAYER  # NO_PLAYER for NO_CHALLENGE / NO_COUNTER, meaning every eligible player passed
+    target: int = NO_PLAYER
+    card: int = NO_CARD
+    card2: int = NO_CARD
+
+
+def _replace(values: tuple, index: int, value) -> tuple:
+    return values[:index] + (value,) + values[index + 1:]
+
+
+def _add_card(hand: tuple, card: int, amount: int) -> tuple:
+    return hand[:card] + (hand[card] + amount,) + hand[card + 1:]
+
+
+class FastState:
+    __slots__ = ("coins", "hands", "deck", "treasury", "turn", "turn_player", "phase",
+                 "action", "target", "counterer", "challenger", "pending_discards", "exchanging", "winner")
+
+    def __init__(self, coins: tuple, hands: tuple, deck: tuple, treasury: int, turn: int = 0, turn_player: int = 0,
+                 phase: int = PHASE_ACTION, action=None, target: int = NO_PLAYER, counterer: int = NO_PLAYER,
+                 challenger: int = NO_PLAYER, pending_discards: tuple = (), exchanging: bool = False,
+                 winner: int = NO_PLAYER):
+        self.coins = coins
+        self.hands = hands  # one tuple of NUM_CARD_TYPES counts per player
+        self.deck = deck
+        self.treasury = treasury
+        self.turn = turn
+        self.turn_player = turn_player
+        self.phase = phase
+        self.action = action
+        self.target = target
+        self.counterer = counterer
+        # Lost a challenge of the action, the counter round follows their discard and they can't counter
+        self.challenger = challenger
+        self.pending_discards = pending_discards
+        self.exchanging = exchanging
+        self.winner = winner
+
+    @classmethod
+    def new_game(cls, num_players: int, rng: random.Random = random) -> "FastState":
+        deck = [i for i in range(NUM_CARD_TYPES) for _ in range(CARDS_PER_TYPE)]
+        rng.shuffle(deck)
+
+        hands = []
+        for _ in range(num_players):
+            hand = [0] * NUM_CARD_TYPES
+            hand[deck.pop()] += 1
+            hand[deck.pop()] += 1
+            hands.append(tuple(hand))
+
+        deck_counts = tuple(deck.count(i) for i in range(NUM_CARD_TYPES))
+        starting_coins = 1 if num_players == 2 else 2
+        return cls(coins=(starting_coins,) * num_players, hands=tuple(hands), deck=deck_counts,
+                   treasury=STARTING_TREASURY - num_players * 2)
+
+    @classmethod
+    def from_game_state(cls, game_state) -> "FastState":
+        """Snapshot a GameState at the start of the current player's turn"""
+        hands = []
+        for player in game_state.players:
+            hand = [0] * NUM_CARD_TYPES
+            for card in player.cards:
+                hand[card_index(card)] += 1
+            hands.append(tuple(hand))
+
+        deck = [0] * NUM_CARD_TYPES
+        for card in game_state.deck:
+            deck[card_index(card)] += 1
+
+        active = [i for i, hand in enumerate(hands) if sum(hand)]
+        return cls(coins=tuple(player.coins for player in game_state.players), hands=tuple(hands), deck=tuple(deck),
+                   treasury=game_state.treasury, turn=game_state.current_turn,
+                   turn_player=game_state.player_turn_index % len(game_state.players),
+                   phase=PHASE_OVER if len(active) == 1 else PHASE_ACTION,
+                   winner=active[0] if len(active) == 1 else NO_PLAYER)
+
+    def copy(self) -> "FastState":
+        return FastState(self.coins, self.hands, self.deck, self.treasury, self.turn, self.turn_player, self.phase,
+                         self.action, self.target, self.counterer, self.challenger, self.pending_discards,
+                         self.exchanging, self.winner)
+
+    @property
+    def num_players(self) -> int:
+        return len(self.coins)
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.phase == PHASE_OVER
+
+    def influence(self, player: int) -> int:
+        return sum(self.hands[player])
+
+    def is_active(self, player: int) -> bool:
+        return sum(self.hands[player]) > 0
+
+    def active_players(self) -> List[int]:
+        return [i for i, hand in enumerate(self.hands) if sum(hand)]
+
+    def acting_players(self) -> List[int]:
+        """Players who are expected to send a move in the current phase"""
+        phase = self.phase
+        if phase == PHASE_ACTION or phase == PHASE_EXCHANGE:
+            return [self.turn_player]
+        if phase == PHASE_DISCARD:
+            return [self.pending_discards[0]]
+        if phase == PHASE_CHALLENGE_ACTION:
+            return [p for p in self.active_players() if p != self.turn_player]
+        if phase == PHASE_COUNTER:
+            return self.counterers()
+        if phase == PHASE_CHALLENGE_COUNTER:
+            return [p for p in self.active_players() if p != self.counterer]
+        return []
+
+    def counterers(self) -> List[int]:
+        """Players who may counter the action, the target or anyone for FOREIGN_AID, except a failed challenger"""
+        if self.action == Action.FOREIGN_AID:
+            return [p for p in self.active_players() if p != self.turn_player and p != self.challenger]
+        return [self.target] if self.target != self.challenger else []
+
+    def legal_moves(self) -> List[Move]:
+        phase = self.phase
+        player = self.turn_player
+
+        if phase == PHASE_ACTION:
+            others = [p for p in self.active_players() if p != player]
+            moves = []
+            for action in legal_actions(phase, self.coins[player]):
+                if not TARGETED & BIT[action]:
+                    moves.append(Move(action, player))
+                elif action == Action.STEAL:
+                    moves.extend(Move(action, player, target) for target in others if self.coins[target] > 0)
+                else:
+                    moves.extend(Move(action, player, target) for target in others)
+            return moves
+
+        if phase == PHASE_CHALLENGE_ACTION or phase == PHASE_CHALLENGE_COUNTER:
+            moves = [Move(Action.NO_CHALLENGE)]
+            moves.extend(Move(Action.CHALLENGE, p) for p in self.acting_players())
+            return moves
+
+        if phase == PHASE_COUNTER:
+            moves = [Move(Action.NO_COUNTER)]
+            moves.extend(Move(Action.COUNTER, p) for p in self.acting_players())
+            return moves
+
+        if phase == PHASE_DISCARD:
+            discarding = self.pending_discards[0]
+            hand = self.hands[discarding]
+            return [Move(Action.DISCARD, discarding, card=c) for c in range(NUM_CARD_TYPES) if hand[c]]
+
+        if phase == PHASE_EXCHANGE:
+            hand = self.hands[player]
+            moves = []
+            for c1 in range(NUM_CARD_TYPES):
+                for c2 in range(c1, NUM_CARD_TYPES):
+                    if hand[c1] and hand[c2] and (c1 != c2 or hand[c1] >= 2):
+                        moves.append(Move(Action.DISCARD_TWO, player, card=c1, card2=c2))
+            return moves
+
+        return []
+
+    def apply(self, move: Move, rng: random.Random = random) -> "FastState":
+        """Return the state after `move`. Draws from the deck use `rng`, so a seeded rng gives a pure transition"""
+        state = self.copy()
+        state._apply(move, rng)
+        return state
+
+    # The methods below mutate a fresh copy and are only called from apply()
+
+    def _apply(self, move: Move, rng):
+        _PHASE_HANDLERS[self.phase](self, move, rng)
+
+    def _apply_action(self, move: Move, rng):
+        action = move.action
+        self.action = action
+        self.target = move.target
+        self.counterer = NO_PLAYER
+        if CHALLENGEABLE & BIT[action]:
+            self.phase = PHASE_CHALLENGE_ACTION
+        elif COUNTERABLE & BIT[action]:
+            self.phase = PHASE_COUNTER
+        else:
+            self._do_action(False, rng)
+            self._advance()
+
+    def _apply_challenge_action(self, move: Move, rng):
+        if move.action == Action.CHALLENGE:
+            card = _ACTION_CARD[self.action]
+            if self.hands[self.turn_player][card]:
+                # Challenge fails, the counter round is held once the challenger has discarded, as in GameState
+                self._swap_card(self.turn_player, card, rng)
+                self.challenger = move.player
+                if not (COUNTERABLE & BIT[self.action]) or not self.counterers():
+                    self.challenger = NO_PLAYER
+                    self._do_action(False, rng)
+                self.pending_discards += (move.player,)
+            else:
+                self._do_action(True, rng)
+                self.pending_discards += (self.turn_player,)
+            self._advance()
+        elif COUNTERABLE & BIT[self.action]:
+            self.phase = PHASE_COUNTER
+        else:
+            self._do_action(False, rng)
+            self._advance()
+
+    def _apply_counter(self, move: Move, rng):
+        self.challenger = NO_PLAYER
+        if move.action == Action.COUNTER:
+            self.counterer = move.player
+            self.phase = PHASE_CHALLENGE_COUNTER
+        else:
+            self._do_action(False, rng)
+            self._advance()
+
+    def _apply_challenge_counter(self, move: Move, rng):
+        if move.action == Action.CHALLENGE:
+            card = _COUNTER_CARD[self.action]
+            if self.hands[self.counterer][card]:
+                self._swap_card(self.counterer, card, rng)
+                self._do_action(True, rng)
+                self.pending_discards += (move.player,)
+            else:
+                self._do_action(False, rng)
+                self.pending_discards += (self.counterer,)
+        else:
+            self._do_action(True, rng)
+        self._advance()
+
+    def _apply_discard(self, move: Move, rng):
+        self._return_card(move.player, move.card)
+        self.pending_discards = self.pending_discards[1:]
+        self._advance()
+
+    def _apply_exchange(self, move: Move, rng):
+        self._return_card(move.player, move.card)
+        self._return_card(move.player, move.card2)
+        self.exchanging = False
+        self._advance()
+
+    def _do_action(self, countered: bool, rng):
+        action = self.action
+        player = self.turn_player
+
+        if action in COSTS:
+            # Paid even when the action is countered, as in GameState.do_action
+            self._give_coins(player, COSTS[action])
+        if countered:
+            return
+
+        if action == Action.INCOME:
+            self._take_coins(player, 1)
+        elif action == Action.FOREIGN_AID:
+            self._take_coins(player, 2)
+        elif action == Action.TAX:
+            self._take_coins(player, 3)
+        elif action == Action.ASSASSINATE or action == Action.COUP:
+            self.pending_discards += (self.target,)
+        elif action == Action.EXCHANGE:
+            self._draw_card(player, rng)
+            self._draw_card(player, rng)
+            self.exchanging = True
+        elif action == Action.STEAL:
+            stolen = min(2, self.coins[self.target])
+            self.coins = _replace(self.coins, self.target, self.coins[self.target] - stolen)
+            self.coins = _replace(self.coins, player, self.coins[player] + stolen)
+
+    def _advance(self):
+        """Move on to the next pending decision, or end the turn when there is none"""
+        # players who have already lost all their influence cannot discard again
+        pending = self.pending_discards
+        while pending and not sum(self.hands[pending[0]]):
+            pending = pending[1:]
+        self.pending_discards = pending
+
+        if pending:
+            self.phase = PHASE_DISCARD
+            return
+        if self.challenger != NO_PLAYER:
+            self.phase = PHASE_COUNTER
+            return
+        if self.exchanging and sum(self.hands[self.turn_player]):
+            self.phase = PHASE_EXCHANGE
+            return
+        self.exchanging = False
+
+        active = self.active_players()
+        if len(active) == 1:
+            self.winner = active[0]
+            self.phase = PHASE_OVER
+            return
+
+        self.turn += 1
+        self.action = None
+        self.target = NO_PLAYER
+        self.counterer = NO_PLAYER
+        self.phase = PHASE_ACTION
+
+        num_players = len(self.hands)
+        player = (self.turn_player + 1) % num_players
+        while not sum(self.hands[player]):
+            player = (player + 1) % num_players
+        self.turn_player = player
+
+    def _take_coins(self, player: int, amount: int):
+        amount = min(amount, self.treasury)
+        self.treasury -= amount
+        self.coins = _replace(self.coins, player, self.coins[player] + amount)
+
+    def _give_coins(self, player: int, amount: int):
+        self.treasury += amount
+        self.coins = _replace(self.coins, player, self.coins[player] - amount)
+
+    def _return_card(self, player: int, card: int):
+        self.hands = _replace(self.hands, player, _add_card(self.hands[player], card, -1))
+        self.deck = _add_card(self.deck, card, 1)
+
+    def _draw_card(self, player: int, rng):
+        deck = self.deck
+        pick = rng.randrange(sum(deck))
+        card = 0
+        while pick >= deck[card]:
+            pick -= deck[card]
+            card += 1
+        self.deck = _add_card(deck, card, -1)
+        self.hands = _replace(self.hands, player, _add_card(self.hands[player], card, 1))
+
+    def _swap_card(self, player: int, card: int, rng):
+        """Same as GameState.swap_card: the revealed card goes back to the deck and a random one is drawn"""
+        self._return_card(player, card)
+        self._draw_card(player, rng)
+
+    def __repr__(self):
+        return (f"FastState(turn={self.turn}, phase={self.phase}, turn_player={self.turn_player}, "
+                f"coins={self.coins}, hands={self.hands}, deck={self.deck}, treasury={self.treasury})")
+
+
+# Handler of a move in each phase, a finished game takes no moves
+_PHASE_HANDLERS = {
+    PHASE_ACTION: FastState._apply_action,
+    PHASE_CHALLENGE_ACTION: FastState._apply_challenge_action,
+    PHASE_COUNTER: FastState._apply_counter,
+    PHASE_CHALLENGE_COUNTER: FastState._apply_challenge_counter,
+    PHASE_DISCARD: FastState._apply_discard,
+    PHASE_EXCHANGE: FastState._apply_exchange,
+    PHASE_OVER: lambda state, move, rng: None,
+}
@@ -1,15 +1,30 @@
 import asyncio
 import random
-from typing import List, Optional
+import time
+from typing import Callable, List, Optional, Sequence, Union
 
-from pydantic import BaseModel
-from rich.table import Table, Column
-from rich.text import Text
+from pydantic import BaseModel, Field
 
-from src.datatypes import get_base_actions, get_challenge_actions, get_counter_actions, Message, Action, Card, GameEventMessage, SpeechMessage, ActionMessage, TaskMessage, MessageType, CARD_FOREGROUND_COLOR_MAP, CARD_BACKGROUND_COLOR_MAP
+from src.datatypes import Message, Action, Card, GameEventMessage, SpeechMessage, ActionMessage, TaskMessage, MessageType
 from src.agent import Agent
-from src.helper import can_be_challenged, requires_target, has_card_for_action, can_be_countered, has_challenge_card, get_counter_card, name_list, personality_list
-from src.print_utils import print_text, clear_screen, print_table
+from src.beliefs import BeliefTracker
+from src.helper import has_card_for_action, has_challenge_card, get_counter_card, get_action_card, name_list, personality_list
+from src.llm_client import LLMClient
+from src.memory import PublicEvent
+from src.message_bus import MessageBus
+from src.observers import GameObserver, ConsoleObserver
+from src.ismcts import ISMCTSPolicy
+from src.policies import Policy, HeuristicPolicy
+from src.rules import PHASE_ACTION, PHASE_CHALLENGE_ACTION, can_be_challenged, can_be_countered, is_base, \
+    is_challenge, legal_actions, reaction_actions, requires_target
+from src.scheduler import LLMCallStats, WakeupScheduler
+from src.structured_output import ACTION_MODE_TEXT, ACTION_MODES
+from src.telemetry import GameTelemetry
+
+POLICY_LLM = "llm"
+POLICY_HEURISTIC = "heuristic"
+POLICY_ISMCTS = "ismcts"
+POLICIES = [POLICY_LLM, POLICY_HEURISTIC, POLICY_ISMCTS]
 
 
 class TurnData(BaseModel):
@@ -19,27 +34,125 @@ class TurnData(BaseModel):
 
     countering_player: Optional[Agent] = None
 
+    # Reactions to the action, resolved once every player answered
+    challengers: List[Agent] = Field(default_factory=list)
+    counterers: List[Agent] = Field(default_factory=list)
+    pending_counterer: Optional[Agent] = None  # countered alongside a challenge that failed
+
 
 class GameState:
-    def __init__(self, num_players):
+    def __init__(self,
+                 num_players,
+                 llm_client: Optional[LLMClient] = None,
+                 observer: Optional[GameObserver] = None,
+                 names: Optional[List[str]] = None,
+                 personalities: Optional[List[str]] = None,
+                 seed: Optional[int] = None,
+                 coalesce_window: float = 0.25,
+                 max_inbox_size: int = 64,
+                 policy: Union[str, Callable[[Agent], Policy], Sequence] = POLICY_LLM,
+                 action_mode: str = ACTION_MODE_TEXT):
+        if action_mode not in ACTION_MODES:
+            raise ValueError(f"Invalid action mode: {action_mode}. Must be one of {', '.join(ACTION_MODES)}")
+
         self.num_players = num_players
+        # All game randomness comes from here so a seeded game is reproducible
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Seat assignment, picked at random during setup when not given
+        self.names = names
+        self.personalities = personalities
+        self.observer = observer or ConsoleObserver()
+
+        # Shared by all agents so their streams reuse pooled connections
+        self._owns_llm_client = llm_client is None
+        self.llm_client = llm_client or LLMClient()
         self.players: List[Agent] = []
 
+        # One of POLICIES or a callable creating the policy of an agent, or a list of those with one per seat
+        self.policy = policy
+        # How long agents wait for more messages before responding to non-task messages
+        self.coalesce_window = coalesce_window
+        # Whether LLM agents answer in the SPEECH/THOUGHT/ACTION text format or with JSON constrained by a schema
+        self.action_mode = action_mode
+        self.llm_calls = LLMCallStats()
+        self.bus = MessageBus(max_inbox_size, on_error=self.abort)
+
         self.current_turn = 0
         self.current_turn_data = None
 
         self.player_turn_index = 0
+        self.winner: Optional[Agent] = None
+        self.error: Optional[BaseException] = None
+        self._game_over = asyncio.Event()
+
+        # Messages submitted by the agents, handled one at a time by the engine loop in run()
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self.messages_handled = 0
+        self.engine_seconds = 0.0
+        self.telemetry = GameTelemetry()
 
         self.expected_actions = []
+        # What every player can infer about everyone else's cards, created once the cards are dealt
+        self.beliefs: Optional[BeliefTracker] = None
 
         self.treasury = 50
         self.deck = [Card.DUKE] * 3 + [Card.ASSASSIN] * 3 + [Card.CAPTAIN] * 3 + [Card.AMBASSADOR] * 3 + [Card.CONTESSA] * 3
 
+    @property
+    def is_over(self) -> bool:
+        return self.winner is not None
+
+    async def run(self) -> Optional[Agent]:
+        engine = asyncio.create_task(self._run_engine())
+        try:
+            await self.setup_game()
+            await self._game_over.wait()
+        finally:
+            engine.cancel()
+            await asyncio.gather(engine, return_exceptions=True)
+            await self.bus.close()
+            for player in self.players:
+                await player.policy.stop()
+
+        if self.error is not None:
+            raise self.error
+        return self.winner
+
+    async def _run_engine(self):
+        """The only consumer of submitted messages, so every game rule runs here one message at a time"""
+        while not self.is_over:
+            message = await self._inbox.get()
+            start = time.perf_counter()
+            try:
+                await self.handle_message(message)
+            except Exception as e:
+                self.abort(e)
+                return
+            seconds = time.perf_counter() - start
+            self.messages_handled += 1
+            self.engine_seconds += seconds
+            if isinstance(message, ActionMessage):
+                self.telemetry.add_action(message.action.name, seconds)
+
+    async def submit(self, message: Message):
+        """Queue an agent's action or speech for the engine"""
+        await self._inbox.put(message)
+
+    def submit_nowait(self, message: Message):
+        self._inbox.put_nowait(message)
+
+    def abort(self, error: BaseException):
+        """Ends the game because of an error in the engine or an agent, run() raises the error"""
+        if self.error is None:
+            self.error = error
+        self._game_over.set()
+
     async def setup_game(self):
-        clear_screen()
-        random.shuffle(self.deck)
-        names = random.sample(name_list, self.num_players)
-        personalities = random.sample(personality_list, self.num_players)
+        self.telemetry.start()
+        self.rng.shuffle(self.deck)
+        names = self.names or self.rng.sample(name_list, self.num_players)
+        personalities = self.personalities or self.rng.sample(personality_list, self.num_players)
 
         for i in range(self.num_players):
             player = Agent(name=names[i],
@@ -47,18 +160,77 @@ class GameState:
                            game_state=self,
                            coins=1 if self.num_players == 2 else 2)
             player.cards = [self.deck.pop(), self.deck.pop()]
+            player.policy = self.create_policy(player, i)
+            player.policy.start()
+            self.bus.register(player)
             self.players.append(player)
 
-        print_table(generate_player_info_table(self.players))
-        # Give task to first player
-        await self.send_task_message(self.players[0], "You are the first player starting the game. Choose an action to perform.", get_base_actions())
         self.treasury -= (self.num_players * 2)
+        self.beliefs = BeliefTracker([player.name for player in self.players], [player.cards for player in self.players])
+
+        self.observer.on_game_start(self.players)
+        # Give task to first player
+        await self.send_task_message(self.players[0], "You are the first player starting the game. Choose an action to perform.", self.base_actions(self.players[0]))
+
+    def create_policy(self, player: Agent, seat: int) -> Policy:
+        policy = self.policy[seat] if isinstance(self.policy, (list, tuple)) else self.policy
+        if callable(policy):
+            return policy(player)
+        if policy == POLICY_HEURISTIC:
+            return HeuristicPolicy(player)
+        if policy == POLICY_ISMCTS:
+            return ISMCTSPolicy(player, seed=self.rng.getrandbits(32))
+        if policy == POLICY_LLM:
+            return WakeupScheduler(player, self.coalesce_window, self.llm_calls)
+        raise ValueError(f"Invalid policy: {policy}. Must be one of {', '.join(POLICIES)}")
+
+    def result(self) -> dict:
+        """Summary of the game used by the batch runners"""
+        return {
+            "seed": self.seed,
+            "num_players": self.num_players,
+            "winner": self.winner.name if self.winner else None,
+            "turns": self.current_turn,
+            "llm_calls": self.llm_calls.model_dump(),
+            "messages": self.bus.stats(),
+            "engine": {"messages_handled": self.messages_handled, "seconds": self.engine_seconds},
+            "telemetry": self.telemetry.summary(),
+            "players": [
+                {
+                    "name": player.name,
+                    "personality": player.personality,
+                    "coins": player.coins,
+                    "cards": [card.name for card in player.cards],
+                    "is_active": player.is_active,
+                }
+                for player in self.players
+            ],
+        }
+
+    async def close(self):
+        if self._owns_llm_client:
+            await self.llm_client.close()
 
     def get_all_active_players(self) -> List[Agent]:
         return [p for p in self.players if p.is_active]
 
     def get_all_other_players(self, player: Agent) -> List[Agent]:
-        return [p for p in self.players if p != player and p.is_active]
+        return [p for p in self.players if p is not player and p.is_active]
+
+    @staticmethod
+    def base_actions(player: Agent) -> List[Action]:
+        """The actions a player can afford on their turn, only COUP once they have 10 coins"""
+        return list(legal_actions(PHASE_ACTION, player.coins))
+
+    @staticmethod
+    def holds(player: Agent, cards: List[Card], count: int) -> bool:
+        """Whether the player has `count` cards to discard and holds all of them, a card twice needs two copies"""
+        remaining = list(player.cards)
+        for card in cards:
+            if card not in remaining:
+                return False
+            remaining.remove(card)
+        return len(cards) == count
 
     def get_all_players_who_can_counter(self, player: Agent) -> List[Agent]:
         if self.current_turn_data.action == Action.ASSASSINATE or self.current_turn_data.action == Action.STEAL:
@@ -74,30 +246,44 @@ class GameState:
         if isinstance(players, Agent):
             players = [players]
 
+        if expected_actions == [Action.DISCARD]:
+            # A player who already lost all their cards has nothing left to discard
+            players = [player for player in players if player.cards]
+            if not players:
+                return
+
         # Adds a bit of randomness to the generation
-        random.shuffle(players)
+        self.rng.shuffle(players)
 
-        print_text(f"Sending task message to {players}: {content.upper()}", style="bold cyan", rainbow=False, with_markup=True)
+        self.observer.on_task_sent(players, content)
 
+        new_tasks = []
         for player in players:
             task_msg = TaskMessage(content=content, expected_actions=expected_actions)
 
             # Add task to expected actions for player
             self.expected_actions.append((player, task_msg))
+            new_tasks.append((player, task_msg))
 
         # Important to run this after all expected actions have been added
-        for player, task_msg in self.expected_actions:
-            # run this async
-            await player.receive_message(task_msg)
+        for player, task_msg in new_tasks:
+            await self.bus.send(player, task_msg)
 
     async def reset_expected_actions(self):
         for (expected_player, task_msg) in self.expected_actions:
             # send task completion task to player
             task_msg.message_type = MessageType.TASK_COMPLETE
-            await expected_player.receive_message(task_msg)
+            await self.bus.send(expected_player, task_msg)
 
         self.expected_actions = []
 
+    def publish(self, content: str, event: Optional[PublicEvent] = None):
+        """Record something every player saw in their memory, without waking them up"""
+        for player in self.get_all_active_players():
+            player.memory.append("GAME: " + content, event)
+        if event is not None:
+            self.beliefs.observe(event)
+
     def swap_card(self, player: Agent, card: Card):
         # Remove card from current players hand
         player.cards.remove(card)
@@ -106,10 +292,11 @@ class GameState:
         self.deck.append(card)
 
         # Shuffle deck
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
         # Add new card to player's hand
         player.cards.append(self.deck.pop())
+        self.beliefs.set_hand(player.name, player.cards)
 
     def _take_coin_from_treasury(self, player: Agent, number_of_coins: int):
         coins = min(number_of_coins, self.treasury)
@@ -120,6 +307,86 @@ class GameState:
         self.treasury += number_of_coins
         player.coins -= number_of_coins
 
+    def first_in_turn_order(self, players: List[Agent]) -> Optional[Agent]:
+        """The player who comes first after the turn player, which is how simultaneous answers are ranked"""
+        if not players:
+            return None
+        start = self.players.index(self.current_turn_data.source_player)
+        return min(players, key=lambda p: (self.players.index(p) - start) % len(self.players))
+
+    async def send_reaction_tasks(self, player: Agent):
+        """
+        One task per other player to challenge the action, counter it or pass, instead of a challenge poll followed by
+        a counter poll. Only the players allowed to counter are offered COUNTER.
+        """
+        action, target = self.current_turn_data.action, self.current_turn_data.target_player
+        attempt = f"Player {player.name} is attempting to perform action {action.name}{' on ' + target.name if target else ''}."
+        challenge = can_be_challenged(action)
+        counterers = self.get_all_players_who_can_counter(player)
+
+        groups = [(counterers, reaction_actions(challenge, True))]
+        if challenge:
+            groups.append(([p for p in self.get_all_other_players(player) if p not in counterers],
+                           reaction_actions(True, False)))
+        for players, options in groups:
+            if not players:
+                continue
+            questions = []
+            if Action.CHALLENGE in options:
+                questions.append("CHALLENGE that they don't have the required cards to perform that action")
+            if Action.COUNTER in options:
+                questions.append(f"COUNTER their action claiming {get_counter_card(action).name}")
+            content = f"{attempt} Would you like to {' or '.join(questions)}? Otherwise PASS."
+            await self.send_task_message(players, content, list(options))
+
+    async def resolve_reactions(self):
+        """
+        Every player has reacted to the action. A challenge is resolved before a counter, as a counter only matters if
+        the action stands, and among several challengers or counterers the first in turn order is taken.
+        """
+        turn_data = self.current_turn_data
+        challenger = self.first_in_turn_order(turn_data.challengers)
+        counterer = self.first_in_turn_order(turn_data.counterers)
+        if challenger is None:
+            if counterer is None:
+                await self.do_action()
+            else:
+                await self.declare_counter(counterer)
+            return
+
+        source = turn_data.source_player
+        if card := has_card_for_action(turn_data.action, source.cards):
+            # Challenge fails because challenged player has the card
+            self._publish_challenge(challenger, source, card, won=False)
+            self.swap_card(source, card)
+            if counterer is None:
+                await self.do_action()
+            else:
+                # The counter is made once the challenger has discarded
+                turn_data.pending_counterer = counterer
+
+            task_msg = f"You challenged {source.name} on their action {turn_data.action}. Unfortunately, they had the required card and you lost the challenge so you must discard a card."
+            await self.send_task_message(challenger, task_msg, [Action.DISCARD])
+        else:
+            # Challenge succeeds, the action doesn't happen
+            self._publish_challenge(challenger, source, get_action_card(turn_data.action), won=True)
+            await self.do_action(countered=True)
+
+            task_msg = f"You were caught in a bluff. You do not have the card for action {turn_data.action}. You must discard a card."
+            await self.send_task_message(source, task_msg, [Action.DISCARD])
+
+    async def declare_counter(self, counterer: Agent):
+        """Counter the action of the turn and ask everyone else whether to challenge the counter"""
+        turn_data = self.current_turn_data
+        turn_data.countering_player = counterer
+        counter_card = get_counter_card(turn_data.action)
+        self.publish(f"{counterer.name} countered {turn_data.action.name}, claiming {counter_card.name}.",
+                     PublicEvent("claim", counterer.name, counter_card))
+
+        # A challenger who lost their last card is out of the game
+        players = [p for p in self.get_all_other_players(counterer) if p.cards]
+        await self.send_task_message(players, f"Player {counterer.name} is claiming they have {counter_card} and is attempting to counter action {turn_data.action}. Would you like to challenge the counter?", list(legal_actions(PHASE_CHALLENGE_ACTION)))
+
     async def do_action(self, countered: bool = False):
         # get action from current turn
         action = self.current_turn_data.action
@@ -131,6 +398,8 @@ class GameState:
                     return
                 self._take_coin_from_treasury(self.current_turn_data.source_player, 2)
             case Action.TAX:
+                if countered:
+                    return
                 self._take_coin_from_treasury(self.current_turn_data.source_player, 3)
             case Action.ASSASSINATE:
                 self._give_coin_to_treasury(self.current_turn_data.source_player, 3)
@@ -140,6 +409,9 @@ class GameState:
                 content = f"You have been assassinated by {self.current_turn_data.source_player.name}. Choose a card to discard."
                 await self.send_task_message(self.current_turn_data.target_player, content, [Action.DISCARD])
             case Action.EXCHANGE:
+                if countered:
+                    return
+                self.current_turn_data.source_player.cards.extend([self.deck.pop(), self.deck.pop()])
                 content = f"You are exchanging cards. You received 2 new cards, now you must choose 2 cards to discard."
                 await self.send_task_message(self.current_turn_data.source_player, content, [Action.DISCARD_TWO])
             case Action.STEAL:
@@ -152,160 +424,174 @@ class GameState:
                 content = f"You have been couped by {self.current_turn_data.source_player.name}. Choose a card to discard."
                 await self.send_task_message(self.current_turn_data.target_player, content, [Action.DISCARD])
 
+    def _publish_challenge(self, challenger: Agent, challenged: Agent, card: Card, won: bool):
+        outcome = "won" if won else "lost"
+        self.publish(f"{challenger.name} challenged {challenged.name}'s claim to {card.name} and {outcome}.",
+                     PublicEvent("challenge", challenged.name, card, challenger.name, won))
+
     async def handle_message(self, message: Message):
+        if self.is_over:
+            return
+
         if isinstance(message, ActionMessage):
-            print_text(f"{message.sender} sent ACTION: {str(message)}", style="bold green", with_markup=True)
+            self.observer.on_action(message)
             await self.handle_action(message)
         elif isinstance(message, SpeechMessage):
-            print_text(f"{message.sender}: {message.content}")
+            self.observer.on_speech(message)
             # Send the message to all agents
-            for player in self.get_all_active_players():
-                await player.receive_message(message)
-
-    async def handle_action(self, message: ActionMessage):
+            await self.bus.broadcast(self.get_all_active_players(), message)
+
+    async def accept_action(self, player: Agent, target: Optional[Agent],
+                            message: ActionMessage) -> Optional[TaskMessage]:
+        """
+        Completes the task `message` answers and returns it, or tells the player why the action can't be taken and
+        returns None
+        """
         action = message.action
-        player_name = message.sender
-        player = next(p for p in self.players if p.name == player_name and p.is_active)
-
-        target_name = message.target
-        target = next((p for p in self.players if p.name == target_name and p.is_active), None)
-
         # Check if action receiving is in the expected_actions list
-        expected_actions_str = ", ".join([f"{player.name}: {task_msg.expected_actions}" for player, task_msg in self.expected_actions])
-
-        for (expected_player, task_msg) in self.expected_actions:
-            if player == expected_player and action in task_msg.expected_actions:
+        for index, (expected_player, task_msg) in enumerate(self.expected_actions):
+            if player is expected_player and action in task_msg.expected_actions:
                 # Validate the action here
                 if requires_target(action):
-                    if not target:
+                    if not target or target is player:
                         players = self.get_all_other_players(player)
                         game_event_msg = GameEventMessage(content=f"Action {action} requires a target. One of {players} must be targeted.")
-                        await player.receive_message(game_event_msg)
-                        return
+                        await self.bus.send(player, game_event_msg)
+                        return None
 
                     if action == Action.STEAL and target.coins == 0:
                         game_event_msg = GameEventMessage(content=f"Player {target.name} has no coins to steal. Please choose another target or another action.")
-                        await player.receive_message(game_event_msg)
-                        return
+                        await self.bus.send(player, game_event_msg)
+                        return None
+
+                if action == Action.DISCARD or action == Action.DISCARD_TWO:
+                    if not self.holds(player, message.cards or [], 1 if action == Action.DISCARD else 2):
+                        game_event_msg = GameEventMessage(content=f"You can't discard {', '.join(card.name for card in message.cards or [])}. Your cards are {', '.join(card.name for card in player.cards)}.")
+                        await self.bus.send(player, game_event_msg)
+                        return None
 
-                #print_text(f"Player {player.name} sent expected action: {action}. Remaining actions: {len(self.expected_actions)}", style="bold green", with_markup=True)
-                self.expected_actions.remove((expected_player, task_msg))
+                del self.expected_actions[index]
 
                 # send task completion task to player
                 task_msg.message_type = MessageType.TASK_COMPLETE
-                await player.receive_message(task_msg)
-                break
-        else:  # Action is not expected,
-            # Check if player is supposed to send other actions
-            for (expected_player, task_msg) in self.expected_actions:
-                if player == expected_player:
-                    expected_actions_str = ", ".join([str(expected_action) for expected_action in task_msg.expected_actions])
-                    game_event_msg = GameEventMessage(content=f"You sent an unexpected action: {action}. Please send one of the expected actions: {expected_actions_str}")
-                    await player.receive_message(game_event_msg)
-                    return
+                await self.bus.send(player, task_msg)
+                return task_msg
+
+        # Action is not expected, check if player is supposed to send other actions
+        for (expected_player, task_msg) in self.expected_actions:
+            if player is expected_player:
+                expected_actions_str = ", ".join([str(expected_action) for expected_action in task_msg.expected_actions])
+                game_event_msg = GameEventMessage(content=f"You sent an unexpected action: {action}. Please send one of the expected actions: {expected_actions_str}")
+                await self.bus.send(player, game_event_msg)
+                return None
+
+        # Otherwise, it's not their turn
+        game_event_msg = GameEventMessage(content=f"You sent an unexpected action: {action}. Please wait for your turn.")
+        await self.bus.send(player, game_event_msg)
+        return None
+
+    async def record_reaction(self, player: Agent, action: Action):
+        """A reaction to the action of the turn, resolved with the others once every player has reacted"""
+        if action == Action.CHALLENGE:
+            self.current_turn_data.challengers.append(player)
+        elif action == Action.COUNTER:
+            self.current_turn_data.counterers.append(player)
+        if len(self.expected_actions) == 0:
+            await self.resolve_reactions()
+
+    async def challenge_counter(self, challenger: Agent):
+        """Resolve a challenge of the counter, which ends the poll for other challenges"""
+        await self.reset_expected_actions()
+
+        countering_player = self.current_turn_data.countering_player
+        if card := has_challenge_card(self.current_turn_data.action, countering_player.cards):
+            # Challenge fails because countering player has the card
+            self._publish_challenge(challenger, countering_player, card, won=False)
+            self.swap_card(countering_player, card)
+            await self.do_action(countered=True)
+
+            task_msg = f"You challenged {countering_player.name} on their counter to action {self.current_turn_data.action}. Unfortunately, they had the required card and you lost the challenge so you must discard a card."
+            await self.send_task_message(challenger, task_msg, [Action.DISCARD])
+        else:
+            # Challenge succeeds
+            self._publish_challenge(challenger, countering_player, get_counter_card(self.current_turn_data.action), won=True)
+            await self.do_action()
+
+            task_msg = f"You were caught in a bluff. You do not have the card to counter the action {self.current_turn_data.action}. You must discard a card."
+            await self.send_task_message(countering_player, task_msg, [Action.DISCARD])
+
+    async def handle_action(self, message: ActionMessage):
+        action = message.action
+        player_name = message.sender
+        player = next((p for p in self.players if p.name == player_name and p.is_active), None)
+        if player is None:
+            # Sent before the player was eliminated
+            return
+
+        target_name = message.target
+        target = next((p for p in self.players if p.name == target_name and p.is_active), None)
 
-            # Otherwise, it's not their turn
-            game_event_msg = GameEventMessage(content=f"You sent an unexpected action: {action}. Please wait for your turn.")
-            await player.receive_message(game_event_msg)
+        task_msg = await self.accept_action(player, target, message)
+        if task_msg is None:
             return
 
         # Action is valid so we move to the next stage
-        if action in get_base_actions():
+        if is_base(action):
             self.current_turn_data = TurnData(source_player=player, action=action, target_player=target)
-            tasks = []
-            if can_be_challenged(action):
-                # Ask all players if they would like to challenge
-                players = self.get_all_other_players(player)
-                task = self.send_task_message(players, f"Player {player.name} is attempting to perform action {action.name}{' on ' + target.name if target else ''}. Would you like to challenge that they don't have the required cards to perform that action?", get_challenge_actions())
-                tasks.append(task)
-
-            if can_be_countered(action):
-                # Ask all players if they would like to counter
-                players = self.get_all_other_players(player)
-                task = self.send_task_message(players, f"Player {player.name} is attempting to perform action {action.name}{' on ' + target.name if target else ''}. Would you like to counter their action?", get_counter_actions())
-                tasks.append(task)
-
-            if not tasks:
+            performed = f"{player.name} performed {action.name}{' on ' + target.name if target else ''}"
+            if card := get_action_card(action):
+                self.publish(f"{performed}, claiming {card.name}.", PublicEvent("claim", player.name, card))
+            else:
+                self.publish(f"{performed}.")
+            if can_be_challenged(action) or can_be_countered(action):
+                # Everyone reacts to the action at once, the answers are resolved when all of them are in
+                await self.send_reaction_tasks(player)
+            else:
                 # No challenge or counter required
                 await self.do_action()
-            else:
-                # Wait for all tasks to complete
-                await asyncio.gather(*tasks)
 
-        elif action in get_challenge_actions():
+        elif Action.PASS in task_msg.expected_actions:
+            await self.record_reaction(player, action)
+
+        elif is_challenge(action):
+            # Only a counter is challenged on its own, challenges of the action are reactions
             if action == Action.CHALLENGE:
-                # Issue a challenge and also remove all expected actions
-
-                # Iterate the expected actions and remove all challenges
-                await self.reset_expected_actions()
-
-                # TODO refactor & simplify this logic
-                if self.current_turn_data.countering_player:  # Challenge issued to countering player's action
-                    if card := has_challenge_card(self.current_turn_data.action, self.current_turn_data.countering_player.cards):
-                        # Challenge fails because countering player has the card
-
-                        self.swap_card(self.current_turn_data.countering_player, card)
-                        await self.do_action(countered=True)
-
-                        task_msg = f"You challenged {self.current_turn_data.countering_player.name} on their counter to action {self.current_turn_data.action}. Unfortunately, they had the required card and you lost the challenge so you must discard a card."
-                        await self.send_task_message(player, task_msg, [Action.DISCARD])
-                    else:
-                        # Challenge succeeds
-                        await self.do_action()
-
-                        task_msg = f"You were caught in a bluff. You do not have the card to counter the action {self.current_turn_data.action}. You must discard a card."
-                        await self.send_task_message(self.current_turn_data.countering_player, task_msg, [Action.DISCARD])
-                else:  # Challenge issued to action
-                    if card := has_card_for_action(self.current_turn_data.action, self.current_turn_data.source_player.cards):
-                        self.swap_card(self.current_turn_data.source_player, card)
-                        await self.do_action()
-
-                        # Challenge fails because challenged player has the card
-                        task_msg = f"You challenged {self.current_turn_data.source_player.name} on their action {self.current_turn_data.action}. Unfortunately, they had the required card and you lost the challenge so you must discard a card."
-                        await self.send_task_message(player, task_msg, [Action.DISCARD])
-                    else:
-                        # Challenge succeeds, however it depends if it was a challenge to the counter or the action
-                        await self.do_action(countered=True)
-
-                        # Challenge succeeds
-                        task_msg = f"You were caught in a bluff. You do not have the card for action {self.current_turn_data.action}. You must discard a card."
-                        await self.send_task_message(self.current_turn_data.source_player, task_msg, [Action.DISCARD])
+                await self.challenge_counter(player)
             elif action == Action.NO_CHALLENGE:
-                # if everyone has responded with no challenge, then move to next stage
+                # if everyone has responded with no challenge, the counter stands
                 if len(self.expected_actions) == 0:
-                    if self.current_turn_data.countering_player:
-                        await self.do_action(countered=True)
-                    elif players := self.get_all_players_who_can_counter(player):
-                        await self.send_task_message(players, f"Player {player.name} is attempting to perform action {self.current_turn_data.action}. Would you like to counter their action?", get_counter_actions())
-                    else:
-                        await self.do_action()
-
-        elif action in get_counter_actions():
-            # Someone has issued a counter
-            if action == Action.COUNTER:
-                # Set the data in the turn data and then ask if anyone would like challenge
-                await self.reset_expected_actions()
-                self.current_turn_data.countering_player = player
-
-                players = self.get_all_other_players(player)
-                await self.send_task_message(players, f"Player {player.name} is claiming they have {get_counter_card(self.current_turn_data.action)} and is attempting to counter action {self.current_turn_data.action}. Would you like to challenge the counter?", get_challenge_actions())
-            elif action == Action.NO_COUNTER:
-                # if everyone has responded with no counter, then do the action
-                if len(self.expected_actions) == 0:
-                    await self.do_action()
+                    await self.do_action(countered=True)
 
         elif action == Action.DISCARD:
             # Discard a card
             player.cards.remove(message.cards[0])
+            self.publish(f"{player.name} lost their {message.cards[0].name}.", PublicEvent("reveal", player.name, message.cards[0]))
             self.deck.append(message.cards[0])
-            random.shuffle(self.deck)
+            self.rng.shuffle(self.deck)
+            self.beliefs.set_hand(player.name, player.cards)
+
+            if self.current_turn_data is not None and self.current_turn_data.pending_counterer is not None \
+                    and len(self.expected_actions) == 0:
+                # The challenger who lost has paid for it, now the counter declared alongside the challenge is made
+                counterer, self.current_turn_data.pending_counterer = self.current_turn_data.pending_counterer, None
+                await self.declare_counter(counterer)
+
+            if not player.cards:
+                # Any other discard the player still owes can't be paid anymore
+                for (expected_player, task_msg) in list(self.expected_actions):
+                    if expected_player is player and task_msg.expected_actions == [Action.DISCARD]:
+                        self.expected_actions.remove((expected_player, task_msg))
+                        task_msg.message_type = MessageType.TASK_COMPLETE
+                        await self.bus.send(player, task_msg)
         elif action == Action.DISCARD_TWO:
             # Discard 2 cards (as they received 2 cards from the exchange)
             for card in message.cards:
                 player.cards.remove(card)
                 self.deck.append(card)
 
-            random.shuffle(self.deck)
+            self.rng.shuffle(self.deck)
+            self.beliefs.set_hand(player.name, player.cards)
+            self.beliefs.exchanged(player.name)
 
         # if no more actions required for this turn, then move to next turn
         if len(self.expected_actions) == 0:
@@ -316,14 +602,19 @@ class GameState:
 
                     active_players = self.get_all_active_players()
                     # Player has been eliminated
-                    print_text(f"Player {player.name} has been eliminated from the game!", style="bold red", with_markup=True)
+                    self.observer.on_player_eliminated(player)
+                    self.publish(f"{player.name} has been eliminated.", PublicEvent("eliminated", player.name))
                     #game_event_msg = GameEventMessage(content=f"Player {player.name} has been eliminated from the game.")
 
                     # Check if a winner has been found
                     if len(active_players) == 1:
-                        print_text(f"Player {active_players[0].name} has won the game!", style="bold", rainbow=True, with_markup=True)
+                        self.winner = active_players[0]
+                        self.telemetry.end(self.current_turn)
+                        self.observer.on_game_won(self.winner)
+                        self._game_over.set()
                         return
 
+            self.telemetry.end_turn(self.current_turn)
             self.current_turn += 1
             self.current_turn_data = None
 
@@ -333,53 +624,6 @@ class GameState:
                 self.player_turn_index += 1
                 next_player = self.players[self.player_turn_index % len(self.players)]
 
-            table = generate_player_summary_table(self.players, self.player_turn_index, self.current_turn)
-            print_table(table)
-
-            await self.send_task_message(next_player, f"Player {next_player.name} it is your turn. Choose an action to perform.", get_base_actions())
-
-
-def generate_player_info_table(players: List[Agent]):
-    """Generate a table to show their name, personality and starting cards"""
-    table = Table("Player", "Personality", Column(header="Cards", justify="center", min_width=40))
-    for player in players:
-        name_text = Text.from_markup(f":robot: {player.name}")
-        personality_text = Text.from_markup(f":person_tipping_hand: {player.personality}")
-
-        card_text = Text()
-        for card in player.cards:
-            card_text.append(
-                str(card), style=f"{CARD_FOREGROUND_COLOR_MAP[card]} on {CARD_BACKGROUND_COLOR_MAP[card]}"
-            )
-            card_text.append(" ")
-
-        table.add_row(name_text, personality_text, card_text)
-
-    return table
-
-
-def generate_player_summary_table(players: List[Agent], current_player_index: int, current_turn: int) -> Table:
-    """Generate a table of the players"""
-    print_text(f"End of Turn {current_turn}", style="bold", with_markup=True)
-    table = Table("Player", "Coins", Column(header="Cards", justify="center", min_width=40))
-    for ind, player in enumerate(players):
-        player_text = Text.from_markup(f":robot: {str(player.name)}")
-
-        if ind == current_player_index:
-            player_text.stylize("bold magenta")
-
-        coin_text = Text(str(player.coins), style="gray")
-
-        card_text = Text()
-        if player.is_active:
-            for card in player.cards:
-                card_text.append(
-                    str(card), style=f"{CARD_FOREGROUND_COLOR_MAP[card]} on {CARD_BACKGROUND_COLOR_MAP[card]}"
-                )
-                card_text.append(" ")
-        else:
-            card_text = Text.from_markup(":skull:")
-
-        table.add_row(player_text, coin_text, card_text)
+            self.observer.on_turn_end(self.players, self.player_turn_index % len(self.players), self.current_turn)
 
-    return table
+            await self.send_task_message(next_player, f"Player {next_player.name} it is your turn. Choose an action to perform.", self.base_actions(next_player))
@@ -1,95 +1,26 @@
-import json
-import os
 from typing import List, Optional
 
-import aiohttp
-from dotenv import load_dotenv
-
+from src import rules
 from src.datatypes import Action, Card
 
-load_dotenv()
-
-
-async def get_openai_stream(system_message: str):
-    url = 'https://api.openai.com/v1/chat/completions'
-    headers = {
-        'Authorization': f'Bearer {os.environ.get("OPENAI_API_KEY")}',
-        'Content-Type': 'application/json',
-    }
-    data = {
-        'model': 'gpt-4o-mini',
-        'messages': [{'role': 'system', 'content': system_message}],
-        'temperature': 0.3,  # Should be based on game knowledge but also with a bit of creativity
-        'stream': True,
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=data) as response:
-            if response.status != 200:
-                raise Exception(f"Request failed with status {response.status}")
-
-            async for line in response.content:
-                chunk = line.decode('utf-8')
-
-                # remove data: and json loads
-                chunk = chunk[5:]
-                chunk = chunk.strip()
-
-                try:
-                    if chunk:
-                        json_data = json.loads(chunk)
-                        yield json_data['choices'][0]['delta']['content']
-                except:
-                    pass
-
 
 def has_card_for_action(action: Action, cards: List[Card]) -> Optional[Card]:
-    if action == Action.TAX and Card.DUKE in cards:
-        return Card.DUKE
-    elif action == Action.ASSASSINATE and Card.ASSASSIN in cards:
-        return Card.ASSASSIN
-    elif action == Action.STEAL and Card.CAPTAIN in cards:
-        return Card.CAPTAIN
-    elif action == Action.EXCHANGE and Card.AMBASSADOR in cards:
-        return Card.AMBASSADOR
+    card = rules.CLAIMS.get(action)
+    return card if card is not None and card in cards else None
 
-    return None
 
+def get_action_card(action: Action) -> Optional[Card]:
+    """The card a player claims to have by performing the action"""
+    return rules.CLAIMS.get(action)
 
-def has_challenge_card(action: Action, cards: List[Card]) -> Optional[Card]:
-    if action == Action.ASSASSINATE and Card.CONTESSA in cards:
-        return Card.CONTESSA
-    elif action == Action.STEAL and Card.CAPTAIN in cards:
-        return Card.CAPTAIN
-    elif action == Action.FOREIGN_AID and Card.DUKE in cards:
-        return Card.DUKE
 
-    return None
+def has_challenge_card(action: Action, cards: List[Card]) -> Optional[Card]:
+    card = rules.COUNTER_CLAIMS.get(action)
+    return card if card is not None and card in cards else None
 
 
 def get_counter_card(action: Action) -> Optional[Card]:
-    if action == Action.ASSASSINATE:
-        return Card.CONTESSA
-    elif action == Action.STEAL:
-        return Card.CAPTAIN
-    elif action == Action.FOREIGN_AID:
-        return Card.DUKE
-
-    return None
-
-
-def can_be_countered(action: Action):
-    return action in [Action.ASSASSINATE, Action.STEAL, Action.FOREIGN_AID]
-
-
-def can_be_challenged(action: Action):
-    return action in [Action.ASSASSINATE, Action.STEAL, Action.TAX, Action.EXCHANGE]
-
-
-def requires_target(action: Action):
-    return action in [Action.ASSASSINATE, Action.STEAL, Action.COUP]
-
-
+    return rules.COUNTER_CLAIMS.get(action)
 
 
 name_list = ["Alice", "Bob", "Charlie", "David", "Eve", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Kevin", "Lily", "Mia", "Nina", "Oliver", "Penny", "Quinn", "Riley", "Sara", "Tom", "Ursula", "Violet", "Wendy", "Xander", "Yara", "Zara"]
@@ -0,0 +1,318 @@
+"""
+Information-set Monte Carlo tree search policy.
+
+Every iteration deals the cards the player can't see at random, consistent with what they can see: their own hand and
+how many cards each opponent holds (discarded cards go back to the deck in this game, so nothing else is known for
+sure). The last card each opponent claimed is dealt to them first with probability `claim_trust`, since players
+mostly claim cards they have. The iteration then walks the tree of moves that are legal in that deal, adds one node
+and finishes the game with a rollout on `FastState`. Nodes keep how often they were available alongside their visits,
+so moves that are only legal in some deals aren't favoured (single-observer ISMCTS).
+
+The cost of a decision is set by `iterations` or `time_budget`. The tree is kept for the rest of the turn and the
+next decision in the same turn continues from the node matching the public state, if the search got there and no
+new claim was made since.
+"""
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+from src.datatypes import Action, ActionMessage
+from src.fast_state import (
+    CARDS,
+    CARDS_PER_TYPE,
+    NO_PLAYER,
+    NUM_CARD_TYPES,
+    PHASE_ACTION,
+    PHASE_CHALLENGE_ACTION,
+    PHASE_CHALLENGE_COUNTER,
+    PHASE_COUNTER,
+    PHASE_DISCARD,
+    PHASE_EXCHANGE,
+    STARTING_TREASURY,
+    FastState,
+    Move,
+    card_index,
+)
+from src.helper import get_action_card, get_counter_card
+from src.policies import DecisionPolicy, Observation
+from src.rules import COSTS, task_phase
+
+_POLL_PHASES = (PHASE_CHALLENGE_ACTION, PHASE_COUNTER, PHASE_CHALLENGE_COUNTER)
+
+# Card index claimed by each action and by countering each action
+_CLAIMS = {action: card_index(card) for action in Action if (card := get_action_card(action))}
+_COUNTERS = {action: card_index(card) for action in Action if (card := get_counter_card(action))}
+
+
+class Node:
+    __slots__ = ("move", "mover", "parent", "children", "visits", "available", "reward")
+
+    def __init__(self, move: Optional[Move] = None, mover: int = NO_PLAYER, parent: Optional["Node"] = None):
+        self.move = move
+        self.mover = mover  # the seat whose reward decides whether this move is worth choosing
+        self.parent = parent
+        self.children: Dict[Move, "Node"] = {}
+        self.visits = 0
+        self.available = 0
+        self.reward = 0.0
+
+    def ucb(self, exploration: float) -> float:
+        return self.reward / self.visits + exploration * math.sqrt(math.log(self.available) / self.visits)
+
+
+def public_key(state: FastState) -> tuple:
+    """Everything about a state that every player can see"""
+    return (state.turn, state.phase, state.turn_player, state.action, state.target, state.counterer, state.challenger,
+            state.coins, tuple(map(sum, state.hands)), state.pending_discards)
+
+
+class ISMCTSPolicy(DecisionPolicy):
+    """
+    Searches for `iterations` iterations per decision, or for `time_budget` seconds when it is given. Rollouts play
+    mostly honestly, bluffing with `rollout_bluff_rate` and challenging with `rollout_challenge_rate`, and a rollout
+    still running after `max_rollout_turns` is scored by each player's share of the remaining influence.
+    """
+
+    def __init__(self, agent, iterations: int = 300, time_budget: Optional[float] = None, exploration: float = 0.7,
+                 claim_trust: float = 0.75, rollout_bluff_rate: float = 0.1, rollout_challenge_rate: float = 0.1,
+                 max_rollout_turns: int = 100, seed: Optional[int] = None):
+        super().__init__(agent)
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.claim_trust = claim_trust
+        self.rollout_bluff_rate = rollout_bluff_rate
+        self.rollout_challenge_rate = rollout_challenge_rate
+        self.max_rollout_turns = max_rollout_turns
+        self.rng = random.Random(seed)
+
+        # The tree of the current turn, indexed by the public state of its nodes
+        self._turn: Optional[tuple] = None
+        self._nodes: Dict[tuple, Node] = {}
+        self._claims: Dict[str, int] = {}  # opponent name -> card index they last claimed
+        self._claimed: Dict[int, int] = {}  # the same by seat, for the current decision
+
+        self.iterations_run = 0
+        self.trees_reused = 0
+        self.search_seconds = 0.0
+
+    def decide(self, observation: Observation) -> Optional[ActionMessage]:
+        names = [opponent.name for opponent in observation.opponents]
+        names.insert(observation.seat, observation.player)
+        me = observation.seat
+
+        template = self._state(observation, names)
+        if template is None:
+            return None
+
+        self._remember_claims(observation)
+        self._claimed = {names.index(name): card for name, card in self._claims.items() if name in names}
+
+        root = self._root(template)
+        moves = self._moves(template, me, at_root=True)
+        if len(moves) > 1:
+            self._search(root, template, me)
+            move = max(moves, key=lambda m: root.children[m].visits if m in root.children else -1)
+        else:
+            move = moves[0]
+
+        cards = [CARDS[move.card]] if move.card >= 0 else None
+        if move.card2 >= 0:
+            cards.append(CARDS[move.card2])
+        return ActionMessage(action=move.action, sender=observation.player,
+                             target=names[move.target] if move.target != NO_PLAYER else None, cards=cards)
+
+    # Search
+
+    def _root(self, template: FastState) -> Node:
+        # A new claim changes how hands are dealt, so statistics gathered before it can't be reused
+        if self._turn != (template.turn, self._claimed):
+            self._turn = (template.turn, self._claimed)
+            self._nodes = {}
+
+        node = self._nodes.get(public_key(template))
+        if node is None:
+            node = Node()
+            self._nodes = {public_key(template): node}
+        else:
+            self.trees_reused += 1
+            node.parent = None
+        return node
+
+    def _search(self, root: Node, template: FastState, me: int):
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        iterations = 0
+        while (time.perf_counter() < deadline) if deadline is not None else (iterations < self.iterations):
+            self._iterate(root, self._determinize(template, me), me)
+            iterations += 1
+
+        self.iterations_run += iterations
+        self.search_seconds += time.perf_counter() - start
+
+    def _iterate(self, root: Node, state: FastState, me: int):
+        rng = self.rng
+        node = root
+        while not state.is_terminal:
+            legal = self._moves(state, me, at_root=node is root)
+            untried = []
+            for move in legal:
+                child = node.children.get(move)
+                if child is None:
+                    untried.append(move)
+                else:
+                    child.available += 1
+
+            if untried:
+                move = rng.choice(untried)
+                child = node.children[move] = Node(move, self._mover(state, move, me), node)
+                child.available = 1
+                state = state.apply(move, rng)
+                self._nodes.setdefault(public_key(state), child)
+                node = child
+                break
+
+            node = max((node.children[move] for move in legal), key=lambda c: c.ucb(self.exploration))
+            state = state.apply(node.move, rng)
+
+        rewards = self._rewards(self._rollout(state))
+        while node is not None:
+            node.visits += 1
+            if node.mover != NO_PLAYER:
+                node.reward += rewards[node.mover]
+            node = node.parent
+
+    def _moves(self, state: FastState, me: int, at_root: bool) -> List[Move]:
+        moves = state.legal_moves()
+        if at_root and state.phase in _POLL_PHASES:
+            # Only our own answer to the poll is ours to decide
+            return [move for move in moves if move.player in (NO_PLAYER, me)]
+        return moves
+
+    @staticmethod
+    def _mover(state: FastState, move: Move, me: int) -> int:
+        if move.player != NO_PLAYER:
+            return move.player
+        # Everybody passed, judged by us if we were asked
+        polled = state.acting_players()
+        return me if me in polled else polled[0]
+
+    def _rollout(self, state: FastState) -> FastState:
+        rng = self.rng
+        last_turn = state.turn + self.max_rollout_turns
+        while not state.is_terminal and state.turn < last_turn:
+            state = state.apply(self._rollout_move(state, rng), rng)
+        return state
+
+    def _rollout_move(self, state: FastState, rng: random.Random) -> Move:
+        """Mostly honest play: claim and block with cards in hand, and rarely bluff or challenge"""
+        moves = state.legal_moves()
+        phase = state.phase
+        if phase == PHASE_ACTION:
+            player = state.turn_player
+            if state.coins[player] >= COSTS[Action.COUP]:
+                return rng.choice([move for move in moves if move.action == Action.COUP])
+            if rng.random() >= self.rollout_bluff_rate:
+                hand = state.hands[player]
+                moves = [move for move in moves if move.action not in _CLAIMS or hand[_CLAIMS[move.action]]]
+            return rng.choice(moves)
+
+        if phase == PHASE_COUNTER:
+            card = _COUNTERS[state.action]
+            for move in moves[1:]:
+                if state.hands[move.player][card] or rng.random() < self.rollout_bluff_rate:
+                    return move
+            return moves[0]
+
+        if phase in _POLL_PHASES:
+            return rng.choice(moves[1:]) if rng.random() < self.rollout_challenge_rate else moves[0]
+        return rng.choice(moves)
+
+    @staticmethod
+    def _rewards(state: FastState) -> List[float]:
+        if state.is_terminal:
+            return [1.0 if seat == state.winner else 0.0 for seat in range(state.num_players)]
+        influence = [state.influence(seat) for seat in range(state.num_players)]
+        total = sum(influence)
+        return [count / total for count in influence]
+
+    # Determinization
+
+    def _state(self, observation: Observation, names: List[str]) -> Optional[FastState]:
+        """The public part of the state with our own hand, opponents hold the right number of placeholder cards"""
+        me = observation.seat
+        seat = {name: index for index, name in enumerate(names)}.get
+        opponents = iter(observation.opponents)
+        coins = []
+        hands = []
+        for index in range(len(names)):
+            if index == me:
+                hand = [0] * NUM_CARD_TYPES
+                for card in observation.cards:
+                    hand[card_index(card)] += 1
+                coins.append(observation.coins)
+                hands.append(tuple(hand))
+            else:
+                opponent = next(opponents)
+                coins.append(opponent.coins)
+                hands.append((opponent.influence,) + (0,) * (NUM_CARD_TYPES - 1))
+        coins = tuple(coins)
+
+        phase = task_phase(observation.expected_actions)
+        actor = seat(observation.actor, me) if observation.actor else me
+        state = dict(coins=coins, hands=tuple(hands), deck=(0,) * NUM_CARD_TYPES,
+                     treasury=max(STARTING_TREASURY - sum(coins), 0), turn=observation.turn, turn_player=actor,
+                     action=observation.action, target=seat(observation.target, NO_PLAYER),
+                     counterer=seat(observation.counterer, NO_PLAYER))
+        if phase == PHASE_ACTION:
+            return FastState(**dict(state, turn_player=me, action=None, target=NO_PLAYER, counterer=NO_PLAYER))
+        if phase == PHASE_CHALLENGE_ACTION:
+            phase = PHASE_CHALLENGE_COUNTER if observation.counterer else PHASE_CHALLENGE_ACTION
+            return FastState(**state, phase=phase)
+        if phase == PHASE_COUNTER:
+            return FastState(**state, phase=PHASE_COUNTER)
+        if phase == PHASE_DISCARD:
+            return FastState(**dict(state, action=None), phase=PHASE_DISCARD, pending_discards=(me,))
+        if phase == PHASE_EXCHANGE:
+            return FastState(**dict(state, turn_player=me), phase=PHASE_EXCHANGE, exchanging=True)
+        return None
+
+    def _remember_claims(self, observation: Observation):
+        action = observation.action
+        if observation.counterer and observation.counterer != observation.player:
+            card = get_counter_card(action)
+            self._claims[observation.counterer] = card_index(card)
+        if observation.actor and observation.actor != observation.player and (card := get_action_card(action)):
+            self._claims[observation.actor] = card_index(card)
+
+    def _determinize(self, template: FastState, me: int) -> FastState:
+        rng = self.rng
+        pool = [card for card in range(NUM_CARD_TYPES)
+                for _ in range(CARDS_PER_TYPE - template.hands[me][card])]
+
+        hands = [list(hand) if seat == me else [0] * NUM_CARD_TYPES for seat, hand in enumerate(template.hands)]
+        influences = list(map(sum, template.hands))
+        for seat, card in self._claimed.items():
+            if influences[seat] and card in pool and rng.random() < self.claim_trust:
+                pool.remove(card)
+                hands[seat][card] += 1
+                influences[seat] -= 1
+        rng.shuffle(pool)
+
+        dealt = 0
+        for seat, influence in enumerate(influences):
+            if seat == me:
+                continue
+            for card in pool[dealt:dealt + influence]:
+                hands[seat][card] += 1
+            dealt += influence
+
+        deck = [0] * NUM_CARD_TYPES
+        for card in pool[dealt:]:
+            deck[card] += 1
+
+        state = template.copy()
+        state.hands = tuple(map(tuple, hands))
+        state.deck = tuple(deck)
+        return state
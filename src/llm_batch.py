@@ -0,0 +1,289 @@
+"""
+Offline batch inference for large evaluation runs, where throughput and cost matter more than streaming latency.
+
+A `BatchClient` stands in for the streaming client of many concurrent games. Every request an agent makes is held
+until a batch is full or `flush_interval` seconds have passed since its first request, and the agents awaiting them are
+suspended along with their games meanwhile. The batch is written as a JSONL request file in the OpenAI batch format
+(one `{"custom_id", "method", "url", "body"}` line per request) and completed by a pluggable `BatchBackend`. When its
+output file comes back, every suspended agent gets its whole response as one stream and the games carry on. Requests
+cancelled by an interrupt before their batch was written are dropped from it.
+
+`LocalBatchBackend` completes a file on the machine with any streaming client (an LLMClient pointed at the mock server,
+the ScriptedClient of the benchmarks), and `OpenAIBatchBackend` uploads it to the Batch API and polls until it is done.
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from src.llm_client import LLMRequestError, chunks
+from src.llm_scheduler import PRIORITY_CHATTER
+
+BACKEND_LOCAL = "local"
+BACKEND_OPENAI = "openai"
+BATCH_BACKENDS = [BACKEND_LOCAL, BACKEND_OPENAI]
+
+ENDPOINT = "/v1/chat/completions"
+
+
+def read_results(path: str) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """(content, error) of every request in a batch output file, by custom_id"""
+    results = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                error = result.get("error") or response.get("body", {}).get("error")
+                results[result["custom_id"]] = (None, f"{response.get('status_code')}: {error}")
+            else:
+                results[result["custom_id"]] = (response["body"]["choices"][0]["message"]["content"] or "", None)
+    return results
+
+
+class BatchBackend(ABC):
+    """Completes a batch request file, writing the responses in the OpenAI batch output format to `output_path`"""
+
+    @abstractmethod
+    async def run(self, input_path: str, output_path: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Completes the requests of a batch on this machine with a streaming client, `concurrency` at a time. The client
+    isn't closed with the backend, it belongs to whoever created it.
+    """
+
+    def __init__(self, client, concurrency: int = 16):
+        self.client = client
+        self.concurrency = concurrency
+
+    async def _complete(self, semaphore: asyncio.Semaphore, request: dict) -> dict:
+        body = request["body"]
+        async with semaphore:
+            try:
+                content = "".join([chunk async for chunk in self.client.stream(
+                    body["messages"][0]["content"], response_format=body.get("response_format"))])
+            except LLMRequestError as e:
+                return {"custom_id": request["custom_id"], "response": {"status_code": e.status, "body": {}},
+                        "error": {"message": str(e)}}
+
+        completion = {"object": "chat.completion", "model": body["model"],
+                      "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                   "finish_reason": "stop"}]}
+        return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": completion}, "error": None}
+
+    async def run(self, input_path: str, output_path: str):
+        with open(input_path) as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[self._complete(semaphore, request) for request in requests])
+        with open(output_path, "w") as f:
+            f.writelines(json.dumps(result) + "\n" for result in results)
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    Uploads the file to the Batch API of an OpenAI-compatible endpoint, creates the batch and polls it every
+    `poll_interval` seconds until its output file can be downloaded
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str], poll_interval: float = 30.0,
+                 completion_window: str = "24h"):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers={'Authorization': f'Bearer {self.api_key}'})
+        return self._session
+
+    async def _json(self, method: str, path: str, **kwargs) -> dict:
+        async with self._get_session().request(method, f"{self.base_url}{path}", **kwargs) as response:
+            if response.status != 200:
+                raise LLMRequestError(response.status, await response.text())
+            return await response.json()
+
+    async def run(self, input_path: str, output_path: str):
+        form = aiohttp.FormData()
+        form.add_field("purpose", "batch")
+        with open(input_path, "rb") as f:
+            form.add_field("file", f.read(), filename=os.path.basename(input_path))
+        uploaded = await self._json("POST", "/files", data=form)
+
+        batch = await self._json("POST", "/batches", json={"input_file_id": uploaded["id"], "endpoint": ENDPOINT,
+                                                           "completion_window": self.completion_window})
+        while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            batch = await self._json("GET", f"/batches/{batch['id']}")
+
+        lines = []
+        for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+            if file_id:
+                async with self._get_session().get(f"{self.base_url}/files/{file_id}/content") as response:
+                    if response.status != 200:
+                        raise LLMRequestError(response.status, await response.text())
+                    lines.append(await response.text())
+        if not lines:
+            raise LLMRequestError(0, f"Batch {batch['id']} {batch['status']} without any output: {batch.get('errors')}")
+        with open(output_path, "w") as f:
+            f.write("\n".join(lines))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class BatchClient:
+    """
+    Collects the requests of every game using it into batches for `backend`. `client` is the LLMClient (or the
+    RequestScheduler around it) whose model, temperature and request body the batches use, and is closed with the
+    BatchClient. The request and output files are kept in `directory`, or in a new temporary directory removed on close
+    when it isn't given. With `skip_chatter` agents without a task get an empty response right away instead of a
+    request.
+    """
+
+    def __init__(self, client, backend: BatchBackend, batch_size: int = 256, flush_interval: float = 5.0,
+                 directory: Optional[str] = None, skip_chatter: bool = False):
+        self.client = client
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.temporary = directory is None
+        self.directory = tempfile.mkdtemp(prefix="coup-batch-") if self.temporary else directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.skip_chatter = skip_chatter
+
+        self._pending: Dict[str, Tuple[dict, asyncio.Future]] = {}
+        self._next_request = 0
+        self._next_batch = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.requests = 0  # written to a batch file
+        self.dropped = 0  # cancelled before their batch was written
+        self.discarded = 0  # completed after the agent had stopped waiting for them
+        self.skipped = 0  # chatter answered without a request
+        self.failed = 0
+        self.batch_seconds: List[float] = []
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @property
+    def temperature(self):
+        return self.client.temperature
+
+    async def stream(self, system_message: str, response_format: Optional[dict] = None, priority: Optional[int] = None,
+                     **request_options):
+        if self.skip_chatter and priority == PRIORITY_CHATTER:
+            self.skipped += 1
+            return
+
+        custom_id = f"{os.getpid()}-{self._next_request}"
+        self._next_request += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[custom_id] = (self.client.request_body(system_message, response_format, stream=False), future)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._flush)
+
+        try:
+            content = await future
+        except asyncio.CancelledError:
+            if self._pending.pop(custom_id, None) is not None:
+                self.dropped += 1
+            raise
+
+        for chunk in chunks(content):
+            yield chunk
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        task = asyncio.create_task(self._run_batch(self._next_batch, pending))
+        self._next_batch += 1
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, index: int, pending: Dict[str, Tuple[dict, asyncio.Future]]):
+        name = os.path.join(self.directory, f"batch-{os.getpid()}-{index:05d}")
+        input_path, output_path = f"{name}.jsonl", f"{name}-output.jsonl"
+        with open(input_path, "w") as f:
+            for custom_id, (body, _) in pending.items():
+                f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}) + "\n")
+        self.batches += 1
+        self.requests += len(pending)
+
+        start = time.perf_counter()
+        try:
+            await self.backend.run(input_path, output_path)
+            results = read_results(output_path)
+        except Exception as e:
+            results = {custom_id: (None, repr(e)) for custom_id in pending}
+        self.batch_seconds.append(time.perf_counter() - start)
+
+        for custom_id, (_, future) in pending.items():
+            if future.done():
+                self.discarded += 1
+                continue
+            content, error = results.get(custom_id, (None, "missing from the batch output"))
+            if error is not None:
+                self.failed += 1
+                future.set_exception(LLMRequestError(0, f"Batch request {custom_id} failed with {error}"))
+            else:
+                future.set_result(content)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "mean_batch_seconds": sum(self.batch_seconds) / len(self.batch_seconds) if self.batch_seconds else 0.0,
+            "dropped": self.dropped,
+            "discarded": self.discarded,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.backend.close()
+        await self.client.close()
+        if self.temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,164 @@
+"""
+Persistent cache of LLM chunk streams.
+
+Entries are keyed by model, temperature and prompt, and store every chunk together with the delay before it so a hit
+can be replayed either instantly or with the original pacing. The SQLite file can be shared between runs and between
+the tournament worker processes.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+PACING_ZERO = "zero"
+PACING_REALISTIC = "realistic"
+PACING_MODES = [PACING_ZERO, PACING_REALISTIC]
+
+
+def cache_key(model: str, temperature: float, prompt: str, response_format: Optional[dict] = None) -> str:
+    key = f"{model}\0{temperature}\0{prompt}"
+    if response_format is not None:
+        key += "\0" + json.dumps(response_format, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS streams (
+                key TEXT PRIMARY KEY,
+                chunks TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS streams_last_access ON streams (last_access)")
+        self._connection.commit()
+
+        # Kept up to date locally and only re-read from the file when eviction looks necessary, since other
+        # processes may be writing to the same cache
+        self.size = self._read_size()
+
+    def _read_size(self) -> int:
+        return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM streams").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.size,
+        }
+
+    def get(self, key: str) -> Optional[List[Tuple[float, str]]]:
+        """Cached (delay, chunk) pairs, counting the lookup as a hit or a miss"""
+        row = self._connection.execute("SELECT chunks FROM streams WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._connection.execute("UPDATE streams SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._connection.commit()
+        return [tuple(chunk) for chunk in json.loads(row[0])]
+
+    def put(self, key: str, chunks: List[Tuple[float, str]]):
+        data = json.dumps(chunks)
+        row = self._connection.execute("SELECT size FROM streams WHERE key = ?", (key,)).fetchone()
+        self.size += len(data) - (row[0] if row else 0)
+
+        self._connection.execute("INSERT OR REPLACE INTO streams (key, chunks, size, last_access) VALUES (?, ?, ?, ?)",
+                                 (key, data, len(data), time.time()))
+        self._connection.commit()
+
+        if self.size > self.max_bytes:
+            self.size = self._read_size()
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+
+        freed = 0
+        victims = []
+        for key, size in self._connection.execute("SELECT key, size FROM streams ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self._connection.executemany("DELETE FROM streams WHERE key = ?", victims)
+        self._connection.commit()
+        self.evictions += len(victims)
+        self.size -= freed
+
+    def close(self):
+        self._connection.close()
+
+
+class CachedClient:
+    """
+    Serves streams from an LLMCache and falls through to the wrapped client on a miss. Only streams that ran to
+    completion are stored, an interrupted generation is never replayed as if it were complete.
+    """
+
+    def __init__(self, client, cache: LLMCache, pacing: str = PACING_ZERO):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"Invalid pacing: {pacing}. Must be one of {', '.join(PACING_MODES)}")
+
+        self.client = client
+        self.cache = cache
+        self.pacing = pacing
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @property
+    def temperature(self):
+        return self.client.temperature
+
+    async def stream(self, system_message: str, **request_options):
+        key = cache_key(self.model, self.temperature, system_message, request_options.get("response_format"))
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            for delay, chunk in cached:
+                if self.pacing == PACING_REALISTIC and delay > 0:
+                    await asyncio.sleep(delay)
+                yield chunk
+            return
+
+        chunks = []
+        last = time.perf_counter()
+        async for chunk in self.client.stream(system_message, **request_options):
+            now = time.perf_counter()
+            chunks.append((now - last, chunk))
+            last = now
+            yield chunk
+
+        self.cache.put(key, chunks)
+
+    async def close(self):
+        await self.client.close()
+        self.cache.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
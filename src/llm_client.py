@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import re
+from typing import List, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+# Statuses worth retrying: rate limits and transient server errors
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+CHUNK_PATTERN = re.compile(r"\S+\s*")
+
+
+def default_base_url() -> str:
+    """OPENAI_BASE_URL from the environment (or .env), e.g. a local mock server, otherwise the OpenAI API"""
+    return os.environ.get("OPENAI_BASE_URL") or OPENAI_BASE_URL
+
+
+def chunks(text: str) -> List[str]:
+    """One word per chunk, roughly how a model streams tokens"""
+    return CHUNK_PATTERN.findall(text)
+
+
+class LLMRequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Request failed with status {status}: {message}")
+        self.status = status
+
+
+class LLMClient:
+    """
+    Long-lived client for streaming chat completions.
+
+    A single aiohttp session (and its keep-alive connection pool) is shared by every agent stream, so we only pay
+    the TCP+TLS handshake once per connection instead of once per generation. Owned by the game (or the process)
+    and must be closed with `close()` when done.
+
+    Requests rejected with a rate limit or a server error are retried up to `max_retries` times, after the server's
+    Retry-After or an exponential backoff. Nothing has been streamed at that point, so a retry is invisible to the
+    consumer.
+    """
+
+    def __init__(self,
+                 base_url: Optional[str] = None,
+                 api_key: Optional[str] = None,
+                 model: str = "gpt-4o-mini",
+                 temperature: float = 0.3,
+                 max_connections_per_host: int = 16,
+                 request_timeout: float = 60.0,
+                 connect_timeout: float = 10.0,
+                 keepalive_timeout: float = 30.0,
+                 max_retries: int = 3,
+                 retry_backoff: float = 0.5):
+        self.base_url = (base_url or default_base_url()).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.model = model
+        self.temperature = temperature  # Should be based on game knowledge but also with a bit of creativity
+
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, sock_connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retries = 0
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session is bound to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.max_connections_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            headers = {
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json',
+            }
+            self._session = aiohttp.ClientSession(connector=connector, headers=headers, timeout=self.timeout)
+        return self._session
+
+    def request_body(self, system_message: str, response_format: Optional[dict] = None, stream: bool = True) -> dict:
+        data = {
+            'model': self.model,
+            'messages': [{'role': 'system', 'content': system_message}],
+            'temperature': self.temperature,
+            'stream': stream,
+        }
+        if response_format is not None:
+            data['response_format'] = response_format  # e.g. the JSON schema of the structured output mode
+        return data
+
+    async def stream(self, system_message: str, response_format: Optional[dict] = None, **request_options):
+        # request_options are for the wrappers in front of the client, like the RequestScheduler's priority
+        data = self.request_body(system_message, response_format)
+
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            response = await session.post(self.url, json=data, timeout=self.timeout)
+            if response.status == 200:
+                break
+            message = await response.text()
+            response.release()
+            if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                raise LLMRequestError(response.status, message)
+            self.retries += 1
+            await asyncio.sleep(self._retry_delay(response, attempt))
+
+        async with response:
+            finished = False
+            try:
+                async for line in response.content:
+                    chunk = line.decode('utf-8')
+
+                    # remove data: and json loads
+                    chunk = chunk[5:]
+                    chunk = chunk.strip()
+
+                    if not chunk:
+                        continue
+
+                    try:
+                        content = json.loads(chunk)['choices'][0]['delta']['content']
+                    except (json.JSONDecodeError, KeyError, IndexError):
+                        continue  # e.g. [DONE] or the final empty delta
+
+                    if content:
+                        yield content
+                finished = True
+            finally:
+                if not finished:
+                    # Closed or cancelled by the consumer: drop the connection so the server stops generating
+                    response.close()
+
+    def _retry_delay(self, response: aiohttp.ClientResponse, attempt: int) -> float:
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return self.retry_backoff * 2 ** attempt
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,39 @@
+"""
+Builds the LLM client of a run from its options, with every optional layer around the LLMClient: the RequestScheduler
+for client-side rate limits, the BatchClient for offline batch inference and the CachedClient for replaying responses.
+"""
+from typing import Optional
+
+from src.llm_batch import (
+    BACKEND_LOCAL,
+    BatchClient,
+    LocalBatchBackend,
+    OpenAIBatchBackend,
+)
+from src.llm_cache import PACING_ZERO, CachedClient, LLMCache
+from src.llm_client import LLMClient
+from src.llm_scheduler import RequestScheduler
+
+
+def create_llm_client(cache_path: Optional[str] = None, cache_pacing: str = PACING_ZERO,
+                      cache_max_bytes: int = 256 * 1024 * 1024, requests_per_minute: Optional[float] = None,
+                      tokens_per_minute: Optional[float] = None, max_concurrent_requests: Optional[int] = None,
+                      batch_backend: Optional[str] = None, batch_size: int = 256, batch_interval: float = 5.0,
+                      batch_dir: Optional[str] = None, batch_skip_chatter: bool = False, **client_options):
+    """
+    LLMClient built from `client_options`, behind a RequestScheduler when any limit is given and wrapped in a
+    CachedClient when a cache path is given. Cache hits don't wait for the scheduler. With a `batch_backend` the
+    requests are collected into batches for it by a BatchClient instead of being streamed, the local backend
+    completing them with the LLMClient (and its limits).
+    """
+    client = LLMClient(**client_options)
+    if requests_per_minute or tokens_per_minute or max_concurrent_requests:
+        client = RequestScheduler(client, requests_per_minute, tokens_per_minute, max_concurrent_requests)
+    if batch_backend:
+        llm_client = client.client if isinstance(client, RequestScheduler) else client
+        backend = LocalBatchBackend(client) if batch_backend == BACKEND_LOCAL else \
+            OpenAIBatchBackend(llm_client.base_url, llm_client.api_key)
+        client = BatchClient(client, backend, batch_size, batch_interval, batch_dir, batch_skip_chatter)
+    if cache_path:
+        return CachedClient(client, LLMCache(cache_path, max_bytes=cache_max_bytes), pacing=cache_pacing)
+    return client
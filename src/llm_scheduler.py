@@ -0,0 +1,253 @@
+"""
+Central scheduler in front of the LLM client, for many agents and games streaming at once.
+
+Every stream waits for a grant before its request goes out. Grants are limited by token buckets for requests and tokens
+per minute, refilled continuously, and optionally by the number of streams open at once, so requests over the
+provider's limits are held back on the client instead of being rejected with a 429 and retried after a backoff.
+Waiting requests are served by priority class: the player who owes the answer to the turn's action, a discard or an
+exchange first, then answers to reaction polls, and chatter last. Within a class the games take turns, so one busy
+game can't starve the others.
+
+What a request costs in tokens isn't known up front. The prompt is estimated at `CHARS_PER_TOKEN` characters per token
+plus `completion_tokens` for the response, and the estimate is corrected by the chunks actually received (one token per
+chunk) when the stream ends.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional
+
+from src.telemetry import distribution
+
+PRIORITY_TASK = 0  # the action of the turn, a discard or an exchange
+PRIORITY_REACTION = 1  # a reaction to an action or a challenge of a counter
+PRIORITY_CHATTER = 2  # speech without any task
+PRIORITY_NAMES = {PRIORITY_TASK: "task", PRIORITY_REACTION: "reaction", PRIORITY_CHATTER: "chatter"}
+
+CHARS_PER_TOKEN = 4
+WAIT_SAMPLES = 1024  # most recent waits kept per priority class for the quantiles
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, holding at most `burst_seconds` worth of them"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 1.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available, 0 when it is now. More than the capacity only needs a full bucket"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float, now: float):
+        """Returns an overestimate to the bucket, or takes an underestimate from it when `amount` is negative"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Request:
+    __slots__ = ("priority", "game_id", "cost", "future", "queued_at", "throttled")
+
+    def __init__(self, priority: int, game_id: Hashable, cost: int, future: asyncio.Future):
+        self.priority = priority
+        self.game_id = game_id
+        self.cost = cost
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.throttled = False
+
+
+class RequestScheduler:
+    """
+    Wraps an LLM client and grants its streams by priority within the rate limits. Leaving a limit at None doesn't
+    enforce it. `stream()` takes the `priority` (one of the PRIORITY_ classes) and the `game_id` the stream belongs to,
+    any other options are passed on to the wrapped client.
+    """
+
+    def __init__(self, client,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_concurrent: Optional[int] = None,
+                 completion_tokens: int = 200,
+                 burst_seconds: float = 1.0):
+        self.client = client
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        self.max_concurrent = max_concurrent
+        self.completion_tokens = completion_tokens
+
+        # Waiting requests per priority class, queued per game in the order the games take turns
+        self._queues: Dict[int, OrderedDict[Hashable, Deque[_Request]]] = {priority: OrderedDict()
+                                                                           for priority in PRIORITY_NAMES}
+        self._open = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        self.granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.throttled = 0  # requests that had to wait for a rate limit, not only behind other requests
+        # Recent waits for the quantiles, and the total and longest wait since the start
+        self.waits: Dict[int, Deque[float]] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+        self.total_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.max_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self.peak_queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._started_at = self._depth_changed_at = time.monotonic()
+        self._depth_area = 0.0  # queue depth integrated over time, for the mean depth
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @property
+    def temperature(self):
+        return self.client.temperature
+
+    def request_body(self, system_message: str, response_format: Optional[dict] = None, stream: bool = True) -> dict:
+        return self.client.request_body(system_message, response_format, stream)
+
+    def estimate(self, system_message: str) -> int:
+        return len(system_message) // CHARS_PER_TOKEN + self.completion_tokens
+
+    async def stream(self, system_message: str, priority: int = PRIORITY_CHATTER, game_id: Hashable = None,
+                     **request_options):
+        cost = self.estimate(system_message)
+        await self._acquire(priority, game_id, cost)
+
+        received = 0
+        try:
+            async for chunk in self.client.stream(system_message, **request_options):
+                received += 1
+                yield chunk
+        finally:
+            self._release(cost, len(system_message) // CHARS_PER_TOKEN + received)
+
+    async def _acquire(self, priority: int, game_id: Hashable, cost: int):
+        request = _Request(priority, game_id, cost, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(game_id, deque()).append(request)
+        self._count_queued(priority, 1)
+        self._dispatch()
+
+        try:
+            await request.future
+        except asyncio.CancelledError:
+            if request.future.cancelled():
+                # Interrupted while waiting, the request never went out
+                queue = self._queues[priority][game_id]
+                queue.remove(request)
+                if not queue:
+                    del self._queues[priority][game_id]
+                self._count_queued(priority, -1)
+                self._dispatch()
+            else:
+                self._release(cost, 0)  # granted just as it was interrupted
+            raise
+
+    def _release(self, cost: int, used: int):
+        self._open -= 1
+        if self.tokens is not None:
+            self.tokens.give(cost - used, time.monotonic())
+        self._dispatch()
+
+    def _next(self) -> Optional[_Request]:
+        for priority in PRIORITY_NAMES:
+            games = self._queues[priority]
+            if games:
+                return next(iter(games.values()))[0]
+        return None
+
+    def _dispatch(self):
+        """Grants waiting requests in order until a limit is reached, and wakes up again when a bucket has refilled"""
+        while (request := self._next()) is not None:
+            if self.max_concurrent is not None and self._open >= self.max_concurrent:
+                return  # the next _release dispatches again
+
+            now = time.monotonic()
+            delay = max(self.requests.delay(1, now) if self.requests is not None else 0.0,
+                        self.tokens.delay(request.cost, now) if self.tokens is not None else 0.0)
+            if delay > 0:
+                if not request.throttled:
+                    request.throttled = True
+                    self.throttled += 1
+                self._schedule(delay)
+                return
+
+            games = self._queues[request.priority]
+            queue = games[request.game_id]
+            queue.popleft()
+            if queue:
+                games.move_to_end(request.game_id)  # the game's next request waits for the other games
+            else:
+                del games[request.game_id]
+            self._count_queued(request.priority, -1)
+
+            if self.requests is not None:
+                self.requests.take(1, now)
+            if self.tokens is not None:
+                self.tokens.take(request.cost, now)
+            self._open += 1
+            self.granted[request.priority] += 1
+            self._count_wait(request.priority, now - request.queued_at)
+            request.future.set_result(None)
+
+    def _schedule(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _count_wait(self, priority: int, wait: float):
+        self.waits[priority].append(wait)
+        self.total_wait[priority] += wait
+        self.max_wait[priority] = max(self.max_wait[priority], wait)
+
+    def _wait_distribution(self, priority: int) -> dict:
+        """Quantiles of the recent waits, with the count, sum and max of all of them"""
+        return dict(distribution(self.waits[priority]), count=self.granted[priority], sum=self.total_wait[priority],
+                    max=self.max_wait[priority])
+
+    def _count_queued(self, priority: int, change: int):
+        now = time.monotonic()
+        self._depth_area += sum(self.queued.values()) * (now - self._depth_changed_at)
+        self._depth_changed_at = now
+        self.queued[priority] += change
+        self.peak_queued[priority] = max(self.peak_queued[priority], self.queued[priority])
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        area = self._depth_area + sum(self.queued.values()) * (now - self._depth_changed_at)
+        return {
+            "open_streams": self._open,
+            "throttled": self.throttled,
+            "mean_queue_depth": area / (now - self._started_at) if now > self._started_at else 0.0,
+            "classes": {name: {"granted": self.granted[priority],
+                               "queued": self.queued[priority],
+                               "peak_queued": self.peak_queued[priority],
+                               "wait_seconds": self._wait_distribution(priority)}
+                        for priority, name in PRIORITY_NAMES.items()},
+        }
+
+    async def close(self):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,128 @@
+"""
+Bounded memory of what an agent has seen.
+
+The most recent entries (speeches, thoughts and game events) are kept verbatim in a ring buffer. Entries that fall out
+of it are folded into a running summary per player: the cards they claimed, the challenges they won and lost, the
+bluffs they were caught in and the cards they revealed. Which cards they probably hold is left to the BeliefTracker,
+which also sees the events still in the window. Folding happens in a callback on the event loop rather than while the
+entry is being appended, and the summary only grows with the number of players, so an agent's memory stays the same
+size however long the game runs.
+"""
+import asyncio
+from collections import Counter, deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from src.datatypes import Card
+
+LOG_WINDOW = 20
+
+
+class PublicEvent(NamedTuple):
+    """Something every player saw happen, in a form the summary can count"""
+    kind: str  # "speech", "claim", "challenge", "reveal" or "eliminated"
+    player: str
+    card: Optional[Card] = None
+    opponent: Optional[str] = None  # who challenged the player
+    won: Optional[bool] = None  # whether the challenger won
+
+
+class PlayerSummary:
+    def __init__(self):
+        self.claims: Counter = Counter()
+        self.caught_bluffing: Counter = Counter()
+        self.revealed: Counter = Counter()
+        self.challenges_won = 0
+        self.challenges_lost = 0
+        self.speeches = 0
+        self.eliminated = False
+
+    def __str__(self) -> str:
+        parts = []
+        if self.eliminated:
+            parts.append("eliminated")
+        if self.claims:
+            parts.append("claimed " + ", ".join(f"{card.name} x{count}" for card, count in self.claims.most_common()))
+        if self.caught_bluffing:
+            parts.append("caught bluffing " + ", ".join(card.name for card in self.caught_bluffing))
+        if self.revealed:
+            parts.append("revealed " + ", ".join(card.name for card in self.revealed.elements()))
+        if self.challenges_won or self.challenges_lost:
+            parts.append(f"challenges won {self.challenges_won}, lost {self.challenges_lost}")
+        if self.speeches:
+            parts.append(f"{self.speeches} earlier speeches")
+        return "; ".join(parts)
+
+
+class AgentMemory:
+    def __init__(self, window: int = LOG_WINDOW):
+        self.recent: Deque[Tuple[str, Optional[PublicEvent]]] = deque(maxlen=window)
+        self.players: Dict[str, PlayerSummary] = {}
+
+        self._evicted: List[Tuple[str, Optional[PublicEvent]]] = []
+        self._fold_scheduled = False
+
+        # Bumped whenever the recent entries or the summary change, used as cache keys by the prompt builder
+        self.version = 0
+        self.summary_version = 0
+        self.folded = 0
+
+    def append(self, text: str, event: Optional[PublicEvent] = None):
+        if len(self.recent) == self.recent.maxlen:
+            self._evicted.append(self.recent[0])
+            self._schedule_fold()
+        self.recent.append((text, event))
+        self.version += 1
+
+    def entries(self) -> List[str]:
+        return [text for text, _ in self.recent]
+
+    def summary(self) -> str:
+        self.fold()
+        return "\n".join(f"{name}: {text}" for name, player in self.players.items() if (text := str(player)))
+
+    def _schedule_fold(self):
+        if self._fold_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.fold()
+            return
+        self._fold_scheduled = True
+        loop.call_soon(self.fold)
+
+    def fold(self):
+        """Fold the evicted entries into the summary"""
+        self._fold_scheduled = False
+        if not self._evicted:
+            return
+
+        for text, event in self._evicted:
+            if event is None:
+                continue  # thoughts and feedback on the agent's own actions
+
+            player = self._player(event.player)
+            if event.kind == "speech":
+                player.speeches += 1
+            elif event.kind == "claim":
+                player.claims[event.card] += 1
+            elif event.kind == "challenge":
+                challenger = self._player(event.opponent)
+                if event.won:
+                    challenger.challenges_won += 1
+                    player.caught_bluffing[event.card] += 1
+                else:
+                    challenger.challenges_lost += 1
+            elif event.kind == "reveal":
+                player.revealed[event.card] += 1
+            elif event.kind == "eliminated":
+                player.eliminated = True
+
+        self.folded += len(self._evicted)
+        self._evicted = []
+        self.summary_version += 1
+
+    def _player(self, name: str) -> PlayerSummary:
+        if name not in self.players:
+            self.players[name] = PlayerSummary()
+        return self.players[name]
@@ -0,0 +1,71 @@
+"""
+Delivers game messages to agents.
+
+Every agent has a bounded inbox and a worker that hands its messages to `receive_message` in order. Sending only
+enqueues, so the game never waits on an agent to broadcast a speech or poll every player for a challenge. When an
+inbox is full the sender waits for room, which keeps a stalled agent from piling up an unbounded backlog.
+"""
+import asyncio
+from typing import Callable, Dict, Iterable, Optional
+
+from src.datatypes import Message
+
+
+class MessageBus:
+    def __init__(self, max_inbox_size: int = 64, on_error: Optional[Callable[[BaseException], None]] = None):
+        self.max_inbox_size = max_inbox_size
+        self.on_error = on_error
+
+        self._inboxes: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+        self.delivered = 0
+        self.max_depth = 0
+        self.blocked_sends = 0  # sends that had to wait for room in a full inbox
+
+    def register(self, agent):
+        inbox = asyncio.Queue(maxsize=self.max_inbox_size)
+        self._inboxes[agent.name] = inbox
+        self._workers[agent.name] = asyncio.create_task(self._deliver(agent, inbox))
+
+    async def send(self, agent, message: Message):
+        inbox = self._inboxes[agent.name]
+        if inbox.full():
+            self.blocked_sends += 1
+        await inbox.put(message)
+        self.max_depth = max(self.max_depth, inbox.qsize())
+
+    async def broadcast(self, agents: Iterable, message: Message):
+        for agent in agents:
+            await self.send(agent, message)
+
+    async def _deliver(self, agent, inbox: asyncio.Queue):
+        while True:
+            message = await inbox.get()
+            try:
+                await agent.receive_message(message)
+                self.delivered += 1
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(e)
+            finally:
+                inbox.task_done()
+
+    async def drain(self):
+        """Wait until every message sent so far has been delivered"""
+        for inbox in self._inboxes.values():
+            await inbox.join()
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers = {}
+
+    def stats(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "max_depth": self.max_depth,
+            "blocked_sends": self.blocked_sends,
+        }
@@ -0,0 +1,301 @@
+"""
+Local stand-in for an OpenAI-compatible chat-completions endpoint, for load tests and CI without the real API.
+
+It streams responses in the same server-sent events format (`data: {chunk}` lines and a final `data: [DONE]`), one
+word per chunk. Responses are either scripted strings, played in order, or generated by reading the prompt like a
+model would with `PromptResponder`, which answers the agent's task with a random valid action (or now and then a near
+miss of one), in JSON when the request asks for the structured output mode's response format. The `LatencyModel` sets
+the time to first token, the tokens per second and how often requests fail with a server error or a 429 rate-limit
+response, or once requests exceed a rate limit, and a seeded server gives the same sequence of delays and failures for
+the same sequence of requests.
+
+Run it on its own and point the game at it:
+    python -m src.mock_server --port 8000 --ttft 0.3 --tokens-per-second 40 --rate-limit-rate 0.02
+    python main.py --headless --games 10 --base-url http://127.0.0.1:8000/v1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from aiohttp import web
+from pydantic import BaseModel
+
+from src.llm_client import chunks
+from src.llm_scheduler import TokenBucket
+from src.structured_output import allowed_actions, repair
+
+TASK_PATTERN = re.compile(r"must NOW output one of the following actions\. ACTION: (.*)")
+PLAYER_PATTERN = re.compile(r"^(\w+) has \d+ coins with (\d+) cards\.$", re.MULTILINE)
+NAME_PATTERN = re.compile(r"Your name is (\w+)\.")
+CARDS_PATTERN = re.compile(r"Here are your cards:\n(.*)\n")
+
+
+class PromptResponder:
+    """
+    Reads an agent's prompt the way a model would: when the prompt lists tasks it answers one of them with a random
+    valid action, otherwise it chats with some probability. With `mistake_probability` an action is written the way a
+    sloppy model would now and then, which a strict response format rules out. Given a `response_format` the response
+    is a JSON object instead of SPEECH/THOUGHT/ACTION lines.
+    """
+
+    def __init__(self, seed: Optional[int] = 0, speech_probability: float = 0.3, challenge_probability: float = 0.5,
+                 mistake_probability: float = 0.0):
+        self.rng = random.Random(seed)
+        self.speech_probability = speech_probability
+        self.challenge_probability = challenge_probability
+        self.mistake_probability = mistake_probability
+
+    def __call__(self, prompt: str, response_format: Optional[dict] = None) -> str:
+        name = NAME_PATTERN.search(prompt).group(1)
+        tasks = TASK_PATTERN.findall(prompt)
+        if not tasks:
+            thought = speech = None
+            if self.rng.random() < self.speech_probability:
+                thought, speech = f"{name} wonders who has the Duke.", "I don't trust any of you."
+            return self._format(thought, speech, None, response_format)
+
+        thought, action = self._answer(name, tasks, prompt)
+        allowed = allowed_actions(response_format)
+        if allowed is not None and response_format["json_schema"].get("strict"):
+            # Constrained decoding only ever produces one of the allowed actions, e.g. the cards in another order
+            if action not in allowed:
+                action = repair(action, allowed) or self.rng.choice(allowed)
+        elif self.mistake_probability and self.rng.random() < self.mistake_probability:
+            action = self._mistake(action)
+        return self._format(thought, None, action, response_format)
+
+    @staticmethod
+    def _format(thought: Optional[str], speech: Optional[str], action: Optional[str],
+                response_format: Optional[dict]) -> str:
+        if response_format is not None:
+            return json.dumps({"thought": thought, "speech": speech, "action": action})
+        lines = [f"{kind}: {value}" for kind, value in (("THOUGHT", thought), ("SPEECH", speech), ("ACTION", action))
+                 if value is not None]
+        return "\n".join(lines + ["END"])
+
+    def _mistake(self, action: str) -> str:
+        """A near miss of the action: the wrong case, a trailing period, cards as printed in the prompt or no target"""
+        name, *arguments = action.split(" ")
+        kind = self.rng.randrange(4)
+        if kind == 0:
+            return action.lower()
+        if kind == 1:
+            return action + "."
+        if kind == 2 and name.startswith("DISCARD"):
+            return " ".join([name] + [f"Card.{card}" for card in arguments])
+        return name
+
+    def _answer(self, name: str, tasks: List[str], prompt: str) -> Tuple[str, str]:
+        """A thought and a random valid action answering one of the tasks"""
+        options = self.rng.choice(tasks).split(", ")
+        if "CHALLENGE" in options or "COUNTER" in options:
+            # Polls and reactions end with the option declining, the others challenge or counter
+            option = self.rng.choice(options[:-1]) if self.rng.random() < self.challenge_probability else options[-1]
+        else:
+            option = self.rng.choice(options)
+        parts = option.split(" ")
+        players = PLAYER_PATTERN.findall(prompt)
+        others = [other for other, cards in players if other != name and cards != "0"]
+        others = others or [other for other, _ in players if other != name]
+        cards = CARDS_PATTERN.search(prompt)
+        hand = [card.strip().replace("Card.", "") for card in cards.group(1).split(",")] if cards else []
+        hand = [card for card in hand if card] or ["DUKE"]
+
+        if "<target>" in option:
+            action = f"{parts[0]} {self.rng.choice(others)}"
+        elif "<card1>" in option:
+            action = f"{parts[0]} {' '.join(self.rng.sample(hand, 2) if len(hand) > 1 else hand * 2)}"
+        elif "<card>" in option:
+            action = f"{parts[0]} {self.rng.choice(hand)}"
+        else:
+            action = parts[0]
+
+        return f"I will go with {parts[0]}.", action
+
+
+class LatencyModel(NamedTuple):
+    ttft: float = 0.0  # seconds before the first chunk
+    ttft_jitter: float = 0.0  # standard deviation of the time to first token
+    tokens_per_second: Optional[float] = None  # None streams every chunk right away
+    error_rate: float = 0.0  # share of requests answered with a 500
+    rate_limit_rate: float = 0.0  # share of requests answered with a 429
+    max_concurrent_streams: Optional[int] = None  # requests above this many open streams get a 429
+    retry_after: float = 1.0  # seconds, sent in the Retry-After header of 429s
+    requests_per_minute: Optional[float] = None  # requests above this rate get a 429, with a burst of one second
+
+
+class MockServerStats(BaseModel):
+    requests: int = 0
+    completed: int = 0
+    aborted: int = 0  # the client went away mid-stream
+    errors: int = 0
+    rate_limited: int = 0
+    peak_streams: int = 0
+    connections: int = 0
+
+
+class MockServer:
+    """
+    Serves POST {base_url}/chat/completions. `responses` is a list of scripted responses played in order (and
+    repeated), or a callable creating a response from the prompt, a PromptResponder by default.
+    """
+
+    def __init__(self, responses: Union[Sequence[str], Callable[[str], str], None] = None,
+                 latency: LatencyModel = LatencyModel(), seed: Optional[int] = 0, host: str = "127.0.0.1",
+                 port: int = 0, model: str = "mock"):
+        if responses is None:
+            responses = PromptResponder(seed)
+        self._respond = responses if callable(responses) else itertools.cycle(responses).__next__
+        self._scripted = not callable(responses)
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.host = host
+        self.port = port
+        self.model = model
+
+        self.stats = MockServerStats()
+        self.aborted_at: List[float] = []  # perf_counter times at which a client went away mid-stream
+        self._peers: Set[tuple] = set()
+        self._streams = 0
+        self._requests = TokenBucket(latency.requests_per_minute) if latency.requests_per_minute else None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def response(self, prompt: str, response_format: Optional[dict] = None) -> str:
+        if self._scripted:
+            return self._respond()
+        return self._respond(prompt, response_format) if response_format is not None else self._respond(prompt)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.stats.requests += 1
+        peer = request.transport.get_extra_info('peername') if request.transport else None
+        if peer not in self._peers:
+            self._peers.add(peer)
+            self.stats.connections = len(self._peers)
+
+        body = await request.json()
+        latency = self.latency
+        roll = self.rng.random()
+        over_rate = False
+        if self._requests is not None:
+            now = time.monotonic()
+            over_rate = self._requests.delay(1, now) > 0
+            if not over_rate:
+                self._requests.take(1, now)
+        if (latency.max_concurrent_streams is not None and self._streams >= latency.max_concurrent_streams) or \
+                over_rate or roll < latency.rate_limit_rate:
+            self.stats.rate_limited += 1
+            return web.json_response(self._error("Rate limit reached", "rate_limit_exceeded"), status=429,
+                                     headers={'Retry-After': f"{latency.retry_after:g}"})
+        if roll < latency.rate_limit_rate + latency.error_rate:
+            self.stats.errors += 1
+            return web.json_response(self._error("The server had an error", "server_error"), status=500)
+
+        prompt = "\n".join(message.get('content', "") for message in body.get('messages', []))
+        text = self.response(prompt, body.get('response_format'))
+        ttft = max(self.rng.gauss(latency.ttft, latency.ttft_jitter), 0.0) if latency.ttft_jitter else latency.ttft
+        token_delay = 1.0 / latency.tokens_per_second if latency.tokens_per_second else 0.0
+
+        self._streams += 1
+        self.stats.peak_streams = max(self.stats.peak_streams, self._streams)
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        try:
+            await response.prepare(request)
+            if ttft:
+                await asyncio.sleep(ttft)
+            await self._send(response, {'role': 'assistant', 'content': ""})
+            for index, chunk in enumerate(chunks(text)):
+                if index and token_delay:
+                    await asyncio.sleep(token_delay)
+                await self._send(response, {'content': chunk})
+            await self._send(response, {}, finish_reason="stop")
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            self.stats.completed += 1
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.stats.aborted += 1
+            self.aborted_at.append(time.perf_counter())
+        finally:
+            self._streams -= 1
+        return response
+
+    async def _send(self, response: web.StreamResponse, delta: dict, finish_reason: Optional[str] = None):
+        chunk = {
+            'id': f"chatcmpl-mock-{self.stats.requests}",
+            'object': "chat.completion.chunk",
+            'model': self.model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+
+    @staticmethod
+    def _error(message: str, code: str) -> dict:
+        return {'error': {'message': message, 'type': code, 'code': code}}
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        # Cancel the handler as soon as the client goes away, like a provider that stops generating
+        self._runner = web.AppRunner(app, handler_cancellation=True)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # The port the OS picked when it was 0
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+async def serve(server: MockServer):
+    async with server:
+        print(f"Mock chat completions at {server.base_url}", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(server.stats.model_dump_json(), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--ttft-jitter", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrent-streams", type=int, default=None)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--script", type=str, default=None,
+                        help="JSON file with a list of responses to play in order instead of reading the prompts")
+    args = parser.parse_args()
+
+    responses = None
+    if args.script:
+        with open(args.script) as f:
+            responses = json.load(f)
+    latency = LatencyModel(args.ttft, args.ttft_jitter, args.tokens_per_second, args.error_rate, args.rate_limit_rate,
+                           args.max_concurrent_streams, args.retry_after, args.requests_per_minute)
+    try:
+        asyncio.run(serve(MockServer(responses, latency, seed=args.seed, host=args.host, port=args.port)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,164 @@
+from typing import List
+
+from rich.table import Column, Table
+from rich.text import Text
+
+from src.datatypes import (
+    CARD_BACKGROUND_COLOR_MAP,
+    CARD_FOREGROUND_COLOR_MAP,
+    ActionMessage,
+    SpeechMessage,
+)
+from src.print_utils import clear_screen, print_table, print_text
+
+
+class GameObserver:
+    """
+    Receives every presentation event from the game. The game never prints directly, so a run can swap the rich
+    console output for something else (or nothing at all).
+
+    The base implementation ignores all events.
+    """
+
+    def on_game_start(self, players: List):
+        pass
+
+    def on_task_sent(self, players: List, content: str):
+        pass
+
+    def on_action(self, message: ActionMessage):
+        pass
+
+    def on_speech(self, message: SpeechMessage):
+        pass
+
+    def on_thought(self, player, content: str):
+        pass
+
+    def on_player_eliminated(self, player):
+        pass
+
+    def on_game_won(self, player):
+        pass
+
+    def on_turn_end(self, players: List, current_player_index: int, current_turn: int):
+        pass
+
+
+class NullObserver(GameObserver):
+    """Discards every event, used for headless runs"""
+
+
+class ObserverGroup(GameObserver):
+    """Forwards every event to each of its observers in order"""
+
+    def __init__(self, observers: List[GameObserver]):
+        self.observers = observers
+
+    def on_game_start(self, players: List):
+        for observer in self.observers:
+            observer.on_game_start(players)
+
+    def on_task_sent(self, players: List, content: str):
+        for observer in self.observers:
+            observer.on_task_sent(players, content)
+
+    def on_action(self, message: ActionMessage):
+        for observer in self.observers:
+            observer.on_action(message)
+
+    def on_speech(self, message: SpeechMessage):
+        for observer in self.observers:
+            observer.on_speech(message)
+
+    def on_thought(self, player, content: str):
+        for observer in self.observers:
+            observer.on_thought(player, content)
+
+    def on_player_eliminated(self, player):
+        for observer in self.observers:
+            observer.on_player_eliminated(player)
+
+    def on_game_won(self, player):
+        for observer in self.observers:
+            observer.on_game_won(player)
+
+    def on_turn_end(self, players: List, current_player_index: int, current_turn: int):
+        for observer in self.observers:
+            observer.on_turn_end(players, current_player_index, current_turn)
+
+
+class ConsoleObserver(GameObserver):
+    """Renders the game to the terminal with rich"""
+
+    def on_game_start(self, players: List):
+        clear_screen()
+        print_table(generate_player_info_table(players))
+
+    def on_task_sent(self, players: List, content: str):
+        print_text(f"Sending task message to {players}: {content.upper()}", style="bold cyan", rainbow=False,
+                   with_markup=True)
+
+    def on_action(self, message: ActionMessage):
+        print_text(f"{message.sender} sent ACTION: {str(message)}", style="bold green", with_markup=True)
+
+    def on_speech(self, message: SpeechMessage):
+        print_text(f"{message.sender}: {message.content}")
+
+    def on_thought(self, player, content: str):
+        print_text(f"*{player.name} is THINKING: {content}*", style="italic grey")
+
+    def on_player_eliminated(self, player):
+        print_text(f"Player {player.name} has been eliminated from the game!", style="bold red", with_markup=True)
+
+    def on_game_won(self, player):
+        print_text(f"Player {player.name} has won the game!", style="bold", rainbow=True, with_markup=True)
+
+    def on_turn_end(self, players: List, current_player_index: int, current_turn: int):
+        print_text(f"End of Turn {current_turn}", style="bold", with_markup=True)
+        print_table(generate_player_summary_table(players, current_player_index))
+
+
+def generate_player_info_table(players: List):
+    """Generate a table to show their name, personality and starting cards"""
+    table = Table("Player", "Personality", Column(header="Cards", justify="center", min_width=40))
+    for player in players:
+        name_text = Text.from_markup(f":robot: {player.name}")
+        personality_text = Text.from_markup(f":person_tipping_hand: {player.personality}")
+
+        card_text = Text()
+        for card in player.cards:
+            card_text.append(
+                str(card), style=f"{CARD_FOREGROUND_COLOR_MAP[card]} on {CARD_BACKGROUND_COLOR_MAP[card]}"
+            )
+            card_text.append(" ")
+
+        table.add_row(name_text, personality_text, card_text)
+
+    return table
+
+
+def generate_player_summary_table(players: List, current_player_index: int) -> Table:
+    """Generate a table of the players"""
+    table = Table("Player", "Coins", Column(header="Cards", justify="center", min_width=40))
+    for ind, player in enumerate(players):
+        player_text = Text.from_markup(f":robot: {str(player.name)}")
+
+        if ind == current_player_index:
+            player_text.stylize("bold magenta")
+
+        coin_text = Text(str(player.coins), style="gray")
+
+        card_text = Text()
+        if player.is_active:
+            for card in player.cards:
+                card_text.append(
+                    str(card), style=f"{CARD_FOREGROUND_COLOR_MAP[card]} on {CARD_BACKGROUND_COLOR_MAP[card]}"
+                )
+                card_text.append(" ")
+        else:
+            card_text = Text.from_markup(":skull:")
+
+        table.add_row(player_text, coin_text, card_text)
+
+    return table
@@ -0,0 +1,320 @@
+"""
+How agents decide what to do.
+
+`Agent.receive_message` records every message and then notifies the agent's `Policy`. The LLM policy is the
+`WakeupScheduler`, which streams a generation with the agent's prompt. Policies that don't need an LLM derive from
+`DecisionPolicy` instead: they answer each task as soon as it arrives, from a structured `Observation` of the game, and
+submit the chosen action straight to the engine. The same policies can play a `FastState` without any engine with
+`play_fast_game`, for load tests and simulations.
+"""
+import random
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from src.beliefs import BeliefView
+from src.datatypes import Action, ActionMessage, Card
+from src.fast_state import CARDS, NO_CARD, NO_PLAYER, FastState, Move, card_index
+from src.helper import (
+    get_action_card,
+    get_counter_card,
+    has_card_for_action,
+    has_challenge_card,
+)
+from src.rules import (
+    BASE,
+    PHASE_ACTION,
+    PHASE_CHALLENGE_ACTION,
+    PHASE_COUNTER,
+    PHASE_DISCARD,
+    PHASE_EXCHANGE,
+    PHASE_REACTION,
+    actions,
+    can_be_challenged,
+    legal_actions,
+    task_phase,
+)
+
+
+class Policy:
+    """
+    Drives one agent. The base implementation never acts, which leaves the agent waiting forever, so every game needs
+    a subclass.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def start(self):
+        pass
+
+    def notify(self, urgent: bool = False):
+        """The agent's log or tasks changed, tasks and game events are urgent"""
+        pass
+
+    def interrupt(self):
+        """The agent's last task was completed, stop working on it"""
+        pass
+
+    def rejected(self):
+        """The engine rejected the agent's last action with a game event, the task is still open"""
+        self.notify(urgent=True)
+
+    async def stop(self):
+        pass
+
+
+class Opponent(NamedTuple):
+    name: str
+    coins: int
+    influence: int
+
+
+class Observation(NamedTuple):
+    """What a player can see when a task asks them for one of `expected_actions`"""
+    player: str
+    coins: int
+    cards: Tuple[Card, ...]
+    opponents: Tuple[Opponent, ...]  # active opponents in seat order
+    turn: int
+    expected_actions: Tuple[Action, ...]
+
+    # The action of the current turn, when the task is about challenging or countering it
+    action: Optional[Action] = None
+    actor: Optional[str] = None
+    target: Optional[str] = None
+    counterer: Optional[str] = None
+
+    seat: int = 0  # where the player sits among the active players, the opponents come before and after in order
+    beliefs: Optional[BeliefView] = None  # the player's card beliefs, when the game tracks them
+
+
+def observe(agent, task) -> Observation:
+    game_state = agent.game_state
+    active = [player for player in game_state.players if player.is_active]
+    opponents = tuple(Opponent(player.name, player.coins, len(player.cards))
+                      for player in active if player is not agent)
+    seat = next((seat for seat, player in enumerate(active) if player is agent), 0)
+    beliefs = game_state.beliefs.view(agent.name) if game_state.beliefs is not None else None
+    observation = Observation(agent.name, agent.coins, tuple(agent.cards), opponents, game_state.current_turn,
+                              tuple(task.expected_actions or ()), seat=seat, beliefs=beliefs)
+
+    turn_data = game_state.current_turn_data
+    if turn_data is None:
+        return observation
+    return observation._replace(
+        action=turn_data.action,
+        actor=turn_data.source_player.name,
+        target=turn_data.target_player.name if turn_data.target_player else None,
+        counterer=turn_data.countering_player.name if turn_data.countering_player else None,
+    )
+
+
+class DecisionPolicy(Policy, ABC):
+    """Answers every task once, as soon as it arrives and the previous answer was handled, with `decide`'s action"""
+
+    def __init__(self, agent):
+        super().__init__(agent)
+        self._answered = set()  # ids of the tasks in agent.tasks that were already answered
+        self.decisions = 0
+
+    def notify(self, urgent: bool = False):
+        tasks = self.agent.tasks
+        # Only ids of tasks still in the list, a completed task's id may be reused by a new one
+        self._answered = {id(task) for task in tasks if id(task) in self._answered}
+        if self._answered or not self.agent.cards:
+            # One answer at a time: two discards owed at once must see the hand left by the first one. The engine
+            # completes the task when it handles the answer, which notifies us again for the next one. Without cards
+            # the remaining tasks are about to be completed by the engine.
+            return
+        for task in tasks:
+            self._answered.add(id(task))
+            message = self.answer(observe(self.agent, task))
+            self.decisions += 1
+            if message is not None:
+                self.agent.game_state.submit_nowait(message)
+                return
+
+    def rejected(self):
+        # The answer in flight was rejected, so its task is answered again
+        self._answered.clear()
+        self.notify(urgent=True)
+
+    def answer(self, observation: Observation) -> Optional[ActionMessage]:
+        """
+        `decide`'s answer to a task. A reaction task is decided as the challenge poll and then the counter poll it
+        replaces, so policies only need to know about those.
+        """
+        if task_phase(observation.expected_actions) != PHASE_REACTION:
+            return self.decide(observation)
+
+        options = observation.expected_actions
+        for act, expected in ((Action.CHALLENGE, CHALLENGE_ACTIONS), (Action.COUNTER, COUNTER_ACTIONS)):
+            if act in options:
+                message = self.decide(observation._replace(expected_actions=expected))
+                if message is not None and message.action == act:
+                    return message
+        return ActionMessage(action=Action.PASS, sender=observation.player)
+
+    @abstractmethod
+    def decide(self, observation: Observation) -> Optional[ActionMessage]:
+        pass
+
+
+BASE_ACTIONS = actions(BASE)  # whatever they cost, a player's task only has the ones they can afford
+CHALLENGE_ACTIONS = legal_actions(PHASE_CHALLENGE_ACTION)
+COUNTER_ACTIONS = legal_actions(PHASE_COUNTER)
+DISCARD_ACTIONS = legal_actions(PHASE_DISCARD)
+EXCHANGE_ACTIONS = legal_actions(PHASE_EXCHANGE)
+
+# Which card to keep when one has to go, higher is kept longer
+CARD_VALUE = {Card.DUKE: 5, Card.ASSASSIN: 4, Card.CAPTAIN: 3, Card.CONTESSA: 2, Card.AMBASSADOR: 1}
+
+
+class HeuristicPolicy(DecisionPolicy):
+    """
+    Deterministic rules of thumb that never call an LLM: coup when affordable, otherwise use a card in hand, only
+    counter with the right card, and only challenge a claim that is unlikely (or when about to lose anyway). A claim
+    is unlikely when we hold two of the claimed cards, or when the game tracks beliefs and the claimant holds the card
+    with a chance below `challenge_below`. Actions that were blocked before aren't tried again on the same player, so
+    two of these can't block each other forever.
+    """
+
+    def __init__(self, agent, coup_threshold: int = 7, challenge_below: float = 0.25):
+        super().__init__(agent)
+        self.coup_threshold = coup_threshold
+        self.challenge_below = challenge_below
+        self.blocked: Set[Tuple[Action, Optional[str]]] = set()  # (action, target) that somebody countered
+
+    def decide(self, observation: Observation) -> Optional[ActionMessage]:
+        phase = task_phase(observation.expected_actions)
+        if phase == PHASE_ACTION:
+            return self.choose_action(observation)
+        if phase == PHASE_CHALLENGE_ACTION:
+            return self.choose_challenge(observation)
+        if phase == PHASE_COUNTER:
+            return self.choose_counter(observation)
+        if phase == PHASE_DISCARD:
+            card = min(observation.cards, key=CARD_VALUE.get)
+            return ActionMessage(action=Action.DISCARD, cards=[card], sender=observation.player)
+        if phase == PHASE_EXCHANGE:
+            cards = sorted(observation.cards, key=CARD_VALUE.get)[:2]
+            return ActionMessage(action=Action.DISCARD_TWO, cards=cards, sender=observation.player)
+        return None
+
+    def choose_action(self, observation: Observation) -> ActionMessage:
+        player, cards, coins = observation.player, observation.cards, observation.coins
+        legal = observation.expected_actions
+        # The opponent closest to winning: most influence, then most coins
+        target = max(observation.opponents, key=lambda opponent: (opponent.influence, opponent.coins))
+
+        if Action.COUP in legal and (coins >= self.coup_threshold or len(legal) == 1):
+            return ActionMessage(action=Action.COUP, target=target.name, sender=player)
+        if Action.ASSASSINATE in legal and has_card_for_action(Action.ASSASSINATE, cards) and \
+                (Action.ASSASSINATE, target.name) not in self.blocked:
+            return ActionMessage(action=Action.ASSASSINATE, target=target.name, sender=player)
+        if has_card_for_action(Action.TAX, cards):
+            return ActionMessage(action=Action.TAX, sender=player)
+
+        richest = max(observation.opponents, key=lambda opponent: opponent.coins)
+        if richest.coins >= 2 and has_card_for_action(Action.STEAL, cards) and \
+                (Action.STEAL, richest.name) not in self.blocked:
+            return ActionMessage(action=Action.STEAL, target=richest.name, sender=player)
+        if has_card_for_action(Action.EXCHANGE, cards):
+            return ActionMessage(action=Action.EXCHANGE, sender=player)
+        if (Action.FOREIGN_AID, None) not in self.blocked:
+            return ActionMessage(action=Action.FOREIGN_AID, sender=player)
+        return ActionMessage(action=Action.INCOME, sender=player)
+
+    def choose_challenge(self, observation: Observation) -> ActionMessage:
+        action, cards = observation.action, observation.cards
+        if observation.counterer is not None:
+            if observation.actor == observation.player:
+                self.blocked.add((action, observation.target))
+            claimant, claimed = observation.counterer, get_counter_card(action)
+        else:
+            claimant, claimed = observation.actor, get_action_card(action) if can_be_challenged(action) else None
+
+        # Holding two copies of the claimed card leaves only one for everyone else
+        unlikely = claimed is not None and (cards.count(claimed) >= 2 or (
+            observation.beliefs is not None and observation.beliefs.chance(claimant, claimed) < self.challenge_below))
+        # An assassination on our last card can't be survived without a Contessa, so calling the bluff costs nothing
+        doomed = all((action == Action.ASSASSINATE, observation.counterer is None,
+                      observation.target == observation.player, len(cards) == 1, not has_challenge_card(action, cards)))
+
+        decision = Action.CHALLENGE if unlikely or doomed else Action.NO_CHALLENGE
+        return ActionMessage(action=decision, sender=observation.player)
+
+    def choose_counter(self, observation: Observation) -> ActionMessage:
+        action = observation.action
+        targeted = observation.target is None or observation.target == observation.player
+        can_block = has_challenge_card(action, observation.cards) is not None
+        decision = Action.COUNTER if targeted and can_block else Action.NO_COUNTER
+        return ActionMessage(action=decision, sender=observation.player)
+
+
+_hand_cards = {}  # FastState hand counts -> cards, there are only a few dozen different hands
+
+
+def _cards(hand: tuple) -> Tuple[Card, ...]:
+    cards = _hand_cards.get(hand)
+    if cards is None:
+        cards = _hand_cards[hand] = tuple(card for card, count in zip(CARDS, hand) for _ in range(count))
+    return cards
+
+
+def seat_table(state: FastState) -> Tuple[Opponent, ...]:
+    """Every active seat of a FastState as an Opponent, players are named by their seat number"""
+    return tuple(Opponent(str(seat), state.coins[seat], influence)
+                 for seat, influence in enumerate(map(sum, state.hands)) if influence)
+
+
+def observe_fast_state(state: FastState, player: int, expected_actions: Tuple[Action, ...],
+                       seats: Optional[Tuple[Opponent, ...]] = None) -> Observation:
+    """The Observation of a FastState seat, `seats` is its seat_table when several players observe the same state"""
+    name = str(player)
+    seats = seats if seats is not None else seat_table(state)
+    opponents = tuple(seat for seat in seats if seat.name != name)
+    return Observation(
+        name, state.coins[player], _cards(state.hands[player]),
+        opponents, state.turn, expected_actions,
+        action=state.action,
+        actor=str(state.turn_player) if state.action is not None else None,
+        target=str(state.target) if state.target != NO_PLAYER else None,
+        counterer=str(state.counterer) if state.counterer != NO_PLAYER else None,
+        seat=sum(1 for seat in seats if int(seat.name) < player),
+    )
+
+
+def play_fast_game(state: FastState, policies: List[DecisionPolicy], rng: random.Random,
+                   max_turns: int = 1000) -> FastState:
+    """
+    Play a FastState to the end with one decision policy per seat and no engine, agents or event loop. Every polled
+    player answers and the first one in seat order to challenge or counter is taken. Returns the final state, which
+    isn't terminal if the game reached `max_turns`.
+    """
+    while not state.is_terminal and state.turn < max_turns:
+        phase = state.phase
+        if phase == PHASE_ACTION:
+            player = state.turn_player
+            expected = legal_actions(phase, state.coins[player])
+            message = policies[player].decide(observe_fast_state(state, player, expected))
+            target = int(message.target) if message.target is not None else NO_PLAYER
+            move = Move(message.action, player, target)
+        elif phase == PHASE_DISCARD or phase == PHASE_EXCHANGE:
+            player = state.acting_players()[0]
+            expected = DISCARD_ACTIONS if phase == PHASE_DISCARD else EXCHANGE_ACTIONS
+            message = policies[player].decide(observe_fast_state(state, player, expected))
+            cards = [card_index(card) for card in message.cards]
+            move = Move(message.action, player, card=cards[0], card2=cards[1] if len(cards) > 1 else NO_CARD)
+        else:
+            expected, act, decline = (COUNTER_ACTIONS, Action.COUNTER, Action.NO_COUNTER) if phase == PHASE_COUNTER \
+                else (CHALLENGE_ACTIONS, Action.CHALLENGE, Action.NO_CHALLENGE)
+            move = Move(decline)
+            seats = seat_table(state)
+            for player in state.acting_players():
+                # Everyone answers, as they would in the engine, so every policy sees the poll
+                if policies[player].decide(observe_fast_state(state, player, expected, seats)).action == act and \
+                        move.action == decline:
+                    move = Move(act, player)
+        state = state.apply(move, rng)
+    return state
@@ -1,4 +1,5 @@
 import random
+from typing import Optional
 
 from rich.console import Console, JustifyMethod
 from rich.highlighter import Highlighter
@@ -8,20 +9,27 @@ from rich.table import Table
 from rich.text import Text
 
 console = Console()
+stderr_console = Console(stderr=True)
 
 
 class RainbowHighlighter(Highlighter):
+    def __init__(self, rng: Optional[random.Random] = None):
+        # Own generator so rendering never consumes the game's random state
+        self.rng = rng or random.Random()
+
     def highlight(self, text):
         for index in range(len(text)):
-            text.stylize(f"color({random.randint(16, 255)})", index, index + 1)
+            text.stylize(f"color({self.rng.randint(16, 255)})", index, index + 1)
 
 
 def print_blank():
     console.print()
 
 
-def print_text(content: str, style: str = "", rainbow: bool = False, with_markup: bool = False):
-    print_blank()
+def print_text(content: str, style: str = "", rainbow: bool = False, with_markup: bool = False, stderr: bool = False):
+    # stderr keeps status lines out of results written to stdout
+    target = stderr_console if stderr else console
+    target.print()
 
     text = Text(content)
 
@@ -34,7 +42,7 @@ def print_text(content: str, style: str = "", rainbow: bool = False, with_markup
     if rainbow:
         text = RainbowHighlighter()(text)
 
-    console.print(text)
+    target.print(text)
 
 
 def print_prompt(content: str, empty_allowed=False) -> str:
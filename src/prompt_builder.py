@@ -0,0 +1,272 @@
+"""
+Assembles the system prompt for an agent's LLM call.
+
+Everything that never changes for an agent (name, rules, personality, output format and examples) is built once and
+placed first, so consecutive prompts share the longest possible prefix and are cacheable by the provider. The dynamic
+sections (card beliefs, summary of earlier events, log window, player table, cards, tasks and turn) follow, and each one
+is only rebuilt when its inputs change. In the structured output mode the format instructions ask for a JSON object
+instead of SPEECH/THOUGHT/ACTION lines, the rest of the prompt is the same. The card beliefs come from the game's
+BeliefTracker, so the model gets the odds of every opponent's cards directly instead of working them out from the log.
+"""
+from typing import List, Optional, Tuple
+
+from src.beliefs import BeliefTracker
+from src.datatypes import Action
+from src.memory import AgentMemory
+from src.rules import requires_target
+
+
+def map_action_to_output_format(action: Action):
+    action_name = str(action.name)
+
+    if requires_target(action):
+        return f"{action_name} <target>"
+
+    if action == Action.DISCARD:
+        return f"{action_name} <card>"
+
+    if action == Action.DISCARD_TWO:
+        return f"{action_name} <card1> <card2>"
+
+    return action_name
+
+
+def game_explanation():
+    return """Here’s an extremely brief summary of the game *Coup*, highlighting the main actions, cards, and challenge-counter mechanics:
+
+### Cards (Roles) with Actions and Blocks
+1. **Duke**: Takes 3 coins from the treasury with TAX (not blockable), can block foreign aid action.
+2. **Assassin**: Pays 3 coins to assassinate another player's character.
+3. **Captain**: Steals 2 coins from another player, can block stealing.
+4. **Ambassador**: Draws 2 cards to swap with court deck, can block stealing.
+5. **Contessa**: Can block assassination.
+
+### Additional Actions
+- **Income**: Take 1 coin.
+- **Foreign Aid**: Take 2 coins from the treasury (can be blocked by Duke).
+- **Coup**: Pay 7 coins to launch a coup against another player, forcing them to lose an influence. This action cannot be blocked or challenged.
+
+### Challenge
+- If a player believes another player does not have the card they claim to be using, they can challenge them. A failed challenge results in the challenger losing an influence; a successful challenge results in the challenged player losing an influence.
+
+### Counteractions
+- Certain cards block specific actions (e.g., Duke blocks Foreign Aid, Captain and Ambassador block stealing, Contessa blocks assassination).
+
+### Reacting to an action
+- When another player acts, you answer once: CHALLENGE, COUNTER (if you can block it) or PASS. If one player challenges and another counters, the challenge is resolved first.
+
+### Winning the Game
+Be the last player with influence (cards) remaining to win the game."""
+
+
+TASK_INSTRUCTIONS = """In your communications, you can choose to use SPEECH, THOUGHT, or ACTION.
+- Use 'SPEECH:' to communicate anything to other players.
+- Use 'THOUGHT:' to reflect on your best course of action that maximizes your chances of winning, what cards you think others have, how you should respond to other players, etc.
+- Use 'ACTION:' to make a strategic move, specifying the action and the target player.
+We recommend that you think through your strategy with multiple thoughts (THOUGHT) before committing to any action.
+
+Your output should strictly follow this format, with each new line beginning with one of SPEECH, THOUGHT, or ACTION:
+SPEECH: <what you want to say to others to manipulate/collaborate with them>
+THOUGHT: <thoughts that lead to maximizing your chances of winning by ANY means>
+ACTION: <action name> <target player>
+
+You can output multiple in sequence.
+Example 1:
+THOUGHT: Since Susan has the most coins, I should target her.
+SPEECH: What cards do you guys think Susan has?
+
+Example 2:
+THOUGHT: Ok it looks like Susan doesn't have the Contessa to counter my Assassin
+ACTION: ASSASSINATE Susan
+
+Example 3:
+THOUGHT: I think my duke card is probably more valuable than my captain card
+ACTION: DISCARD CAPTAIN
+
+Example 4:
+THOUGHT: It's too risky to challenge Susan's Steal because it's likely she has the Captain
+ACTION: PASS
+
+- Use SPEECH if you want to influence other players. But don't use it excessively.
+- Only use THOUGHT if you have an insightful thought that is not already in your inner thoughts.
+- Use ACTION if you are ready to commit to a strategic move or if the conversation is getting too repetitive."""
+
+CHATTER_INSTRUCTIONS = """In your communications, you can choose to use SPEECH or THOUGHT.
+- Use 'SPEECH:' to communicate anything to other players.
+- Use 'THOUGHT:' to reflect on your strategy, what cards you think others have, how you should respond to other players, etc.
+
+It is not your turn at the moment but you can use SPEECH and THOUGHT. You can:
+ - think about your strategy in terms of how you will interact with the other players
+ - try to figure out what cards the other players have
+ - react to other players' actions/words
+
+Your output should strictly follow this format, with each new line beginning with one of SPEECH, THOUGHT, or ACTION:
+SPEECH: <what you want to say to others>
+THOUGHT: <your internal considerations>
+
+You can output multiple in sequence.
+Example 1:
+THOUGHT: Since Susan has the most coins, I should target her.
+SPEECH: What cards do you guys think Susan has?
+
+Example 2:
+THOUGHT: Ok it looks like Susan doesn't have the Contessa to counter my Assassin. I should tell everyone that, so we can bring her down to 1 card like the rest of us.
+SPEECH: I don't think Susan has the Contessa
+
+- Use SPEECH if you want to influence other players. But don't use it excessively.
+- Only use THOUGHT if you have an insightful thought that is not already in your inner thoughts.
+- You can simply write END if you have nothing to do or say or if there is too much conversation happening."""
+
+STRUCTURED_TASK_INSTRUCTIONS = """Answer with a single JSON object with the fields "thought", "speech" and "action", \
+in that order:
+- "thought": what maximizes your chances of winning, what cards you think others have, how you should respond to \
+other players, etc. Use null if you have no insightful thought that is not already in your inner thoughts.
+- "speech": what you want to say to the other players to manipulate/collaborate with them, or null to stay quiet. \
+Don't use it excessively.
+- "action": exactly one of the actions from your tasks, with its target player or cards.
+
+Example 1:
+{"thought": "Ok it looks like Susan doesn't have the Contessa to counter my Assassin", "speech": null, "action": \
+"ASSASSINATE Susan"}
+
+Example 2:
+{"thought": "I think my duke card is probably more valuable than my captain card", "speech": "That was a good call.", \
+"action": "DISCARD CAPTAIN"}
+
+Example 3:
+{"thought": "It's too risky to challenge Susan's Steal because it's likely she has the Captain", "speech": null, \
+"action": "PASS"}"""
+
+STRUCTURED_CHATTER_INSTRUCTIONS = """It is not your turn at the moment but you can think and talk. You can:
+ - think about your strategy in terms of how you will interact with the other players
+ - try to figure out what cards the other players have
+ - react to other players' actions/words
+
+Answer with a single JSON object with the fields "thought", "speech" and "action", in that order:
+- "thought": your internal considerations, or null if you have no insightful thought that is not already in your \
+inner thoughts.
+- "speech": what you want to say to the other players, or null to stay quiet. Don't use it excessively.
+- "action": always null, you have no task.
+
+Example:
+{"thought": "Since Susan has the most coins, I should target her.", "speech": "What cards do you guys think Susan \
+has?", "action": null}
+
+Answer with null for all three if you have nothing to do or say or if there is too much conversation happening."""
+
+
+class PromptBuilder:
+    def __init__(self, name: str, personality: str, structured: bool = False):
+        common = f"""Your name is {name}. You are a strategic player in the game of Coup.
+{game_explanation()}
+
+Your personality is:
+{personality}
+
+"""
+        self.task_prefix = common + (STRUCTURED_TASK_INSTRUCTIONS if structured else TASK_INSTRUCTIONS)
+        self.chatter_prefix = common + (STRUCTURED_CHATTER_INSTRUCTIONS if structured else CHATTER_INSTRUCTIONS)
+        self._prefix_bytes = {
+            self.task_prefix: len(self.task_prefix.encode("utf-8")),
+            self.chatter_prefix: len(self.chatter_prefix.encode("utf-8")),
+        }
+
+        # (key, rendered section) of the last build, reused while the key is unchanged
+        self._log_section: Tuple[int, str] = (-1, "")
+        self._summary_section: Tuple[int, str] = (-1, "")
+        self._beliefs_section: Tuple[tuple, str] = ((), "")
+        self._players_section: Tuple[tuple, str] = ((), "")
+        self._tasks_section: Tuple[tuple, str] = ((), "")
+
+        self.prompts_built = 0
+        self.bytes_built = 0
+        self.static_bytes_built = 0
+
+    def _log(self, memory: AgentMemory) -> str:
+        if self._log_section[0] != memory.version:
+            self._log_section = (memory.version, "\n".join(memory.entries()))
+        return self._log_section[1]
+
+    def _summary(self, memory: AgentMemory) -> str:
+        memory.fold()
+        if self._summary_section[0] != memory.summary_version:
+            summary = memory.summary()
+            self._summary_section = (memory.summary_version, f"""
+
+Summary of earlier events:
+{summary}""" if summary else "")
+        return self._summary_section[1]
+
+    def _beliefs(self, name: str, beliefs: Optional[BeliefTracker]) -> str:
+        if beliefs is None:
+            return ""
+        key = (id(beliefs), beliefs.version)
+        if self._beliefs_section[0] != key:
+            self._beliefs_section = (key, f"""
+
+Chances that the other players hold each card, from everything that happened so far:
+{beliefs.summary(name)}""")
+        return self._beliefs_section[1]
+
+    def _players(self, players: List) -> str:
+        key = tuple((player.name, player.coins, len(player.cards)) for player in players)
+        if self._players_section[0] != key:
+            self._players_section = (key, "\n".join(f"{name} has {coins} coins with {cards} cards."
+                                                    for name, coins, cards in key))
+        return self._players_section[1]
+
+    def _tasks(self, tasks: List) -> str:
+        key = tuple((task.content, tuple(task.expected_actions or [])) for task in tasks)
+        if self._tasks_section[0] != key:
+            self._tasks_section = (key, "".join(
+                task.content + " You must NOW output one of the following actions. ACTION: "
+                + ", ".join(map(map_action_to_output_format, task.expected_actions or [])) + "\n"
+                for task in tasks))
+        return self._tasks_section[1]
+
+    def build(self, agent) -> str:
+        game_state = agent.game_state
+        summary_str = self._beliefs(agent.name, getattr(game_state, "beliefs", None)) + self._summary(agent.memory)
+        log_str = self._log(agent.memory)
+        player_info_str = self._players(game_state.players)
+
+        if agent.tasks:
+            prefix = self.task_prefix
+            dynamic = f"""{summary_str}
+
+Here is the log of conversations, thoughts and game events:
+{log_str}
+
+The following players are in the game:
+{player_info_str}
+
+Here are your cards:
+{', '.join([str(card) for card in agent.cards])}
+
+Here are your tasks:
+{self._tasks(agent.tasks)}
+
+It is currently turn {game_state.current_turn}.
+
+{"You must NOW output an action from your task." if agent.turn_without_tasks > 3 else ""}
+
+Start your output:"""
+        else:
+            prefix = self.chatter_prefix
+            dynamic = f"""{summary_str}
+
+Here is the log of conversations, your thoughts and game events:
+{log_str}
+
+The following players are in the game:
+{player_info_str}
+
+It is currently turn {game_state.current_turn}.
+
+Start your output:"""
+
+        prefix_bytes = self._prefix_bytes[prefix]
+        self.prompts_built += 1
+        self.bytes_built += prefix_bytes + len(dynamic.encode("utf-8"))
+        self.static_bytes_built += prefix_bytes
+        return prefix + dynamic
@@ -0,0 +1,191 @@
+"""
+Recording and LLM-free replay of games.
+
+`RecordingClient` wraps an LLM client and logs every stream start, chunk, end and close in the global order they
+happened. `ReplayClient` serves those chunks back without any network calls, releasing them in exactly the recorded
+order so the interleaving of concurrent agent streams is reproduced. Together with a seeded GameState this replays a
+game action for action at CPU speed.
+"""
+import asyncio
+import hashlib
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.datatypes import ActionMessage
+from src.observers import GameObserver
+
+EVENT_START = "start"
+EVENT_CHUNK = "chunk"
+EVENT_END = "end"
+EVENT_CLOSE = "close"
+
+
+class ReplayMismatch(Exception):
+    pass
+
+
+def prompt_hash(system_message: str) -> str:
+    return hashlib.sha256(system_message.encode("utf-8")).hexdigest()
+
+
+class StreamEvent(BaseModel):
+    kind: str
+    stream_id: int
+    content: str = ""  # prompt hash for start events, text for chunk events
+
+
+class GameRecording(BaseModel):
+    seed: Optional[int] = None
+    num_players: int
+    names: List[str] = Field(default_factory=list)
+    personalities: List[str] = Field(default_factory=list)
+    events: List[StreamEvent] = Field(default_factory=list)
+    actions: List[ActionMessage] = Field(default_factory=list)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.model_dump_json())
+
+    @classmethod
+    def load(cls, path: str) -> "GameRecording":
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+
+class ActionRecorder(GameObserver):
+    """Appends every ActionMessage the game handles to the recording"""
+
+    def __init__(self, recording: GameRecording):
+        self.recording = recording
+
+    def on_game_start(self, players: List):
+        self.recording.names = [player.name for player in players]
+        self.recording.personalities = [player.personality for player in players]
+
+    def on_action(self, message: ActionMessage):
+        self.recording.actions.append(message.model_copy())
+
+
+class RecordingClient:
+    def __init__(self, client, recording: GameRecording):
+        self.client = client
+        self.recording = recording
+        self._next_stream_id = 0
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @property
+    def temperature(self):
+        return self.client.temperature
+
+    def _record(self, kind: str, stream_id: int, content: str = ""):
+        self.recording.events.append(StreamEvent(kind=kind, stream_id=stream_id, content=content))
+
+    async def stream(self, system_message: str, **request_options):
+        stream_id = self._next_stream_id
+        self._next_stream_id += 1
+        self._record(EVENT_START, stream_id, prompt_hash(system_message))
+
+        finished = False
+        try:
+            async for chunk in self.client.stream(system_message, **request_options):
+                self._record(EVENT_CHUNK, stream_id, chunk)
+                yield chunk
+            finished = True
+            self._record(EVENT_END, stream_id)
+        finally:
+            if not finished:
+                self._record(EVENT_CLOSE, stream_id)
+
+    async def close(self):
+        await self.client.close()
+
+
+class ReplayClient:
+    model = "replay"
+    temperature = 0.0
+
+    def __init__(self, recording: GameRecording, stall_timeout: float = 10.0):
+        self.recording = recording
+        self.stall_timeout = stall_timeout
+
+        self._cursor = 0
+        self._closed_streams = set()
+
+        # Recorded streams per prompt, in start order. Concurrent streams may be created in a different order during
+        # replay, so each one is bound to a recorded stream by its prompt rather than by creation order
+        self._streams_by_prompt: Dict[str, Deque[int]] = defaultdict(deque)
+        for event in recording.events:
+            if event.kind == EVENT_START:
+                self._streams_by_prompt[event.content].append(event.stream_id)
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def finished(self) -> bool:
+        self._skip_closed()
+        return self._cursor >= len(self.recording.events)
+
+    def _skip_closed(self):
+        # Streams closed during replay no longer consume their remaining recorded events
+        events = self.recording.events
+        while self._cursor < len(events) and events[self._cursor].stream_id in self._closed_streams:
+            self._cursor += 1
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def _is_next(self, stream_id: int) -> bool:
+        self._skip_closed()
+        events = self.recording.events
+        return self._cursor < len(events) and events[self._cursor].stream_id == stream_id
+
+    async def _next_event(self, stream_id: int) -> StreamEvent:
+        """Wait until the recording reaches the next event of this stream and consume it"""
+        while not self._is_next(stream_id):
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            # Not wait_for, which drops a cancellation arriving as the event is set and leaves the stream stuck in
+            # the wait for a recorded close below instead of stopping when its agent is interrupted
+            changed = asyncio.ensure_future(self._changed.wait())
+            try:
+                done, _ = await asyncio.wait([changed], timeout=self.stall_timeout)
+            finally:
+                changed.cancel()
+            if not done:
+                raise ReplayMismatch(f"Replay stalled waiting for stream {stream_id} at event {self._cursor}")
+
+        event = self.recording.events[self._cursor]
+        self._cursor += 1
+        self._notify()
+        return event
+
+    async def stream(self, system_message: str, **request_options):
+        recorded_streams = self._streams_by_prompt.get(prompt_hash(system_message))
+        if not recorded_streams:
+            raise ReplayMismatch("Prompt does not appear in the recording")
+        stream_id = recorded_streams.popleft()
+
+        try:
+            await self._next_event(stream_id)  # its start event
+
+            while True:
+                event = await self._next_event(stream_id)
+                if event.kind == EVENT_CHUNK:
+                    yield event.content
+                elif event.kind == EVENT_END:
+                    return
+                else:
+                    # Recorded as closed by its consumer, wait here until the replayed consumer closes it too
+                    await asyncio.Event().wait()
+        finally:
+            self._closed_streams.add(stream_id)
+            self._notify()
+
+    async def close(self):
+        pass
@@ -0,0 +1,159 @@
+"""
+The rules of Coup as lookup tables.
+
+Every Action has a bit in `BIT`, and sets of actions are int bitmasks. What the engine, the parser, the policies and
+the simulators need to know about an action is a lookup: the card it claims, the card that counters it, what it costs,
+whether it can be challenged or countered and whether it needs a target. The actions a player may send in each phase
+are compiled once per coin count, so `legal_actions(phase, coins)` is a tuple index. The coin rules are part of the
+table: ASSASSINATE needs 3 coins, COUP needs 7 and is the only action left at 10 coins or more.
+"""
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from src.datatypes import (
+    Action,
+    Card,
+    get_base_actions,
+    get_challenge_actions,
+    get_counter_actions,
+    get_reaction_actions,
+)
+
+PHASE_ACTION = 0  # turn player chooses a base action
+PHASE_CHALLENGE_ACTION = 1  # other players may challenge the claimed action
+PHASE_COUNTER = 2  # eligible players may counter the action
+PHASE_CHALLENGE_COUNTER = 3  # other players may challenge the counter
+PHASE_DISCARD = 4  # players in pending_discards must each discard a card
+PHASE_EXCHANGE = 5  # turn player must return two cards after an exchange
+PHASE_OVER = 6
+# The engine asks for a challenge and a counter in one task, answered with CHALLENGE, COUNTER or PASS. The simulators
+# play the two polls one after the other, which is what the answers are resolved as.
+PHASE_REACTION = 7
+
+ACTIONS: Tuple[Action, ...] = tuple(Action)
+BIT: Dict[Action, int] = {action: 1 << index for index, action in enumerate(ACTIONS)}
+
+
+def mask(actions: Iterable[Action]) -> int:
+    bits = 0
+    for action in actions:
+        bits |= BIT[action]
+    return bits
+
+
+BASE = mask(get_base_actions())
+CHALLENGES = mask(get_challenge_actions())
+COUNTERS = mask(get_counter_actions())
+REACTIONS = mask(get_reaction_actions())
+CHALLENGEABLE = mask([Action.ASSASSINATE, Action.STEAL, Action.TAX, Action.EXCHANGE])
+COUNTERABLE = mask([Action.ASSASSINATE, Action.STEAL, Action.FOREIGN_AID])
+TARGETED = mask([Action.ASSASSINATE, Action.STEAL, Action.COUP])
+
+CLAIMS: Dict[Action, Card] = {
+    Action.TAX: Card.DUKE,
+    Action.ASSASSINATE: Card.ASSASSIN,
+    Action.STEAL: Card.CAPTAIN,
+    Action.EXCHANGE: Card.AMBASSADOR,
+}
+COUNTER_CLAIMS: Dict[Action, Card] = {
+    Action.ASSASSINATE: Card.CONTESSA,
+    Action.STEAL: Card.CAPTAIN,
+    Action.FOREIGN_AID: Card.DUKE,
+}
+COSTS: Dict[Action, int] = {Action.ASSASSINATE: 3, Action.COUP: 7}
+MANDATORY_COUP_COINS = 10
+
+
+def _base_mask(coins: int) -> int:
+    if coins >= MANDATORY_COUP_COINS:
+        return BIT[Action.COUP]
+    return mask(action for action in get_base_actions() if coins >= COSTS.get(action, 0))
+
+
+_PHASE_MASKS = {
+    PHASE_CHALLENGE_ACTION: CHALLENGES,
+    PHASE_COUNTER: COUNTERS,
+    PHASE_CHALLENGE_COUNTER: CHALLENGES,
+    PHASE_DISCARD: BIT[Action.DISCARD],
+    PHASE_EXCHANGE: BIT[Action.DISCARD_TWO],
+    PHASE_OVER: 0,
+    PHASE_REACTION: REACTIONS,
+}
+_BASE_MASKS = tuple(_base_mask(coins) for coins in range(MANDATORY_COUP_COINS + 1))
+
+_actions_of: Dict[int, Tuple[Action, ...]] = {}
+
+
+def actions(bits: int) -> Tuple[Action, ...]:
+    """The actions in a mask, in Action order"""
+    result = _actions_of.get(bits)
+    if result is None:
+        result = _actions_of[bits] = tuple(action for action in ACTIONS if bits & BIT[action])
+    return result
+
+
+def legal_mask(phase: int, coins: int = 0) -> int:
+    if phase == PHASE_ACTION:
+        return _BASE_MASKS[min(coins, MANDATORY_COUP_COINS)]
+    return _PHASE_MASKS[phase]
+
+
+def legal_actions(phase: int, coins: int = 0) -> Tuple[Action, ...]:
+    """What a player with `coins` may send in `phase`, targets aside"""
+    return actions(legal_mask(phase, coins))
+
+
+def is_legal(action: Action, phase: int, coins: int = 0) -> bool:
+    return bool(legal_mask(phase, coins) & BIT[action])
+
+
+_PHASE_OF = {action: phase for phase in (PHASE_EXCHANGE, PHASE_DISCARD, PHASE_COUNTER, PHASE_CHALLENGE_ACTION)
+             for action in actions(_PHASE_MASKS[phase])}
+_PHASE_OF.update((action, PHASE_ACTION) for action in actions(BASE))
+_PHASE_OF[Action.PASS] = PHASE_REACTION
+
+
+def task_phase(expected_actions: Sequence[Action]) -> Optional[int]:
+    """
+    The phase a task's expected actions belong to, told by the last one: a reaction task ends with PASS and shares
+    its other actions with the polls. Challenges of a counter share their actions with challenges of an action and
+    give PHASE_CHALLENGE_ACTION.
+    """
+    return _PHASE_OF.get(expected_actions[-1]) if expected_actions else None
+
+
+def reaction_actions(can_challenge: bool, can_counter: bool) -> Tuple[Action, ...]:
+    """The answers of a player's reaction task, PASS always being one of them"""
+    mask = BIT[Action.PASS]
+    if can_challenge:
+        mask |= BIT[Action.CHALLENGE]
+    if can_counter:
+        mask |= BIT[Action.COUNTER]
+    return actions(mask)
+
+
+def is_base(action: Action) -> bool:
+    return bool(BASE & BIT.get(action, 0))
+
+
+def is_challenge(action: Action) -> bool:
+    return bool(CHALLENGES & BIT.get(action, 0))
+
+
+def is_counter(action: Action) -> bool:
+    return bool(COUNTERS & BIT.get(action, 0))
+
+
+def is_reaction(action: Action) -> bool:
+    return bool(REACTIONS & BIT.get(action, 0))
+
+
+def can_be_challenged(action: Action) -> bool:
+    return bool(CHALLENGEABLE & BIT.get(action, 0))
+
+
+def can_be_countered(action: Action) -> bool:
+    return bool(COUNTERABLE & BIT.get(action, 0))
+
+
+def requires_target(action: Action) -> bool:
+    return bool(TARGETED & BIT.get(action, 0))
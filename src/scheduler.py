@@ -0,0 +1,128 @@
+"""
+Decides when an agent calls the LLM, this is the LLM policy.
+
+Incoming messages only update an agent's log and tasks and then notify its WakeupScheduler. The scheduler waits a short
+window so that a burst of speeches leads to a single generation with the latest log, instead of one stream per message
+that the next message cancels. Tasks skip the window since the game is waiting on them.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from src.policies import Policy
+
+
+class LLMCallStats(BaseModel):
+    """LLM streams of one game, shared by all of its agents' schedulers"""
+    started: int = 0
+    cancelled: int = 0
+    completed: int = 0
+    failed: int = 0
+
+    # Time spent waiting for cancelled generations to stop
+    interrupt_seconds: float = 0.0
+    interrupt_timeouts: int = 0
+    interrupt_seconds_per_turn: Dict[int, float] = Field(default_factory=dict)
+
+    def add_interrupt(self, turn: int, seconds: float, stopped: bool):
+        self.interrupt_seconds += seconds
+        self.interrupt_seconds_per_turn[turn] = self.interrupt_seconds_per_turn.get(turn, 0.0) + seconds
+        if not stopped:
+            self.interrupt_timeouts += 1
+
+
+class WakeupScheduler(Policy):
+    def __init__(self, agent, window: float = 0.25, stats: Optional[LLMCallStats] = None, max_task_retries: int = 5):
+        super().__init__(agent)
+        self.window = window
+        self.max_task_retries = max_task_retries
+        self.stats = stats or LLMCallStats()
+
+        self._wakeup = asyncio.Event()
+        self._urgent = asyncio.Event()
+        self._restart = False
+        self._interrupted: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    def notify(self, urgent: bool = False):
+        """Regenerate with the agent's latest state, after the coalescing window unless urgent"""
+        self._restart = True
+        self._wakeup.set()
+        if urgent:
+            self._urgent.set()
+
+    def interrupt(self):
+        """Stop the current generation as soon as possible without starting a new one"""
+        self._wakeup.set()
+        self._urgent.set()
+
+    async def _run(self):
+        game_state = self.agent.game_state
+        while not game_state.is_over:
+            await self._wakeup.wait()
+            if not self._urgent.is_set() and self.window > 0:
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            # Anything arriving from here on is picked up by the next iteration
+            self._wakeup.clear()
+            self._urgent.clear()
+            restart, self._restart = self._restart, False
+
+            await self._stop_generation()
+            if restart and not game_state.is_over:
+                self._start_generation()
+
+    def _start_generation(self):
+        task = self.agent.start_generation()
+        if task is None:
+            return
+
+        self.stats.started += 1
+        task.add_done_callback(self._generation_done)
+
+    async def _stop_generation(self):
+        generation = self.agent.stream_task
+        if generation is None or generation.done():
+            await self.agent.interrupt()
+            return
+
+        self.stats.cancelled += 1
+        self._interrupted = generation
+        start = time.perf_counter()
+        stopped = await self.agent.interrupt()
+        self.stats.add_interrupt(self.agent.game_state.current_turn, time.perf_counter() - start, stopped)
+
+    def _generation_done(self, task: asyncio.Task):
+        if task is self._interrupted or task.cancelled():
+            return
+
+        if task.exception() is not None:
+            self.stats.failed += 1
+            self.agent.game_state.abort(task.exception())
+            return
+
+        self.stats.completed += 1
+        if self.agent.tasks and not task.result() and self.agent.turn_without_tasks <= self.max_task_retries:
+            # The generation ended without an action for the task, so give it another go. An action that is still on
+            # its way to the engine completes the task, an invalid one is answered with a GameEventMessage
+            self.notify()
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+        await self._stop_generation()
@@ -0,0 +1,133 @@
+"""
+Incremental parser for the SPEECH/THOUGHT/ACTION output format of the agents.
+
+Every chunk is scanned once. A segment is emitted as soon as it is complete, which is when the next marker starts, even
+if the marker was split across chunks. A SPEECH or THOUGHT goes on over unmarked lines and is emitted as one segment
+with its newlines, an ACTION is always a single line and is emitted when that line ends. `END` finishes the output and
+everything after it is ignored.
+"""
+import re
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+SEGMENT_KINDS = ("SPEECH", "THOUGHT", "ACTION")
+END_TOKEN = "END"
+
+_BOUNDARY = re.compile(r"(SPEECH|THOUGHT|ACTION):|\n")
+# Characters of a marker that can precede its colon, and so may have arrived in earlier chunks
+_CONTEXT = max(len(kind) for kind in SEGMENT_KINDS)
+
+
+class Segment(NamedTuple):
+    kind: str  # one of SEGMENT_KINDS
+    content: str
+
+
+class StreamParser:
+    def __init__(self):
+        self.kind: Optional[str] = None
+        self.done = False
+        self._lines: List[str] = []  # finished lines of the current SPEECH or THOUGHT
+        self._parts: List[str] = []  # the current line
+        self._tail = ""  # last characters of the current line, where a split marker would start
+
+    def feed(self, chunk: str) -> List[Segment]:
+        """Consume a chunk and return the segments it completed"""
+        if self.done:
+            return []
+
+        # Every boundary ends in a colon or a newline, so most chunks can't complete one
+        if ":" not in chunk and "\n" not in chunk:
+            self._parts.append(chunk)
+            self._tail = (self._tail + chunk)[-_CONTEXT:]
+            return []
+
+        context = self._tail
+        text = context + chunk
+        segments = []
+        position = len(context)
+        for match in _BOUNDARY.finditer(text):
+            if match.start() < len(context):
+                # The marker started in an earlier chunk, take those characters back out of the segment
+                self._trim(len(context) - match.start())
+            else:
+                self._parts.append(text[position:match.start()])
+            position = match.end()
+
+            if match.group(1):
+                self._finish_segment(segments)
+                self.kind = match.group(1)
+            else:
+                self._end_line(segments)
+            if self.done:
+                return segments
+            context = ""
+
+        rest = text[position:]
+        self._parts.append(rest)
+        self._tail = (context + rest)[-_CONTEXT:]
+        return segments
+
+    def close(self) -> List[Segment]:
+        """Finish the output, returning the last segment if there is one"""
+        segments = []
+        if not self.done:
+            self._finish_segment(segments)
+            self.done = True
+        return segments
+
+    def _trim(self, length: int):
+        while length:
+            last = self._parts.pop()
+            if len(last) > length:
+                self._parts.append(last[:-length])
+                length = 0
+            else:
+                length -= len(last)
+
+    @staticmethod
+    def _ends_output(line: str) -> bool:
+        line = line.strip()
+        return line == END_TOKEN or line.endswith(" " + END_TOKEN)
+
+    def _end_line(self, segments: List[Segment]):
+        """A newline, which ends an ACTION but only one line of a SPEECH or THOUGHT unless that line is the END"""
+        line = "".join(self._parts)
+        if self.kind in ("SPEECH", "THOUGHT") and not self._ends_output(line):
+            self._lines.append(line)
+            self._parts = []
+            self._tail = ""
+            return
+
+        self._finish_segment(segments)
+        self.kind = None  # only a marker starts the next segment
+
+    def _finish_segment(self, segments: List[Segment]):
+        lines = self._lines + ["".join(self._parts)]
+        self._lines = []
+        self._parts = []
+        self._tail = ""
+
+        if self._ends_output(lines[-1]):
+            lines[-1] = lines[-1].strip()[:-len(END_TOKEN)]
+            self.done = True
+
+        content = "\n".join(lines).strip()
+        if self.kind and content:
+            segments.append(Segment(self.kind, content))
+
+
+async def parse_stream(stream, parser=None) -> AsyncIterator[Segment]:
+    """
+    Yield the segments of a chunk stream as they complete, closing the stream early once END is reached. `parser` reads
+    another output format with the same interface, e.g. the JsonSegmentParser of the structured output mode.
+    """
+    parser = parser or StreamParser()
+    async for chunk in stream:
+        for segment in parser.feed(chunk):
+            yield segment
+        if parser.done:
+            await stream.aclose()
+            return
+
+    for segment in parser.close():
+        yield segment
@@ -0,0 +1,212 @@
+"""
+Structured output mode of the agents' responses.
+
+In this mode the model answers with one JSON object, `{"thought": ..., "speech": ..., "action": ...}`, constrained by a
+JSON schema built from the agent's tasks where the action is an enum of every concrete action the agent may play right
+now, target or cards included. A provider with strict structured outputs can't produce an invalid action, so there is
+no GameEventMessage sent back and no second generation to retry it. Against providers that only return JSON, `repair`
+maps a near miss (case, punctuation, card order, a missing target when there is only one) to the single legal action it
+can mean, and only an unknown or ambiguous action is sent back as in the text format.
+
+`JsonSegmentParser` reads the object as it streams and emits the same segments as the text format's StreamParser as
+soon as each string value closes, so the agent acts on its action before the rest of the response has arrived.
+"""
+import json
+import re
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+from src.datatypes import Action
+from src.rules import PHASE_ACTION, is_base, is_legal, requires_target
+from src.stream_parser import Segment
+
+ACTION_MODE_TEXT = "text"
+ACTION_MODE_STRUCTURED = "structured"
+ACTION_MODES = [ACTION_MODE_TEXT, ACTION_MODE_STRUCTURED]
+
+FIELD_KINDS: Dict[str, str] = {"thought": "THOUGHT", "speech": "SPEECH", "action": "ACTION"}
+SCHEMA_NAME = "coup_response"
+
+_WORD_SEPARATORS = re.compile(r"[\s,_-]+")  # action names are compared word by word
+_PUNCTUATION = "\"'`*.!?;:()[]{}<>"
+
+
+def legal_actions(agent, action_names: Sequence[str]) -> List[str]:
+    """Every concrete action the agent may answer its tasks with, e.g. "STEAL Bob" or "DISCARD_TWO DUKE CAPTAIN" """
+    options = []
+    hand = sorted(card.name for card in agent.cards)
+    for name in dict.fromkeys(action_names):
+        action = Action[name]
+        if is_base(action) and not is_legal(action, PHASE_ACTION, agent.coins):
+            continue
+        if requires_target(action):
+            options.extend(f"{name} {player.name}" for player in agent.game_state.players
+                           if player.is_active and player is not agent)
+        elif action == Action.DISCARD:
+            options.extend(f"{name} {card}" for card in dict.fromkeys(hand))
+        elif action == Action.DISCARD_TWO:
+            options.extend(f"{name} {first} {second}" for first, second in dict.fromkeys(combinations(hand, 2)))
+        else:
+            options.append(name)
+    return options
+
+
+def response_format(options: Optional[Sequence[str]]) -> dict:
+    """
+    The `response_format` of a chat completions request for a response choosing one of `options`, or for a response
+    without any action when there are none (no tasks, only chatter)
+    """
+    action = {"type": "string", "enum": list(options)} if options else {"type": "null"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": SCHEMA_NAME,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "thought": {"type": ["string", "null"]},
+                    "speech": {"type": ["string", "null"]},
+                    "action": action,
+                },
+                "required": list(FIELD_KINDS),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def allowed_actions(request_format: Optional[dict]) -> Optional[List[str]]:
+    """The action enum of a response format from `response_format`, None when it doesn't constrain the action"""
+    try:
+        return request_format["json_schema"]["schema"]["properties"]["action"].get("enum")
+    except (KeyError, TypeError):
+        return None
+
+
+def _words(text: str) -> List[str]:
+    words = []
+    for word in _WORD_SEPARATORS.split(text.upper()):
+        word = word.strip(_PUNCTUATION)
+        if word.startswith("CARD."):
+            word = word[len("CARD."):]
+        if word:
+            words.append(word)
+    return words
+
+
+def _contains(words: List[str], wanted: List[str]) -> bool:
+    remaining = list(words)
+    for word in wanted:
+        if word not in remaining:
+            return False
+        remaining.remove(word)
+    return True
+
+
+def repair(text: str, options: Sequence[str]) -> Optional[str]:
+    """
+    The one option `text` can mean, or None when it matches none or several of them. The action name has to match,
+    in any case and with spaces or hyphens for underscores, and the option's target or cards have to be among the
+    words that follow it in any order. An option's target or cards may only be left out when no other option has the
+    same action name.
+    """
+    if text in options:
+        return text
+
+    words = _words(text)
+    if not words:
+        return None
+
+    matches = []
+    for option in options:
+        name, *arguments = option.upper().split(" ")
+        name_words = name.split("_")
+        if words[:len(name_words)] != name_words:
+            continue
+        given = words[len(name_words):]
+        if not given or _contains(given, arguments):
+            matches.append((option, bool(given) or not arguments))
+
+    # Options matched by their arguments take precedence over the ones only matched by name
+    exact = [option for option, by_arguments in matches if by_arguments]
+    candidates = exact if exact else [option for option, _ in matches]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+class JsonSegmentParser:
+    """
+    Incremental reader of the structured response object with the interface of the StreamParser. A segment is emitted
+    as soon as the string value of one of the FIELD_KINDS closes and the output is done when the object closes. Anything
+    before its opening brace, like a markdown fence, is skipped.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._expect_key = False
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Segment]:
+        segments = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._in_string:
+                self._feed_string(char, segments)
+            else:
+                self._feed_structure(char)
+        return segments
+
+    def _feed_string(self, char: str, segments: List[Segment]):
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            self._finish_string(segments)
+            return
+        self._string.append(char)
+
+    def _feed_structure(self, char: str):
+        if self._depth == 0:
+            if char == "{":
+                self._depth = 1
+                self._expect_key = True
+        elif char == '"':
+            self._in_string = True
+            self._string = []
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            self.done = self._depth == 0
+        elif self._depth == 1 and char == ",":
+            self._expect_key = True
+        elif self._depth == 1 and char == ":":
+            self._expect_key = False
+
+    def close(self) -> List[Segment]:
+        self.done = True
+        return []
+
+    def _finish_string(self, segments: List[Segment]):
+        if self._depth != 1:
+            return
+        raw = "".join(self._string)
+        try:
+            value = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            value = raw
+
+        if self._expect_key:
+            self._key = value
+            return
+        kind = FIELD_KINDS.get(self._key)
+        self._key = None
+        if kind and value.strip():
+            segments.append(Segment(kind, value.strip()))
@@ -0,0 +1,245 @@
+"""
+Where a game's wall-clock time and tokens go.
+
+Every GameState has a `GameTelemetry` that records how long each turn took, how long the engine spent handling each
+action, every LLM stream an agent started, the invalid actions agents were told to retry and the ones repaired without
+a retry in the structured output mode. Streams are wrapped in a `TrackedStream`, which times the first chunk and counts
+chunks as they arrive (the API streams one token per chunk), so a stream cut short by an interrupt tells how many tokens
+were generated after the last segment the agent acted on, only to be thrown away.
+
+`summary()` is the per-game JSON included in `GameState.result()`, and `prometheus_text` renders the summaries of any
+number of games in the Prometheus text exposition format.
+"""
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+QUANTILES = (0.5, 0.95)
+STREAM_OUTCOMES = ("completed", "interrupted", "closed")
+
+
+class StreamRecord(BaseModel):
+    agent: str
+    turn: int
+    ttft: Optional[float] = None  # seconds from the request to the first chunk
+    seconds: Optional[float] = None  # from the request until the stream was exhausted or closed
+    streaming_seconds: float = 0.0  # from the first chunk to the last one
+    tokens: int = 0
+    used_tokens: int = 0  # tokens up to the last segment the agent acted on
+    completed: bool = False  # the server sent the whole response
+    interrupted: bool = False  # cancelled by Agent.interrupt before it completed
+
+    @property
+    def outcome(self) -> str:
+        """How the stream ended: completed, interrupted, or closed early otherwise (at END, or by an error)"""
+        if self.completed:
+            return "completed"
+        return "interrupted" if self.interrupted else "closed"
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.tokens < 2 or self.streaming_seconds <= 0:
+            return None
+        return (self.tokens - 1) / self.streaming_seconds
+
+
+class TrackedStream:
+    """
+    An LLM stream that records its timings and tokens in `record` while it is read. The counts are kept here per chunk
+    and copied into the record when the agent acts on a segment, on an interrupt and when the stream ends.
+    """
+
+    def __init__(self, stream, record: StreamRecord):
+        self.stream = stream
+        self.record = record
+        self.tokens = 0
+        self._start = time.perf_counter()
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self.stream.__anext__()
+        except StopAsyncIteration:
+            self.record.completed = True
+            self._finish()
+            raise
+        except BaseException:
+            self._finish()
+            raise
+
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+            self.record.ttft = now - self._start
+        self._last = now
+        self.tokens += 1
+        return chunk
+
+    async def aclose(self):
+        self._finish()
+        await self.stream.aclose()
+
+    def sync(self):
+        """Copies the counts kept per chunk into the record"""
+        self.record.tokens = self.tokens
+        if self._first is not None:
+            self.record.streaming_seconds = self._last - self._first
+
+    def _finish(self):
+        self.sync()
+        if self.record.seconds is None:
+            self.record.seconds = time.perf_counter() - self._start
+
+
+def distribution(values: Sequence[float]) -> dict:
+    """Count, sum, quantiles and max of some samples, what a Prometheus summary needs"""
+    ordered = sorted(values)
+    result = {"count": len(ordered), "sum": sum(ordered)}
+    for quantile in QUANTILES:
+        index = min(int(quantile * len(ordered)), len(ordered) - 1)
+        result[f"p{quantile * 100:g}"] = ordered[index] if ordered else 0.0
+    result["max"] = ordered[-1] if ordered else 0.0
+    return result
+
+
+class GameTelemetry(BaseModel):
+    turn_seconds: Dict[int, float] = Field(default_factory=dict)
+    action_seconds: Dict[str, List[float]] = Field(default_factory=dict)  # GameState.handle_action per action
+    streams: List[StreamRecord] = Field(default_factory=list)
+    invalid_actions: Dict[str, int] = Field(default_factory=dict)  # per player
+    repaired_actions: Dict[str, int] = Field(default_factory=dict)  # per player
+
+    started_at: Optional[float] = None
+    ended_at: Optional[float] = None
+    turn_started_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = self.turn_started_at = time.perf_counter()
+
+    def end_turn(self, turn: int):
+        now = time.perf_counter()
+        if self.turn_started_at is not None:
+            self.turn_seconds[turn] = self.turn_seconds.get(turn, 0.0) + now - self.turn_started_at
+        self.turn_started_at = now
+
+    def end(self, turn: int):
+        self.end_turn(turn)
+        self.ended_at = self.turn_started_at
+
+    def add_action(self, action: str, seconds: float):
+        self.action_seconds.setdefault(action, []).append(seconds)
+
+    def add_invalid_action(self, player: str):
+        self.invalid_actions[player] = self.invalid_actions.get(player, 0) + 1
+
+    def add_repaired_action(self, player: str):
+        self.repaired_actions[player] = self.repaired_actions.get(player, 0) + 1
+
+    def track(self, stream, agent: str, turn: int) -> TrackedStream:
+        record = StreamRecord(agent=agent, turn=turn)
+        self.streams.append(record)
+        return TrackedStream(stream, record)
+
+    @staticmethod
+    def used(stream):
+        """Marks the tokens a tracked stream has delivered so far as used, the agent acted on them"""
+        if isinstance(stream, TrackedStream):
+            stream.record.used_tokens = stream.tokens
+
+    @staticmethod
+    def interrupted(stream):
+        """Marks a tracked stream cancelled before it completed, the tokens the agent didn't act on are wasted"""
+        if isinstance(stream, TrackedStream) and not stream.record.completed:
+            stream.sync()
+            stream.record.interrupted = True
+
+    def summary(self) -> dict:
+        ended_at = self.ended_at if self.ended_at is not None else time.perf_counter()
+        wasted = [stream for stream in self.streams if stream.outcome == "interrupted"]
+        outcomes = dict.fromkeys(STREAM_OUTCOMES, 0)
+        for stream in self.streams:
+            outcomes[stream.outcome] += 1
+        return {
+            "seconds": ended_at - self.started_at if self.started_at is not None else 0.0,
+            "turn_seconds": distribution(list(self.turn_seconds.values())),
+            "action_seconds": {action: distribution(seconds)
+                               for action, seconds in sorted(self.action_seconds.items())},
+            "streams": outcomes,
+            "ttft_seconds": distribution([stream.ttft for stream in self.streams if stream.ttft is not None]),
+            "tokens_per_second": distribution([stream.tokens_per_second for stream in self.streams
+                                               if stream.tokens_per_second is not None]),
+            "tokens": {
+                "generated": sum(stream.tokens for stream in self.streams),
+                "wasted": sum(stream.tokens - stream.used_tokens for stream in wasted),  # part of the generated ones
+            },
+            "invalid_actions": dict(sorted(self.invalid_actions.items())),
+            "repaired_actions": dict(sorted(self.repaired_actions.items())),
+        }
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _summary_lines(name: str, labels: dict, values: dict) -> List[str]:
+    lines = [f"{name}{_labels({**labels, 'quantile': f'{quantile:g}'})} {values[f'p{quantile * 100:g}']}"
+             for quantile in QUANTILES]
+    lines.append(f"{name}_sum{_labels(labels)} {values['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {values['count']}")
+    return lines
+
+
+def prometheus_text(games: Sequence[Tuple[dict, dict]]) -> str:
+    """
+    The Prometheus text format of `(labels, summary)` pairs, one pair per game, e.g. `({"game": 0}, telemetry)`
+    where the summary is `GameTelemetry.summary()`.
+    """
+    metrics = [
+        ("coup_game_seconds", "gauge", "Wall-clock duration of the game",
+         lambda labels, summary: [f"coup_game_seconds{_labels(labels)} {summary['seconds']}"]),
+        ("coup_turn_seconds", "summary", "Wall-clock duration of a turn",
+         lambda labels, summary: _summary_lines("coup_turn_seconds", labels, summary["turn_seconds"])),
+        ("coup_action_seconds", "summary", "Engine time spent handling an action",
+         lambda labels, summary: [line for action, values in summary["action_seconds"].items()
+                                  for line in _summary_lines("coup_action_seconds", {**labels, "action": action},
+                                                             values)]),
+        ("coup_llm_ttft_seconds", "summary", "Time from an LLM request to its first token",
+         lambda labels, summary: _summary_lines("coup_llm_ttft_seconds", labels, summary["ttft_seconds"])),
+        ("coup_llm_tokens_per_second", "summary", "Streaming rate of an LLM response after its first token",
+         lambda labels, summary: _summary_lines("coup_llm_tokens_per_second", labels, summary["tokens_per_second"])),
+        ("coup_llm_streams_total", "counter", "LLM streams by how they ended",
+         lambda labels, summary: [f"coup_llm_streams_total{_labels({**labels, 'outcome': outcome})} {count}"
+                                  for outcome, count in summary["streams"].items()]),
+        ("coup_llm_tokens_total", "counter", "LLM tokens received",
+         lambda labels, summary: [f"coup_llm_tokens_total{_labels(labels)} {summary['tokens']['generated']}"]),
+        ("coup_llm_wasted_tokens_total", "counter",
+         "LLM tokens received after the last segment an agent acted on, in streams cut off by an interrupt",
+         lambda labels, summary: [f"coup_llm_wasted_tokens_total{_labels(labels)} {summary['tokens']['wasted']}"]),
+        ("coup_invalid_actions_total", "counter", "Invalid actions agents were asked to retry",
+         lambda labels, summary: [f"coup_invalid_actions_total{_labels({**labels, 'player': player})} {count}"
+                                  for player, count in summary["invalid_actions"].items()]),
+        ("coup_repaired_actions_total", "counter", "Invalid actions repaired locally without a retry",
+         lambda labels, summary: [f"coup_repaired_actions_total{_labels({**labels, 'player': player})} {count}"
+                                  for player, count in summary.get("repaired_actions", {}).items()]),
+    ]
+
+    lines = []
+    for name, kind, description, render in metrics:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, summary in games:
+            lines.extend(render(labels, summary))
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, games: Sequence[Tuple[dict, dict]]):
+    with open(path, "w") as f:
+        f.write(prometheus_text(games))
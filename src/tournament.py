@@ -0,0 +1,213 @@
+"""
+Runs many headless games across a process pool.
+
+Games are split into batches, each batch is played by one worker process with its own event loop where up to
+`games_per_loop` games run concurrently and share one LLM client. Results are aggregated back in the parent.
+"""
+import asyncio
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.helper import name_list, personality_list
+
+ROTATION_MODES = ["rotate", "random", "fixed"]
+
+
+class GameSpec(BaseModel):
+    game_id: int
+    num_players: int
+    names: List[str]
+    personalities: List[str]
+    seed: Optional[int] = None
+
+
+class PersonalityStats(BaseModel):
+    games: int = 0
+    wins: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+class TournamentResult(BaseModel):
+    games_played: int = 0
+    games_failed: int = 0
+    games_unfinished: int = 0
+    total_turns: int = 0
+    seat_wins: List[int] = Field(default_factory=list)
+    personalities: Dict[str, PersonalityStats] = Field(default_factory=dict)
+    errors: List[str] = Field(default_factory=list)
+
+    def add(self, result: dict):
+        if result.get("error"):
+            self.games_failed += 1
+            self.errors.append(result["error"])
+            return
+
+        self.games_played += 1
+        self.total_turns += result["turns"]
+        if not self.seat_wins:
+            self.seat_wins = [0] * result["num_players"]
+
+        for seat, player in enumerate(result["players"]):
+            stats = self.personalities.setdefault(player["personality"], PersonalityStats())
+            stats.games += 1
+            if player["name"] == result["winner"]:
+                stats.wins += 1
+                self.seat_wins[seat] += 1
+
+        if result["winner"] is None:
+            self.games_unfinished += 1
+
+
+def schedule_games(num_games: int, num_players: int, rotation: str = "rotate", seed: Optional[int] = None,
+                   personalities: Optional[List[str]] = None) -> List[GameSpec]:
+    """
+    Assign personalities to seats for every game.
+    - rotate: consecutive lineups from the personality list, each played once from every seat rotation
+    - random: a random lineup and seating per game
+    - fixed: the same lineup in the same seats for every game
+    """
+    if rotation not in ROTATION_MODES:
+        raise ValueError(f"Invalid rotation: {rotation}. Must be one of {', '.join(ROTATION_MODES)}")
+
+    rng = random.Random(seed)
+    personalities = personalities or personality_list
+    names = name_list[:num_players]
+    specs = []
+
+    for game_id in range(num_games):
+        if rotation == "random":
+            lineup = rng.sample(personalities, num_players)
+        elif rotation == "fixed":
+            lineup = personalities[:num_players]
+        else:
+            lineup_index, shift = divmod(game_id, num_players)
+            start = lineup_index * num_players
+            lineup = [personalities[(start + i) % len(personalities)] for i in range(num_players)]
+            lineup = lineup[shift:] + lineup[:shift]
+
+        game_seed = seed + game_id if seed is not None else None
+        specs.append(GameSpec(game_id=game_id, num_players=num_players, names=names, personalities=lineup,
+                              seed=game_seed))
+
+    return specs
+
+
+async def _play_game(spec: GameSpec, llm_client, game_options: dict, timeout: Optional[float]) -> dict:
+    # Imported here so the parent process doesn't need to load the game engine
+    from src.game_state import GameState
+    from src.observers import NullObserver
+
+    game = GameState(spec.num_players, llm_client=llm_client, observer=NullObserver(), names=spec.names,
+                     personalities=spec.personalities, seed=spec.seed, **game_options)
+    try:
+        await asyncio.wait_for(game.run(), timeout)
+    except asyncio.TimeoutError:
+        pass  # reported as unfinished
+    except Exception as e:
+        return {"game_id": spec.game_id, "error": f"game {spec.game_id}: {e!r}"}
+
+    return {"game_id": spec.game_id, **game.result()}
+
+
+async def _play_batch(specs: List[GameSpec], llm_options: dict, game_options: dict, games_per_loop: int,
+                      timeout: Optional[float]) -> List[dict]:
+    from src.llm_factory import create_llm_client
+
+    semaphore = asyncio.Semaphore(games_per_loop)
+
+    async with create_llm_client(**llm_options) as llm_client:
+        async def play(spec):
+            async with semaphore:
+                return await _play_game(spec, llm_client, game_options, timeout)
+
+        return await asyncio.gather(*[play(spec) for spec in specs])
+
+
+def run_batch(specs: List[GameSpec], llm_options: dict, game_options: dict, games_per_loop: int,
+              timeout: Optional[float]) -> List[dict]:
+    """Entry point of a worker process: one event loop for the whole batch"""
+    return asyncio.run(_play_batch(specs, llm_options, game_options, games_per_loop, timeout))
+
+
+def share_rate_limits(llm_options: dict, processes: int) -> dict:
+    """Every worker process schedules its own LLM requests, so each one gets an equal share of the limits"""
+    shared = dict(llm_options)
+    for limit in ("requests_per_minute", "tokens_per_minute"):
+        if shared.get(limit):
+            shared[limit] = shared[limit] / processes
+    if shared.get("max_concurrent_requests"):
+        shared["max_concurrent_requests"] = max(shared["max_concurrent_requests"] // processes, 1)
+    return shared
+
+
+def _run_pool(batches: List[List[GameSpec]], indices: List[int], workers: Optional[int], record,
+              batch_args: tuple) -> List[int]:
+    """Play the batches at `indices` on a fresh process pool, returns the ones lost to a crashed worker"""
+    retry = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_batch, batches[i], *batch_args): i for i in indices}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    record(future.result())
+                except BrokenProcessPool:
+                    retry.append(index)
+                except Exception as e:
+                    record([{"game_id": spec.game_id, "error": f"batch {index}: {e!r}"} for spec in batches[index]])
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return retry
+
+
+def run_tournament(specs: List[GameSpec],
+                   workers: Optional[int] = None,
+                   games_per_loop: int = 8,
+                   batch_size: Optional[int] = None,
+                   llm_options: Optional[dict] = None,
+                   game_options: Optional[dict] = None,
+                   timeout: Optional[float] = None,
+                   max_retries: int = 1,
+                   on_result=None) -> TournamentResult:
+    """
+    Play all games on a process pool. Batches lost to a crashed worker are resubmitted on a fresh pool up to
+    `max_retries` times, after which their games are counted as failed.
+    """
+    llm_options = llm_options or {}
+    game_options = game_options or {}
+    batch_size = batch_size or games_per_loop * 4
+    batches = [specs[i:i + batch_size] for i in range(0, len(specs), batch_size)]
+    llm_options = share_rate_limits(llm_options, max(min(workers or os.cpu_count() or 1, len(batches)), 1))
+    attempts = [0] * len(batches)
+    pending = list(range(len(batches)))
+
+    result = TournamentResult()
+
+    def record(batch_results):
+        for game_result in batch_results:
+            result.add(game_result)
+            if on_result:
+                on_result(game_result)
+
+    while pending:
+        retry = _run_pool(batches, pending, workers, record, (llm_options, game_options, games_per_loop, timeout))
+
+        pending = []
+        for index in retry:
+            attempts[index] += 1
+            if attempts[index] > max_retries:
+                record([{"game_id": spec.game_id, "error": f"batch {index}: worker crashed"}
+                        for spec in batches[index]])
+            else:
+                pending.append(index)
+
+    return result
@@ -0,0 +1,162 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.beliefs import BeliefTracker
+from src.datatypes import Card
+from src.fast_state import CARDS, card_index
+from src.memory import PublicEvent
+
+NAMES = ["Alice", "Bob", "Carol"]
+HANDS = [[Card.DUKE, Card.CAPTAIN], [Card.CONTESSA, Card.ASSASSIN], [Card.AMBASSADOR, Card.DUKE]]
+
+
+def new_tracker() -> BeliefTracker:
+    return BeliefTracker(NAMES, HANDS)
+
+
+def belief(tracker: BeliefTracker, observer: str, target: str, card: Card) -> float:
+    return float(tracker.beliefs[tracker.index[observer], tracker.index[target], card_index(card)])
+
+
+def assert_normalized(tracker: BeliefTracker, allow_impossible: bool = False):
+    """
+    Every row is a distribution, except a player's own row once they are out and, with `allow_impossible`, the rows of
+    a target whose evidence rules out every card the observer can't see
+    """
+    totals = tracker.beliefs.sum(axis=-1)
+    for observer in range(len(tracker.names)):
+        for target in range(len(tracker.names)):
+            total = totals[observer, target]
+            if observer == target:
+                assert total == pytest.approx(1.0 if tracker.influence[target] else 0.0)
+            elif allow_impossible and total == 0.0:
+                continue
+            else:
+                assert total == pytest.approx(1.0)
+
+
+def test_observers_start_from_the_cards_they_cant_see():
+    tracker = new_tracker()
+    assert_normalized(tracker)
+    # Bob can see none of the Dukes, Alice holds one of the three
+    assert belief(tracker, "Alice", "Carol", Card.DUKE) == pytest.approx(2 / 13)
+    assert belief(tracker, "Bob", "Carol", Card.DUKE) == pytest.approx(3 / 13)
+    # Everyone knows their own hand
+    assert belief(tracker, "Alice", "Alice", Card.DUKE) == pytest.approx(0.5)
+    assert belief(tracker, "Alice", "Alice", Card.CONTESSA) == 0.0
+
+
+def test_claim_makes_the_card_more_likely_for_every_observer():
+    tracker = new_tracker()
+    before = [belief(tracker, observer, "Carol", Card.CAPTAIN) for observer in ("Alice", "Bob")]
+    version = tracker.version
+    tracker.observe(PublicEvent("claim", "Carol", Card.CAPTAIN))
+
+    after = [belief(tracker, observer, "Carol", Card.CAPTAIN) for observer in ("Alice", "Bob")]
+    assert all(a > b for a, b in zip(after, before))
+    assert belief(tracker, "Carol", "Carol", Card.CAPTAIN) == 0.0  # Carol knows she doesn't have it
+    assert tracker.version > version
+    assert_normalized(tracker)
+
+
+def test_repeated_claims_stay_finite():
+    tracker = new_tracker()
+    for _ in range(2000):
+        tracker.claimed("Bob", Card.DUKE)
+    assert np.isfinite(tracker.evidence).all()
+    assert belief(tracker, "Alice", "Bob", Card.DUKE) == pytest.approx(1.0)
+    assert_normalized(tracker)
+
+
+def test_caught_bluff_rules_the_card_out():
+    tracker = new_tracker()
+    tracker.claimed("Bob", Card.DUKE)
+    tracker.observe(PublicEvent("challenge", "Bob", Card.DUKE, "Alice", True))
+
+    assert belief(tracker, "Alice", "Bob", Card.DUKE) == 0.0
+    assert belief(tracker, "Carol", "Bob", Card.DUKE) == 0.0
+    assert tracker.view("Alice").chance("Bob", Card.DUKE) == 0.0
+    assert_normalized(tracker)
+
+
+def test_revealing_a_card_keeps_the_evidence():
+    tracker = new_tracker()
+    tracker.claimed("Bob", Card.ASSASSIN)
+    evidence = tracker.evidence.copy()
+    tracker.set_hand("Bob", [Card.ASSASSIN])
+
+    assert (tracker.evidence == evidence).all()
+    assert tracker.influence[tracker.index["Bob"]] == 1
+    assert belief(tracker, "Bob", "Bob", Card.ASSASSIN) == 1.0
+    assert_normalized(tracker)
+
+
+def test_swap_after_a_proven_claim_forgets_part_of_the_evidence():
+    tracker = new_tracker()
+    for _ in range(3):
+        tracker.claimed("Carol", Card.AMBASSADOR)
+    claimed = belief(tracker, "Alice", "Carol", Card.AMBASSADOR)
+
+    tracker.observe(PublicEvent("challenge", "Carol", Card.AMBASSADOR, "Bob", False))
+    proved = belief(tracker, "Alice", "Carol", Card.AMBASSADOR)
+    # Half of her hand was redrawn, so the card is less certain but still more likely than before any claim
+    assert proved < claimed
+    assert proved > new_tracker().beliefs[0, 2, card_index(Card.AMBASSADOR)]
+    assert_normalized(tracker)
+
+
+def test_exchange_moves_the_evidence_towards_a_fresh_draw():
+    tracker = new_tracker()
+    tracker.caught("Carol", Card.CONTESSA)
+    assert belief(tracker, "Alice", "Carol", Card.CONTESSA) == 0.0
+
+    tracker.exchanged("Carol")
+    assert belief(tracker, "Alice", "Carol", Card.CONTESSA) > 0.0
+    assert tracker.evidence[tracker.index["Carol"], card_index(Card.CONTESSA)] == pytest.approx(0.5)
+    assert_normalized(tracker)
+
+
+def test_own_swap_changes_what_the_observer_can_see():
+    tracker = new_tracker()
+    before = belief(tracker, "Alice", "Bob", Card.CAPTAIN)
+    tracker.set_hand("Alice", [Card.DUKE, Card.AMBASSADOR])  # the Captain went back to the deck
+
+    assert belief(tracker, "Alice", "Bob", Card.CAPTAIN) > before
+    assert belief(tracker, "Alice", "Alice", Card.CAPTAIN) == 0.0
+    assert_normalized(tracker)
+
+
+def test_summary_lists_the_opponents_still_in_the_game():
+    tracker = new_tracker()
+    tracker.set_hand("Carol", [])
+    summary = tracker.summary("Alice")
+    assert summary.startswith("Bob (2 cards): ")
+    assert "Alice" not in summary and "Carol" not in summary
+
+
+def test_rows_stay_normalized_through_random_events():
+    rng = random.Random(0)
+    tracker = new_tracker()
+    hands = [list(hand) for hand in HANDS]
+    for _ in range(500):
+        name = rng.choice(NAMES)
+        seat = NAMES.index(name)
+        card = rng.choice(CARDS)
+        kind = rng.randrange(5)
+        if kind == 0:
+            tracker.claimed(name, card)
+        elif kind == 1:
+            tracker.caught(name, card)
+        elif kind == 2:
+            tracker.proved(name, card)
+        elif kind == 3:
+            tracker.exchanged(name)
+        else:
+            hands[seat] = [rng.choice(CARDS) for _ in range(rng.randint(1, 2))]
+            tracker.set_hand(name, hands[seat])
+
+        assert np.isfinite(tracker.beliefs).all()
+        assert (tracker.beliefs >= 0).all()
+        assert_normalized(tracker, allow_impossible=True)
@@ -0,0 +1,68 @@
+import random
+
+from src.datatypes import Action, Card
+from src.fast_state import NUM_CARD_TYPES, FastState, Move, card_index
+from src.rules import PHASE_ACTION, PHASE_COUNTER, PHASE_DISCARD
+
+
+def hand(*cards: Card) -> tuple:
+    counts = [0] * NUM_CARD_TYPES
+    for card in cards:
+        counts[card_index(card)] += 1
+    return tuple(counts)
+
+
+def new_state(first_hand: tuple) -> FastState:
+    hands = (first_hand, hand(Card.CAPTAIN, Card.CONTESSA), hand(Card.AMBASSADOR, Card.ASSASSIN))
+    deck = tuple(3 - sum(h[card] for h in hands) for card in range(NUM_CARD_TYPES))
+    return FastState(coins=(2, 2, 2), hands=hands, deck=deck, treasury=44)
+
+
+def test_caught_tax_bluff_gives_no_coins():
+    state = new_state(hand(Card.CAPTAIN, Card.CONTESSA))
+    state = state.apply(Move(Action.TAX, 0), random.Random(0))
+    state = state.apply(Move(Action.CHALLENGE, 1), random.Random(0))
+
+    assert state.coins == (2, 2, 2)
+    assert state.treasury == 44
+    assert state.phase == PHASE_DISCARD
+    assert state.pending_discards == (0,)
+
+
+def test_challenged_honest_tax_gives_coins():
+    state = new_state(hand(Card.DUKE, Card.CONTESSA))
+    state = state.apply(Move(Action.TAX, 0), random.Random(0))
+    state = state.apply(Move(Action.CHALLENGE, 1), random.Random(0))
+
+    assert state.coins == (5, 2, 2)
+    assert state.treasury == 41
+    assert state.pending_discards == (1,)
+
+
+def test_counter_follows_a_failed_challenge():
+    state = new_state(hand(Card.CAPTAIN, Card.DUKE))
+    state = state.apply(Move(Action.STEAL, 0, 1), random.Random(0))
+    state = state.apply(Move(Action.CHALLENGE, 2), random.Random(0))
+
+    assert state.phase == PHASE_DISCARD
+    assert state.pending_discards == (2,)
+    assert state.coins == (2, 2, 2)
+
+    state = state.apply(state.legal_moves()[0], random.Random(0))
+    assert state.phase == PHASE_COUNTER
+    assert state.acting_players() == [1]
+
+    state = state.apply(Move(Action.COUNTER, 1), random.Random(0))
+    state = state.apply(Move(Action.NO_CHALLENGE), random.Random(0))
+    assert state.coins == (2, 2, 2)
+    assert state.phase == PHASE_ACTION
+
+
+def test_failed_challenger_cannot_counter():
+    state = new_state(hand(Card.CAPTAIN, Card.DUKE))
+    state = state.apply(Move(Action.STEAL, 0, 1), random.Random(0))
+    state = state.apply(Move(Action.CHALLENGE, 1), random.Random(0))
+    state = state.apply(state.legal_moves()[0], random.Random(0))
+
+    assert state.coins == (4, 0, 2)
+    assert state.phase == PHASE_ACTION
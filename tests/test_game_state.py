@@ -0,0 +1,117 @@
+import asyncio
+from typing import List
+
+from src.beliefs import BeliefTracker
+from src.datatypes import Action, ActionMessage, Card
+from src.game_state import GameState
+from src.observers import NullObserver
+from src.policies import Policy
+
+NAMES = ["Alice", "Bob", "Carol", "Dave"]
+
+
+async def new_game(*hands: List[Card]) -> GameState:
+    """A game where nobody acts on their own, so the test sends every answer, with Alice to play"""
+    game = GameState(len(hands), observer=NullObserver(), seed=0, names=NAMES[:len(hands)], policy=Policy)
+    await game.setup_game()
+    for player, cards in zip(game.players, hands):
+        game.deck.extend(player.cards)
+        player.cards = list(cards)
+        for card in cards:
+            game.deck.remove(card)
+    game.beliefs = BeliefTracker([player.name for player in game.players], [player.cards for player in game.players])
+    return game
+
+
+async def send(game: GameState, sender: str, action: Action, target: str = None, cards: List[Card] = None):
+    await game.handle_action(ActionMessage(action=action, sender=sender, target=target, cards=cards))
+
+
+def expected(game: GameState) -> dict:
+    return {player.name: list(task.expected_actions) for player, task in game.expected_actions}
+
+
+def player(game: GameState, name: str):
+    return next(p for p in game.players if p.name == name)
+
+
+def test_every_other_player_reacts_to_the_action_at_once():
+    async def run():
+        game = await new_game([Card.CAPTAIN, Card.DUKE], [Card.CONTESSA, Card.DUKE], [Card.ASSASSIN, Card.DUKE],
+                              [Card.AMBASSADOR, Card.CONTESSA])
+        await send(game, "Alice", Action.STEAL, "Bob")
+        return expected(game)
+
+    assert asyncio.run(run()) == {
+        "Bob": [Action.CHALLENGE, Action.COUNTER, Action.PASS],
+        "Carol": [Action.CHALLENGE, Action.PASS],
+        "Dave": [Action.CHALLENGE, Action.PASS],
+    }
+
+
+def test_challenge_is_resolved_before_the_counter():
+    async def run():
+        game = await new_game([Card.CONTESSA, Card.DUKE], [Card.CONTESSA, Card.DUKE], [Card.ASSASSIN, Card.DUKE],
+                              [Card.AMBASSADOR, Card.CONTESSA])
+        await send(game, "Alice", Action.STEAL, "Bob")
+        await send(game, "Bob", Action.COUNTER)
+        await send(game, "Carol", Action.CHALLENGE)
+        await send(game, "Dave", Action.PASS)
+        return game
+
+    game = asyncio.run(run())
+    # Alice was caught bluffing the Captain, so the steal and Bob's counter never happen
+    assert game.current_turn_data.countering_player is None
+    assert expected(game) == {"Alice": [Action.DISCARD]}
+    assert [p.coins for p in game.players] == [2, 2, 2, 2]
+
+
+def test_counter_is_made_after_the_failed_challenger_discards():
+    async def run():
+        game = await new_game([Card.CAPTAIN, Card.DUKE], [Card.CONTESSA, Card.DUKE], [Card.ASSASSIN, Card.DUKE],
+                              [Card.AMBASSADOR, Card.CONTESSA])
+        await send(game, "Alice", Action.STEAL, "Bob")
+        await send(game, "Bob", Action.COUNTER)
+        await send(game, "Carol", Action.CHALLENGE)
+        await send(game, "Dave", Action.PASS)
+        assert expected(game) == {"Carol": [Action.DISCARD]}
+        assert game.current_turn_data.countering_player is None
+
+        await send(game, "Carol", Action.DISCARD, cards=[Card.ASSASSIN])
+        return game
+
+    game = asyncio.run(run())
+    assert game.current_turn_data.countering_player is player(game, "Bob")
+    assert set(expected(game)) == {"Alice", "Carol", "Dave"}
+    assert [p.coins for p in game.players] == [2, 2, 2, 2]
+
+
+def test_first_challenger_in_turn_order_wins_over_the_first_to_answer():
+    async def run():
+        game = await new_game([Card.CAPTAIN, Card.DUKE], [Card.CONTESSA, Card.DUKE], [Card.ASSASSIN, Card.DUKE],
+                              [Card.AMBASSADOR, Card.CONTESSA])
+        await send(game, "Alice", Action.TAX)
+        await send(game, "Dave", Action.CHALLENGE)
+        await send(game, "Carol", Action.CHALLENGE)
+        await send(game, "Bob", Action.PASS)
+        return game
+
+    game = asyncio.run(run())
+    # Alice had the Duke, Carol comes before Dave after Alice and loses the challenge
+    assert expected(game) == {"Carol": [Action.DISCARD]}
+    assert player(game, "Alice").coins == 5
+
+
+def test_first_counterer_in_turn_order_wins_over_the_first_to_answer():
+    async def run():
+        game = await new_game([Card.CAPTAIN, Card.DUKE], [Card.CONTESSA, Card.DUKE], [Card.ASSASSIN, Card.DUKE],
+                              [Card.AMBASSADOR, Card.CONTESSA])
+        await send(game, "Alice", Action.FOREIGN_AID)
+        await send(game, "Dave", Action.COUNTER)
+        await send(game, "Carol", Action.COUNTER)
+        await send(game, "Bob", Action.PASS)
+        return game
+
+    game = asyncio.run(run())
+    assert game.current_turn_data.countering_player is player(game, "Carol")
+    assert set(expected(game)) == {"Alice", "Bob", "Dave"}
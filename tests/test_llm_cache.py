@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+
+import pytest
+
+from src.llm_cache import CachedClient, LLMCache, cache_key
+
+ENTRY = [(0.0, "x" * 10)]  # 21 bytes stored
+FORMAT = {"type": "json_schema", "json_schema": {"name": "turn", "strict": True}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Every access gets a later time, so the least recently used entry is never a tie"""
+    ticks = itertools.count(1)
+    monkeypatch.setattr("src.llm_cache.time.time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), max_bytes=3 * 21)
+    yield cache
+    cache.close()
+
+
+class CountingClient:
+    model = "gpt-test"
+    temperature = 0.5
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requests = 0
+
+    async def stream(self, system_message: str, **request_options):
+        self.requests += 1
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        pass
+
+
+def test_cache_key_is_stable():
+    # Caches are shared between runs, a changed key would turn every entry into a miss
+    assert cache_key("gpt-4o", 0.7, "You are Alice.") == \
+        "97d6e5583df7b94ad2b71e042d3e45eaa3b27c410396b510c96eabd9579bf180"
+    assert cache_key("gpt-4o", 0.7, "p", FORMAT) == cache_key("gpt-4o", 0.7, "p", dict(reversed(FORMAT.items())))
+
+
+def test_cache_key_depends_on_every_part():
+    keys = {cache_key("gpt-4o", 0.7, "p"), cache_key("gpt-4o-mini", 0.7, "p"), cache_key("gpt-4o", 0.0, "p"),
+            cache_key("gpt-4o", 0.7, "q"), cache_key("gpt-4o", 0.7, "p", FORMAT)}
+    assert len(keys) == 5
+
+
+def test_hits_and_misses_are_counted(cache):
+    assert cache.get("a") is None
+    cache.put("a", ENTRY)
+    assert cache.get("a") == ENTRY
+    assert cache.get("a") == ENTRY
+    assert cache.get("b") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+    assert stats["bytes"] == 21
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for key in "abc":
+        cache.put(key, ENTRY)
+    assert cache.get("a") == ENTRY  # b is now the least recently used
+
+    cache.put("d", ENTRY)
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    cache.put("e", ENTRY)
+    assert cache.evictions == 2
+    assert cache.get("c") is None
+
+    assert [cache.get(key) is not None for key in "ade"] == [True, True, True]
+    assert cache.size == 3 * 21
+    assert cache.stats()["hits"] == 4
+    assert cache.stats()["misses"] == 2
+
+
+def test_size_is_shared_with_other_processes(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = LLMCache(path, max_bytes=2 * 21), LLMCache(path, max_bytes=2 * 21)
+    first.put("a", ENTRY)
+    second.put("b", ENTRY)
+    first.put("c", ENTRY)
+    first.put("d", ENTRY)  # re-reads the size, which includes what the other process wrote, before evicting
+
+    assert first.evictions == 2
+    assert [second.get(key) is not None for key in "abcd"] == [False, False, True, True]
+    first.close()
+    second.close()
+
+
+def test_cached_client_only_stores_complete_streams(tmp_path):
+    async def run():
+        client = CountingClient(["SPEECH: ", "hello ", "END"])
+        async with CachedClient(client, LLMCache(str(tmp_path / "cache.sqlite"))) as cached:
+            async for _ in cached.stream("interrupted"):
+                break
+            streams = [[chunk async for chunk in cached.stream(prompt)]
+                       for prompt in ("prompt", "prompt", "interrupted")]
+            return client.requests, streams, cached.cache.stats()
+
+    requests, streams, stats = asyncio.run(run())
+    assert streams == [["SPEECH: ", "hello ", "END"]] * 3
+    assert requests == 3  # the interrupted stream wasn't stored, so it is requested again
+    assert (stats["hits"], stats["misses"]) == (1, 3)
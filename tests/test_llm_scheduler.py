@@ -0,0 +1,160 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from src import llm_scheduler
+from src.llm_scheduler import (
+    PRIORITY_CHATTER,
+    PRIORITY_REACTION,
+    PRIORITY_TASK,
+    WAIT_SAMPLES,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+class FakeTime:
+    """Stands in for the scheduler's time module, only moving when the test advances it"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeTime:
+    fake = FakeTime()
+    monkeypatch.setattr(llm_scheduler, "time", fake)
+    return fake
+
+
+class GatedClient:
+    """Streams one chunk per request once the test opens the request's gate"""
+
+    model = "gated"
+    temperature = 0.0
+
+    def __init__(self):
+        self.started: List[str] = []
+        self.gates: Dict[str, asyncio.Event] = {}
+
+    async def stream(self, system_message: str, **request_options):
+        self.started.append(system_message)
+        gate = self.gates[system_message] = asyncio.Event()
+        await gate.wait()
+        yield "done"
+
+    async def close(self):
+        pass
+
+
+async def consume(scheduler: RequestScheduler, prompt: str, priority: int, game_id):
+    return [chunk async for chunk in scheduler.stream(prompt, priority=priority, game_id=game_id)]
+
+
+async def grant_order(scheduler: RequestScheduler, requests: List[tuple]) -> List[str]:
+    """Prompts in the order they were granted, with one stream open at a time and `requests` queued behind the first"""
+    client = scheduler.client
+    tasks = [asyncio.create_task(consume(scheduler, "first", PRIORITY_TASK, "first"))]
+    await asyncio.sleep(0)
+    for prompt, priority, game_id in requests:
+        tasks.append(asyncio.create_task(consume(scheduler, prompt, priority, game_id)))
+        await asyncio.sleep(0)
+
+    while len(client.started) <= len(requests):
+        client.gates[client.started[-1]].set()
+        started = len(client.started)
+        while len(client.started) == started:
+            await asyncio.sleep(0)
+    client.gates[client.started[-1]].set()
+    await asyncio.gather(*tasks)
+    return client.started[1:]
+
+
+def test_bucket_refills_continuously(clock):
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)  # one per second, holding two
+    bucket.take(2, clock.now)
+    assert bucket.delay(1, clock.now) == pytest.approx(1.0)
+    assert bucket.delay(1, clock.now + 0.25) == pytest.approx(0.75)
+
+    clock.now += 10
+    assert bucket.delay(2, clock.now) == 0.0
+    assert bucket.level == pytest.approx(2.0)  # capped at the burst
+
+
+def test_bucket_corrects_estimates(clock):
+    bucket = TokenBucket(per_minute=600, burst_seconds=1)  # ten per second
+    bucket.take(8, clock.now)
+    bucket.give(3, clock.now)  # used five of the eight estimated
+    assert bucket.level == pytest.approx(5.0)
+    bucket.give(-7, clock.now)  # used more than estimated
+    assert bucket.delay(1, clock.now) == pytest.approx(0.3)
+
+
+def test_more_than_the_capacity_only_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(1, clock.now)
+    assert bucket.delay(100, clock.now) == pytest.approx(1.0)
+
+
+def test_request_over_the_limit_waits_for_the_refill(clock):
+    async def run():
+        scheduler = RequestScheduler(GatedClient(), requests_per_minute=60)  # one request per second
+        first = asyncio.create_task(consume(scheduler, "first", PRIORITY_TASK, "game"))
+        second = asyncio.create_task(consume(scheduler, "second", PRIORITY_TASK, "game"))
+        await asyncio.sleep(0)
+        assert scheduler.client.started == ["first"]
+        assert scheduler.throttled == 1
+
+        clock.now += 0.5
+        scheduler._on_wakeup()  # too early, the bucket is half full
+        await asyncio.sleep(0)
+        assert scheduler.client.started == ["first"]
+
+        clock.now += 0.5
+        scheduler._on_wakeup()
+        await asyncio.sleep(0)
+        assert scheduler.client.started == ["first", "second"]
+
+        for gate in scheduler.client.gates.values():
+            gate.set()
+        await asyncio.gather(first, second)
+        waits = scheduler.stats()["classes"]["task"]["wait_seconds"]
+        await scheduler.close()
+        return waits
+
+    waits = asyncio.run(run())
+    assert waits["count"] == 2
+    assert waits["max"] == pytest.approx(1.0)
+
+
+def test_requests_are_granted_by_priority(clock):
+    scheduler = RequestScheduler(GatedClient(), max_concurrent=1)
+    order = asyncio.run(grant_order(scheduler, [("chatter", PRIORITY_CHATTER, "game"),
+                                                ("reaction", PRIORITY_REACTION, "game"),
+                                                ("task", PRIORITY_TASK, "game")]))
+    assert order == ["task", "reaction", "chatter"]
+
+
+def test_games_take_turns_within_a_priority(clock):
+    scheduler = RequestScheduler(GatedClient(), max_concurrent=1)
+    order = asyncio.run(grant_order(scheduler, [("a1", PRIORITY_REACTION, "a"), ("a2", PRIORITY_REACTION, "a"),
+                                                ("a3", PRIORITY_REACTION, "a"), ("b1", PRIORITY_REACTION, "b"),
+                                                ("c1", PRIORITY_REACTION, "c")]))
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_waits_are_kept_in_bounded_memory(clock):
+    scheduler = RequestScheduler(GatedClient())
+    for wait in range(WAIT_SAMPLES + 10):
+        scheduler._count_wait(PRIORITY_TASK, float(wait))
+        scheduler.granted[PRIORITY_TASK] += 1
+
+    assert len(scheduler.waits[PRIORITY_TASK]) == WAIT_SAMPLES
+    waits = scheduler.stats()["classes"]["task"]["wait_seconds"]
+    assert waits["count"] == WAIT_SAMPLES + 10
+    assert waits["sum"] == sum(range(WAIT_SAMPLES + 10))
+    assert waits["max"] == WAIT_SAMPLES + 9
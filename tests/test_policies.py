@@ -0,0 +1,42 @@
+import asyncio
+
+from src.datatypes import Action
+from src.game_state import GameState
+from src.observers import NullObserver
+from src.policies import HeuristicPolicy
+
+
+class ClumsyPolicy(HeuristicPolicy):
+    """Answers its first tasks with a STEAL without a target, which the engine rejects"""
+
+    def __init__(self, agent):
+        super().__init__(agent)
+        self.mistakes = 0
+        self.rejections = 0
+
+    def decide(self, observation):
+        message = super().decide(observation)
+        if self.mistakes < 2:
+            self.mistakes += 1
+            return message.model_copy(update={"action": Action.STEAL, "target": None})
+        return message
+
+    def rejected(self):
+        self.rejections += 1
+        super().rejected()
+
+
+async def play(seed: int) -> GameState:
+    game = GameState(4, observer=NullObserver(), seed=seed, policy=ClumsyPolicy)
+    try:
+        await asyncio.wait_for(game.run(), 10)
+    finally:
+        await game.close()
+    return game
+
+
+def test_rejected_answer_is_answered_again():
+    for seed in range(3):
+        game = asyncio.run(play(seed))
+        assert game.winner is not None
+        assert sum(player.policy.rejections for player in game.players) > 0
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Tuple
+
+from benchmarks.scripted_client import ScriptedClient
+
+from src.game_state import GameState
+from src.observers import NullObserver, ObserverGroup
+from src.recording import ActionRecorder, GameRecording, RecordingClient, ReplayClient
+
+
+async def record(seed: int) -> Tuple[GameState, GameRecording]:
+    recording = GameRecording(seed=seed, num_players=3)
+    game = GameState(3, llm_client=RecordingClient(ScriptedClient(seed), recording),
+                     observer=ObserverGroup([NullObserver(), ActionRecorder(recording)]), seed=seed,
+                     coalesce_window=0.01)
+    await asyncio.wait_for(game.run(), 60)
+    return game, recording
+
+
+async def replay(recording: GameRecording) -> Tuple[GameState, GameRecording]:
+    replayed = GameRecording(seed=recording.seed, num_players=recording.num_players)
+    game = GameState(recording.num_players, llm_client=ReplayClient(recording),
+                     observer=ObserverGroup([NullObserver(), ActionRecorder(replayed)]), seed=recording.seed,
+                     coalesce_window=0.01)
+    await asyncio.wait_for(game.run(), 60)
+    return game, replayed
+
+
+def test_recorded_game_replays_action_for_action(tmp_path):
+    for seed in range(3):
+        game, recording = asyncio.run(record(seed))
+        path = str(tmp_path / f"game-{seed}.json")
+        recording.save(path)
+
+        replayed_game, replayed = asyncio.run(replay(GameRecording.load(path)))
+        assert recording.actions
+        assert replayed.actions == recording.actions
+        assert replayed_game.winner.name == game.winner.name
+        assert replayed_game.current_turn == game.current_turn
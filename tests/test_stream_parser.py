@@ -0,0 +1,97 @@
+import random
+from typing import List
+
+import pytest
+
+from src.stream_parser import SEGMENT_KINDS, Segment, StreamParser
+
+WORDS = ["Susan", "has", "the", "Duke", "I", "think", "we", "should", "challenge", "her", "coins", "STEAL", "SPEECH",
+         "a", "bluff", "ACT", "THOUGHT", "END.", "ENDING", "S", ":", "Captain", "ION"]
+
+OUTPUT = "THOUGHT: Susan has no Duke\nSPEECH: I challenge her\nACTION: CHALLENGE\nEND\nSPEECH: ignored after END"
+SEGMENTS = [Segment("THOUGHT", "Susan has no Duke"), Segment("SPEECH", "I challenge her"),
+            Segment("ACTION", "CHALLENGE")]
+
+
+def parse(chunks: List[str]) -> List[Segment]:
+    parser = StreamParser()
+    segments = []
+    for chunk in chunks:
+        segments.extend(parser.feed(chunk))
+    segments.extend(parser.close())
+    return segments
+
+
+def random_output(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 8)):
+        kind = rng.choice(SEGMENT_KINDS)
+        lines.append(f"{kind}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))))
+        if kind != "ACTION" and rng.random() < 0.2:
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))))
+    if rng.random() < 0.5:
+        lines.extend(["END", "SPEECH: this comes after END and is ignored"])
+    return "\n".join(lines)
+
+
+def split_randomly(rng: random.Random, text: str) -> List[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(0, len(text) - 1)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunk_boundaries_parse_like_a_single_chunk(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_output(rng)
+        assert parse(split_randomly(rng, text)) == parse([text])
+
+
+def test_single_chunk():
+    assert parse([OUTPUT]) == SEGMENTS
+
+
+@pytest.mark.parametrize("cut", range(1, len(OUTPUT)))
+def test_split_anywhere_in_two(cut):
+    assert parse([OUTPUT[:cut], OUTPUT[cut:]]) == SEGMENTS
+
+
+def test_one_character_per_chunk():
+    assert parse(list(OUTPUT)) == SEGMENTS
+
+
+def test_end_split_across_chunks_stops_the_output():
+    parser = StreamParser()
+    segments = parser.feed("ACTION: TAX\nE")
+    segments += parser.feed("N")
+    segments += parser.feed("D\nSPEECH: ignored")
+    assert parser.done
+    assert segments == [Segment("ACTION", "TAX")]
+    assert parser.feed("SPEECH: still ignored\n") == []
+
+
+def test_word_starting_with_end_is_content():
+    assert parse(["SPEECH: ENDING soon\n", "END"]) == [Segment("SPEECH", "ENDING soon")]
+
+
+def test_multi_line_speech_is_one_segment():
+    output = "SPEECH: Listen up.\nSusan has no Duke,\n\nshe is bluffing\nTHOUGHT: they may\nbelieve me\n" \
+             "ACTION: CHALLENGE"
+    assert parse([output]) == [Segment("SPEECH", "Listen up.\nSusan has no Duke,\n\nshe is bluffing"),
+                               Segment("THOUGHT", "they may\nbelieve me"), Segment("ACTION", "CHALLENGE")]
+
+
+def test_end_line_finishes_a_multi_line_speech():
+    parser = StreamParser()
+    segments = parser.feed("SPEECH: first line\nsecond line\n")
+    assert segments == []
+    segments += parser.feed("END\nmore")
+    assert parser.done
+    assert segments == [Segment("SPEECH", "first line\nsecond line")]
+
+
+def test_action_ends_with_its_line():
+    parser = StreamParser()
+    assert parser.feed("ACTION: STEAL Bob\n") == [Segment("ACTION", "STEAL Bob")]
+    segments = parse(["ACTION: TAX\nbecause I have the Duke\nSPEECH: hi"])
+    assert segments == [Segment("ACTION", "TAX"), Segment("SPEECH", "hi")]
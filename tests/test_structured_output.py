@@ -0,0 +1,104 @@
+import json
+from typing import List
+
+import pytest
+
+from src.stream_parser import Segment
+from src.structured_output import (
+    JsonSegmentParser,
+    allowed_actions,
+    repair,
+    response_format,
+)
+
+RESPONSE = json.dumps({"thought": "Susan has \"no\" Duke\nso I'll steal", "speech": "Nice try, Sé.",
+                       "action": "STEAL Susan"})
+SEGMENTS = [Segment("THOUGHT", "Susan has \"no\" Duke\nso I'll steal"), Segment("SPEECH", "Nice try, Sé."),
+            Segment("ACTION", "STEAL Susan")]
+
+OPTIONS = ["INCOME", "FOREIGN_AID", "STEAL Bob", "STEAL Susan", "DISCARD_TWO CAPTAIN DUKE", "DISCARD_TWO DUKE DUKE"]
+
+
+def parse(chunks: List[str]) -> List[Segment]:
+    parser = JsonSegmentParser()
+    segments = []
+    for chunk in chunks:
+        segments.extend(parser.feed(chunk))
+    segments.extend(parser.close())
+    return segments
+
+
+def test_single_chunk():
+    assert parse([RESPONSE]) == SEGMENTS
+
+
+@pytest.mark.parametrize("cut", range(1, len(RESPONSE)))
+def test_split_anywhere_in_two(cut):
+    assert parse([RESPONSE[:cut], RESPONSE[cut:]]) == SEGMENTS
+
+
+def test_one_character_per_chunk():
+    assert parse(list(RESPONSE)) == SEGMENTS
+
+
+def test_action_is_emitted_before_the_object_closes():
+    parser = JsonSegmentParser()
+    assert parser.feed('{"action": "TAX", "thought": "I have ') == [Segment("ACTION", "TAX")]
+    assert not parser.done
+
+
+def test_object_end_stops_the_output():
+    parser = JsonSegmentParser()
+    assert parser.feed('```json\n{"thought": null, "speech": "", "action": "PASS"}') == [Segment("ACTION", "PASS")]
+    assert parser.done
+    assert parser.feed('\n```\n{"speech": "a second object"}') == []
+
+
+def test_truncated_response_keeps_the_closed_values():
+    assert parse(['{"thought": "Bob is bluffing", "speech": "I challenge', ' you", "action": "CHAL']) == \
+        [Segment("THOUGHT", "Bob is bluffing"), Segment("SPEECH", "I challenge you")]
+
+
+def test_invalid_escape_is_kept_as_written():
+    segments = parse(['{"speech": "a \\q b", "action": "PASS"}'])
+    assert segments == [Segment("SPEECH", "a \\q b"), Segment("ACTION", "PASS")]
+
+
+def test_nested_values_and_unknown_fields_are_skipped():
+    response = '{"notes": {"speech": "nested"}, "extra": ["ACTION"], "speech": "hi", "action": "INCOME"}'
+    assert parse([response]) == [Segment("SPEECH", "hi"), Segment("ACTION", "INCOME")]
+
+
+def test_text_before_the_object_is_skipped():
+    assert parse(["Sure! Here is my answer: ", '{"action": "INCOME"}']) == [Segment("ACTION", "INCOME")]
+
+
+@pytest.mark.parametrize("text, repaired", [
+    ("STEAL Susan", "STEAL Susan"),
+    ("steal susan.", "STEAL Susan"),
+    ("**Steal** Susan!", "STEAL Susan"),
+    ("foreign-aid", "FOREIGN_AID"),
+    ("Foreign Aid", "FOREIGN_AID"),
+    ("DISCARD_TWO DUKE, CAPTAIN", "DISCARD_TWO CAPTAIN DUKE"),
+    ("discard two Card.DUKE Card.DUKE", "DISCARD_TWO DUKE DUKE"),
+    ("INCOME please", "INCOME"),
+])
+def test_repair_finds_the_one_option_meant(text, repaired):
+    assert repair(text, OPTIONS) == repaired
+
+
+@pytest.mark.parametrize("text", ["STEAL", "DISCARD_TWO", "DISCARD_TWO DUKE", "TAX", "STEAL Carol", "", "..."])
+def test_repair_gives_up_on_ambiguous_or_unknown_actions(text):
+    assert repair(text, OPTIONS) is None
+
+
+def test_missing_target_is_filled_in_when_there_is_only_one():
+    assert repair("STEAL", ["INCOME", "STEAL Bob"]) == "STEAL Bob"
+
+
+def test_response_format_constrains_the_action():
+    assert allowed_actions(response_format(OPTIONS)) == OPTIONS
+    schema = response_format(None)["json_schema"]["schema"]
+    assert schema["properties"]["action"] == {"type": "null"}
+    assert allowed_actions(response_format(None)) is None
+    assert allowed_actions(None) is None
@@ -0,0 +1,61 @@
+import asyncio
+
+from src.telemetry import GameTelemetry, prometheus_text
+
+
+async def chunks(count: int):
+    for i in range(count):
+        yield str(i)
+
+
+def tracked(telemetry: GameTelemetry, tokens: int, used: int, completed: bool = False, interrupted: bool = False):
+    """A stream of `tokens` chunks that the agent acted on up to the `used` one, closed early unless `completed`"""
+    async def read():
+        stream = telemetry.track(chunks(tokens), "Alice", 0)
+        for token in range(tokens):
+            await stream.__anext__()
+            if token + 1 == used:
+                telemetry.used(stream)
+        if completed:
+            assert [chunk async for chunk in stream] == []
+        if interrupted:
+            telemetry.interrupted(stream)
+        await stream.aclose()
+        return stream
+
+    return asyncio.run(read())
+
+
+def test_stream_outcomes_and_tokens_add_up():
+    telemetry = GameTelemetry()
+    telemetry.start()
+    tracked(telemetry, 10, 10, completed=True)
+    tracked(telemetry, 8, 3, interrupted=True)
+    tracked(telemetry, 6, 6)  # closed by the agent at END
+    tracked(telemetry, 4, 4, completed=True, interrupted=True)  # completed before the interrupt
+
+    summary = telemetry.summary()
+    assert summary["streams"] == {"completed": 2, "interrupted": 1, "closed": 1}
+    assert summary["tokens"] == {"generated": 28, "wasted": 5}
+
+    lines = prometheus_text([({"game": 0}, summary)]).splitlines()
+    streams = [line for line in lines if line.startswith("coup_llm_streams_total{")]
+    assert sum(int(line.split()[-1]) for line in streams) == len(telemetry.streams)
+    assert 'coup_llm_tokens_total{game="0"} 28' in lines
+    assert 'coup_llm_wasted_tokens_total{game="0"} 5' in lines
+
+
+def test_counts_reach_the_record_before_the_stream_ends():
+    async def read():
+        telemetry = GameTelemetry()
+        stream = telemetry.track(chunks(5), "Alice", 0)
+        await stream.__anext__()
+        await stream.__anext__()
+        telemetry.used(stream)
+        await stream.__anext__()
+        telemetry.interrupted(stream)
+        return stream.record
+
+    record = asyncio.run(read())
+    assert (record.tokens, record.used_tokens, record.interrupted) == (3, 2, True)
+    assert record.ttft is not None and record.seconds is None